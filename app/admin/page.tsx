@@ -185,6 +185,28 @@ export default function AdminPanel() {
     }
   };
 
+  const waitForRagJob = async (jobId: string, tenantId: string) => {
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      try {
+        const response = await fetch(`http://127.0.0.1:8000/admin/rag/jobs/${jobId}`);
+        if (!response.ok) return;
+        const job = await response.json();
+        if (job.status === 'done' || job.status === 'failed') {
+          if (job.status === 'failed') {
+            alert(`❌ Indexarea fișierului ${job.filename} a eșuat: ${job.error || 'eroare necunoscută'}`);
+          }
+          loadTenants();
+          loadRagFiles(tenantId);
+          return;
+        }
+      } catch (error) {
+        console.error('Error polling RAG job:', error);
+        return;
+      }
+    }
+  };
+
   const handleFileUpload = async (event: React.ChangeEvent<HTMLInputElement>) => {
     if (!selectedTenant || !event.target.files?.[0]) return;
 
@@ -206,10 +228,15 @@ export default function AdminPanel() {
       if (response.ok) {
         const result = await response.json();
         alert(result.message || 'Fișierul a fost încărcat cu succes!');
-        loadTenants();
-        loadRagFiles(selectedTenant.id);
         // Resetează input-ul pentru a permite încărcarea aceluiași fișier din nou
         event.target.value = '';
+        if (result.job_id) {
+          // Indexarea rulează în fundal: reîncarcă lista de fișiere când job-ul se termină
+          waitForRagJob(result.job_id, selectedTenant.id);
+        } else {
+          loadTenants();
+          loadRagFiles(selectedTenant.id);
+        }
       } else {
         const errorData = await response.json().catch(() => ({ error: 'Eroare necunoscută' }));
         alert(`❌ Eroare la încărcarea fișierului: ${errorData.error || response.statusText}`);
@@ -0,0 +1,127 @@
+"""
+Benchmark pentru cuantizarea vectorilor RAG (TenantRAGStore, RAG_QUANTIZATION): memoria vectorilor,
+latența căutării și recall@k față de căutarea exactă float32, pentru none / float16 / int8.
+
+Vectorii sunt sintetici (documente pe teme, chunk-uri vecine asemănătoare) sau copiați din
+vector store-ul unui tenant existent (--tenant); query-urile sunt calculate local, fără Ollama.
+
+Rulează:
+    python benchmark_rag_quantization.py                          # 50.000 chunk-uri x 768 dimensiuni
+    python benchmark_rag_quantization.py --chunks 200000 --rerank 20 50 100
+    python benchmark_rag_quantization.py --tenant 12 --queries 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Adaugă directorul curent la path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from rag_manager import QUANTIZATION_MODES, TenantRAGStore, get_tenant_vector_store_path
+
+
+def synthetic_documents(chunks: int, dim: int, chunks_per_document: int = 20, topics: int = 200, seed: int = 0):
+    """Documente pe teme: chunk-urile unui document (ferestre suprapuse) sunt apropiate între ele"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    documents = []
+    for doc_idx in range(0, chunks, chunks_per_document):
+        count = min(chunks_per_document, chunks - doc_idx)
+        base = centers[rng.integers(topics)] + rng.normal(scale=0.8, size=dim).astype(np.float32)
+        drift = np.cumsum(rng.normal(scale=0.3, size=(count, dim)), axis=0).astype(np.float32)
+        documents.append((f"document_{doc_idx // chunks_per_document}.txt", base + drift))
+    return documents
+
+
+def tenant_documents(tenant_id: str):
+    """Documentele (vectorii exacți) din vector store-ul unui tenant"""
+    store = TenantRAGStore(tenant_id, store_path=get_tenant_vector_store_path(tenant_id))
+    exact = store._open_vectors(store._vectors_file, store.dim, len(store.metadata))
+    if exact is None or not store._ranges:
+        print(f"❌ Vector store-ul {tenant_id} este gol sau nu poate fi citit")
+        sys.exit(1)
+    return [(filename, np.array(exact[start:end])) for filename, (start, end) in store._ranges.items()]
+
+
+def write_store(store_path: str, documents):
+    """Scrie direct fișierele unui vector store (vectori, metadate, manifest), ca la o salvare a store-ului"""
+    metadata, ranges = [], {}
+    with open(os.path.join(store_path, "vectors.0.f32"), 'wb') as f:
+        for filename, vectors in documents:
+            ranges[filename] = (len(metadata), len(metadata) + len(vectors))
+            metadata.extend({"filename": filename, "content": "", "chunk_index": i, "total_chunks": len(vectors)}
+                            for i in range(len(vectors)))
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+    with open(os.path.join(store_path, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump({"model": "benchmark", "dim": len(documents[0][1][0]), "ranges": ranges,
+                   "vectors_file": "vectors.0.f32", "quantization": "none"}, f)
+    with open(os.path.join(store_path, "metadata.json"), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
+
+
+def make_queries(documents, count: int, seed: int = 1):
+    """Query-uri apropiate de chunk-uri aleatoare (ca o întrebare despre un fragment din documente)"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(count):
+        _, vectors = documents[rng.integers(len(documents))]
+        vector = vectors[rng.integers(len(vectors))]
+        queries.append(vector + rng.normal(scale=float(np.std(vector)), size=len(vector)).astype(np.float32))
+    return queries
+
+
+def run_queries(store: TenantRAGStore, queries, top_k: int):
+    """Rezultatele (fișier, chunk) și latențele (ms) pentru fiecare query"""
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits = store.search_vector(query, top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append({(hit["filename"], hit["chunk_index"]) for hit in hits})
+    return results, np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cuantizare vectori RAG (memorie, latență, recall@k)")
+    parser.add_argument('--chunks', type=int, default=50000, help="Chunk-uri sintetice (ignorat cu --tenant)")
+    parser.add_argument('--dim', type=int, default=768, help="Dimensiunea vectorilor sintetici")
+    parser.add_argument('--tenant', help="Folosește vectorii din vector store-ul acestui tenant")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--rerank', type=int, nargs='+', default=[50], help="Valori RAG_RERANK_CANDIDATES testate")
+    args = parser.parse_args()
+
+    documents = tenant_documents(args.tenant) if args.tenant else synthetic_documents(args.chunks, args.dim)
+    queries = make_queries(documents, args.queries)
+    total_chunks = sum(len(vectors) for _, vectors in documents)
+    print(f"{len(documents)} documente, {total_chunks} chunk-uri x {len(documents[0][1][0])} dimensiuni, "
+          f"{len(queries)} query-uri, top_k={args.top_k}\n")
+
+    with tempfile.TemporaryDirectory() as store_path:
+        write_store(store_path, documents)
+        store = TenantRAGStore("benchmark", store_path=store_path)
+        # Recall-ul cuantizării: doar cei mai apropiați vectori, fără diversificarea rezultatelor (MMR)
+        store.configure(mmr_lambda=1.0, max_chunks_per_file=args.top_k, merge_adjacent=False)
+
+        exact_results, exact_latencies = run_queries(store, queries, args.top_k)
+        print(f"{'mod':<10} {'reordonare':>10} {'memorie':>12} {'medie':>9} {'p95':>9} {'recall@' + str(args.top_k):>10}")
+        print(f"{'none':<10} {'-':>10} {store.memory_usage() / 2**20:>9.1f} MB "
+              f"{exact_latencies.mean():>6.2f} ms {np.percentile(exact_latencies, 95):>6.2f} ms {1.0:>10.3f}")
+
+        for mode in QUANTIZATION_MODES[1:]:
+            for rerank in args.rerank:
+                store.configure(quantization=mode, rerank_candidates=rerank)
+                results, latencies = run_queries(store, queries, args.top_k)
+                recall = np.mean([len(found & exact) / max(1, len(exact)) for found, exact in zip(results, exact_results)])
+                print(f"{mode:<10} {rerank:>10} {store.memory_usage() / 2**20:>9.1f} MB "
+                      f"{latencies.mean():>6.2f} ms {np.percentile(latencies, 95):>6.2f} ms {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
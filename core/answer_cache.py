@@ -0,0 +1,163 @@
+"""
+Cache semantic de răspunsuri per tenant (opțional: client_chat.settings → "answer_cache", implicit
+ANSWER_CACHE_ENABLED). Întrebările frecvente (FAQ) primesc răspunsul generat deja pentru o întrebare
+cu înțeles apropiat, fără o nouă generare cu modelul de chat.
+
+Cheia unei intrări: embedding-ul întrebării (modelul vector store-ului tenant-ului) + versiunea
+conținutului din care a fost generat răspunsul (prompt, model, setări, client_chat.config_version,
+conținutul vector store-ului). La schimbarea versiunii, intrările vechi sunt eliminate. Cache-ul
+este în memorie, per proces worker: LRU (max_entries), expirare după ttl_seconds.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from rag_manager import EmbeddingError, get_embedding, get_tenant_rag_store
+from core.cache import get_cached_config_version
+
+
+class TenantAnswerCache:
+    """Răspunsurile din cache ale unui tenant și contoarele lor (hit rate)"""
+
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+        self._lock = threading.Lock()
+        # id intrare -> {"vector", "question", "answer", "created_at", "hits"} (ordine LRU)
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._version: Optional[str] = None
+        # Matricea vectorilor intrărilor (reconstruită leneș după modificări) și id-urile rândurilor
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: list = []
+        self._counters = {"lookups": 0, "hits": 0, "misses": 0, "skipped": 0, "stores": 0,
+                          "evicted": 0, "expired": 0, "invalidated": 0}
+
+    def _drop(self, entry_ids, counter: Optional[str] = None):
+        for entry_id in entry_ids:
+            del self._entries[entry_id]
+        if counter:
+            self._counters[counter] += len(entry_ids)
+        self._matrix = None
+
+    def _check_version(self, version: str):
+        """Conținutul / config-ul tenant-ului s-a schimbat: răspunsurile vechi nu mai sunt valide"""
+        if version != self._version:
+            self._drop(list(self._entries), "invalidated")
+            self._version = version
+
+    def _remove_expired(self, ttl_seconds: int):
+        now = time.monotonic()
+        self._drop([entry_id for entry_id, entry in self._entries.items()
+                    if now - entry["created_at"] >= ttl_seconds], "expired")
+
+    def lookup(self, version: str, vector: np.ndarray, threshold: float, ttl_seconds: int) -> Optional[Dict[str, Any]]:
+        """Răspunsul întrebării celei mai apropiate, dacă similaritatea atinge pragul: {answer, question, score}"""
+        with self._lock:
+            self._counters["lookups"] += 1
+            self._check_version(version)
+            self._remove_expired(ttl_seconds)
+            if self._entries and self._matrix is None:
+                self._matrix_ids = list(self._entries)
+                self._matrix = np.stack([self._entries[entry_id]["vector"] for entry_id in self._matrix_ids])
+            if self._entries and self._matrix.shape[1] == len(vector):
+                scores = self._matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= threshold:
+                    entry_id = self._matrix_ids[best]
+                    entry = self._entries[entry_id]
+                    entry["hits"] += 1
+                    self._entries.move_to_end(entry_id)
+                    self._counters["hits"] += 1
+                    return {"answer": entry["answer"], "question": entry["question"], "score": float(scores[best])}
+            self._counters["misses"] += 1
+            return None
+
+    def store(self, version: str, vector: np.ndarray, question: str, answer: str, max_entries: int):
+        """Adaugă răspunsul generat pentru o întrebare (ignorat dacă între timp versiunea s-a schimbat)"""
+        with self._lock:
+            if version != self._version:
+                return
+            # Aceeași întrebare salvată de mai multe cereri simultane (ex: generare partajată, core/coalescing.py)
+            duplicates = [entry_id for entry_id, entry in self._entries.items() if entry["question"] == question]
+            self._drop(duplicates)
+            self._entries[self._next_id] = {"vector": vector, "question": question, "answer": answer,
+                                            "created_at": time.monotonic(), "hits": 0}
+            self._next_id += 1
+            self._counters["stores"] += 1
+            self._matrix = None
+            if len(self._entries) > max_entries:
+                self._drop(list(self._entries)[:len(self._entries) - max_entries], "evicted")
+
+    def record_skip(self):
+        """Cerere a unui tenant cu cache activ care nu poate folosi cache-ul (fișiere, formular, conversație începută)"""
+        with self._lock:
+            self._counters["skipped"] += 1
+
+    def purge(self) -> int:
+        """Golește cache-ul tenant-ului; returnează numărul de intrări eliminate"""
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._matrix = None
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["lookups"]
+            return {
+                "tenant_id": self.tenant_id,
+                "entries": len(self._entries),
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                "top_questions": [
+                    {"question": entry["question"], "hits": entry["hits"]}
+                    for entry in sorted(self._entries.values(), key=lambda entry: entry["hits"], reverse=True)[:10]
+                ]
+            }
+
+
+_tenant_caches: Dict[str, TenantAnswerCache] = {}
+_tenant_caches_lock = threading.Lock()
+
+
+def get_answer_cache(tenant_id: str) -> TenantAnswerCache:
+    """Obține cache-ul de răspunsuri pentru un tenant (singleton per tenant, per proces)"""
+    with _tenant_caches_lock:
+        if tenant_id not in _tenant_caches:
+            _tenant_caches[tenant_id] = TenantAnswerCache(tenant_id)
+        return _tenant_caches[tenant_id]
+
+
+def _prompt_version(chat_id: str, config: dict) -> str:
+    """Amprenta a tot ce intră în prompt în afară de întrebare (o modificare invalidează răspunsurile)"""
+    fingerprint = {
+        "config_version": get_cached_config_version(chat_id),
+        "model": config.get("model"),
+        "prompt": config.get("prompt"),
+        "institution": config.get("institution"),
+        "settings": config.get("settings"),
+        "rag_content_info": config.get("rag_content_info"),
+    }
+    encoded = json.dumps(fingerprint, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def answer_cache_key(chat_id: str, config: dict, question: str) -> Optional[Tuple[str, np.ndarray]]:
+    """
+    (versiune, embedding normalizat al întrebării) pentru căutarea / salvarea în cache, sau None dacă
+    embedding-ul nu poate fi calculat (fără fallback-ul hash din get_embedding: ar da potriviri false)
+    """
+    rag_store = get_tenant_rag_store(chat_id)
+    version = f"{_prompt_version(chat_id, config)}:{rag_store.content_version()}"
+    try:
+        vector = np.asarray(get_embedding(question.strip(), strict=True, model=rag_store.model), dtype=np.float32)
+    except EmbeddingError as e:
+        print(f"⚠️ Cache răspunsuri indisponibil pentru {chat_id}: {e}")
+        return None
+    norm = float(np.linalg.norm(vector))
+    if norm == 0:
+        return None
+    return version, vector / norm
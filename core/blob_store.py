@@ -0,0 +1,277 @@
+"""
+Blob store adresat după conținut (sha256) pentru fișierele binare RAG.
+Rândul din rag_file păstrează doar hash-ul și dimensiunea; octeții stau aici.
+
+Backend-uri:
+- LocalBlobStore: sistem de fișiere local, sharduit după sha256 (ab/cd/abcd...)
+- S3BlobStore: orice client compatibil S3 (boto3 sau LocalS3Client ca înlocuitor local)
+"""
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Tuple
+
+# Configurare din variabile de mediu
+BLOB_STORE_BACKEND = os.getenv('BLOB_STORE_BACKEND', 'local')  # local | s3
+BLOB_STORE_DIR = os.getenv('BLOB_STORE_DIR', 'blob_store')
+BLOB_STORE_S3_BUCKET = os.getenv('BLOB_STORE_S3_BUCKET', 'integra-rag')
+BLOB_STORE_S3_PREFIX = os.getenv('BLOB_STORE_S3_PREFIX', 'rag/')
+BLOB_STORE_S3_ENDPOINT = os.getenv('BLOB_STORE_S3_ENDPOINT')  # ex: http://localhost:9000 (MinIO)
+
+# Dimensiunea implicită a bucăților la citire în flux
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def compute_sha256(data: bytes) -> str:
+    """Calculează hash-ul sha256 (hex) al unui conținut"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def shard_key(sha256: str) -> str:
+    """Returnează calea relativă sharduită pentru un hash: ab/cd/abcd..."""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def iter_file_range(path: str, start: int = 0, end: Optional[int] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Citește în flux octeții [start, end] (inclusiv) ai unui fișier de pe disk"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            to_read = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = f.read(to_read)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+class BlobStore(ABC):
+    """Interfața comună pentru stocarea blob-urilor adresate după sha256"""
+
+    @abstractmethod
+    def put(self, data: bytes) -> Tuple[str, int]:
+        """
+        Salvează conținutul și returnează (sha256, size).
+        Încărcările identice sunt deduplicate (același hash = același blob).
+        """
+
+    @abstractmethod
+    def exists(self, sha256: str) -> bool:
+        """True dacă blob-ul există"""
+
+    @abstractmethod
+    def size(self, sha256: str) -> Optional[int]:
+        """Dimensiunea blob-ului în bytes sau None dacă nu există"""
+
+    @abstractmethod
+    def iter_range(self, sha256: str, start: int = 0, end: Optional[int] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Citește în flux octeții [start, end] (inclusiv) ai blob-ului, în bucăți de chunk_size.
+        end=None înseamnă până la final.
+        """
+
+    def get(self, sha256: str) -> Optional[bytes]:
+        """Citește tot blob-ul în memorie (doar pentru fișiere mici / procesare internă)"""
+        if not self.exists(sha256):
+            return None
+        return b"".join(self.iter_range(sha256))
+
+    @abstractmethod
+    def delete(self, sha256: str) -> bool:
+        """Șterge blob-ul; True dacă a fost șters"""
+
+
+class LocalBlobStore(BlobStore):
+    """Blob store pe sistemul de fișiere local, sharduit după sha256"""
+
+    def __init__(self, root: str = BLOB_STORE_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, *shard_key(sha256).split("/"))
+
+    def put(self, data: bytes) -> Tuple[str, int]:
+        sha256 = compute_sha256(data)
+        path = self._path(sha256)
+        if os.path.exists(path):
+            # Deduplicare: conținut identic deja stocat
+            return sha256, len(data)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Scriere atomică: fișier temporar în același director + os.replace
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return sha256, len(data)
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256))
+
+    def size(self, sha256: str) -> Optional[int]:
+        path = self._path(sha256)
+        return os.path.getsize(path) if os.path.exists(path) else None
+
+    def iter_range(self, sha256: str, start: int = 0, end: Optional[int] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        return iter_file_range(self._path(sha256), start, end, chunk_size)
+
+    def delete(self, sha256: str) -> bool:
+        path = self._path(sha256)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+
+class LocalS3Client:
+    """
+    Înlocuitor local pentru un client S3 (subsetul de API boto3 folosit de S3BlobStore).
+    Util pentru dezvoltare/teste fără MinIO sau AWS.
+    """
+
+    class _Body:
+        def __init__(self, path: str, start: int, end: Optional[int]):
+            self._file = open(path, "rb")
+            self._file.seek(start)
+            self._remaining = None if end is None else end - start + 1
+
+        def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+            try:
+                while self._remaining is None or self._remaining > 0:
+                    to_read = chunk_size if self._remaining is None else min(chunk_size, self._remaining)
+                    chunk = self._file.read(to_read)
+                    if not chunk:
+                        break
+                    if self._remaining is not None:
+                        self._remaining -= len(chunk)
+                    yield chunk
+            finally:
+                self._file.close()
+
+    class NoSuchKey(Exception):
+        pass
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs):
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(Body)
+        os.replace(tmp_path, path)
+        return {}
+
+    def head_object(self, Bucket: str, Key: str):
+        path = self._path(Bucket, Key)
+        if not os.path.exists(path):
+            raise self.NoSuchKey(Key)
+        return {"ContentLength": os.path.getsize(path)}
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None):
+        path = self._path(Bucket, Key)
+        if not os.path.exists(path):
+            raise self.NoSuchKey(Key)
+        start, end = 0, None
+        if Range and Range.startswith("bytes="):
+            first, _, last = Range[len("bytes="):].partition("-")
+            start = int(first) if first else 0
+            end = int(last) if last else None
+        return {"Body": self._Body(path, start, end), "ContentLength": os.path.getsize(path)}
+
+    def delete_object(self, Bucket: str, Key: str):
+        path = self._path(Bucket, Key)
+        if os.path.exists(path):
+            os.remove(path)
+        return {}
+
+
+def _is_not_found(error: Exception) -> bool:
+    """True pentru răspunsul S3 „cheia nu există” (LocalS3Client.NoSuchKey sau ClientError 404 din boto3)"""
+    if isinstance(error, LocalS3Client.NoSuchKey):
+        return True
+    code = str((getattr(error, "response", None) or {}).get("Error", {}).get("Code", ""))
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+class S3BlobStore(BlobStore):
+    """Blob store peste un client compatibil S3 (boto3, MinIO sau LocalS3Client)"""
+
+    def __init__(self, client, bucket: str = BLOB_STORE_S3_BUCKET, prefix: str = BLOB_STORE_S3_PREFIX):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, sha256: str) -> str:
+        return f"{self.prefix}{shard_key(sha256)}"
+
+    def put(self, data: bytes) -> Tuple[str, int]:
+        sha256 = compute_sha256(data)
+        if not self.exists(sha256):
+            self.client.put_object(Bucket=self.bucket, Key=self._key(sha256), Body=data)
+        return sha256, len(data)
+
+    def size(self, sha256: str) -> Optional[int]:
+        try:
+            return int(self.client.head_object(Bucket=self.bucket, Key=self._key(sha256))["ContentLength"])
+        except Exception as e:
+            # Doar „cheia nu există” înseamnă blob absent; erorile de rețea / autentificare se propagă
+            if _is_not_found(e):
+                return None
+            raise
+
+    def exists(self, sha256: str) -> bool:
+        return self.size(sha256) is not None
+
+    def iter_range(self, sha256: str, start: int = 0, end: Optional[int] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        kwargs = {"Bucket": self.bucket, "Key": self._key(sha256)}
+        if start or end is not None:
+            kwargs["Range"] = f"bytes={start}-{'' if end is None else end}"
+        response = self.client.get_object(**kwargs)
+        yield from response["Body"].iter_chunks(chunk_size)
+
+    def delete(self, sha256: str) -> bool:
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(sha256))
+            return True
+        except Exception as e:
+            print(f"⚠️ Eroare la ștergerea blob-ului {sha256}: {e}")
+            return False
+
+
+_blob_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """Returnează blob store-ul configurat (singleton per proces)"""
+    global _blob_store
+    if _blob_store is None:
+        if BLOB_STORE_BACKEND == 's3':
+            try:
+                import boto3
+                client = boto3.client('s3', endpoint_url=BLOB_STORE_S3_ENDPOINT)
+                print(f"✅ Blob store S3: bucket={BLOB_STORE_S3_BUCKET}, endpoint={BLOB_STORE_S3_ENDPOINT or 'AWS'}")
+            except ImportError:
+                print("[WARNING] boto3 nu este instalat. Folosesc înlocuitorul local S3 în " + BLOB_STORE_DIR)
+                client = LocalS3Client(BLOB_STORE_DIR)
+            _blob_store = S3BlobStore(client)
+        else:
+            _blob_store = LocalBlobStore(BLOB_STORE_DIR)
+    return _blob_store
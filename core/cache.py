@@ -1,33 +1,128 @@
-from database import get_client_chat, get_rag_files
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict
+from database import (
+    get_client_chat, get_rag_content_info, get_rag_content_truncated,
+    bump_client_chat_config_version, get_client_chat_config_versions
+)
+from core.config import (
+    RAG_FALLBACK_MAX_CHARS_PER_FILE, RAG_FALLBACK_MAX_TOTAL_CHARS,
+    CONFIG_CACHE_MAX_ENTRIES, CONFIG_CACHE_TTL_SECONDS, CONFIG_CACHE_POLL_SECONDS
+)
 
-# Cache pentru config-uri (se reîncarcă automat când se modifică)
-_config_cache = {}
-_config_cache_timestamps = {}
+# Cache LRU cu TTL pentru config-uri (per proces worker)
+# Conține doar metadate mici - textul fișierelor RAG este citit la cerere prin get_rag_content()
+# Intrări: chat_id -> {"config", "loaded_at", "version", "client_chat_id"}
+_config_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_config_cache_lock = threading.Lock()
 
-def get_cached_config(chat_id: str):
-    """Obține config-ul din cache sau din baza de date"""
-    # Verifică cache-ul
-    if chat_id in _config_cache:
-        return _config_cache[chat_id]
-    
-    # Încarcă din baza de date
+# Încărcări în curs (single-flight): chat_id -> _Flight
+_inflight: Dict[str, "_Flight"] = {}
+
+# Ultima verificare a client_chat.config_version (invalidare între workeri)
+_last_version_poll = 0.0
+
+class LazyRagContent:
+    """
+    View leneș, limitat ca dimensiune, peste conținutul text al fișierelor RAG.
+    Lungimea și valoarea de adevăr vin din metadate (rag_content_info), fără acces la DB;
+    textul este citit abia la prima iterare, trunchiat în SQL per fișier, și doar pentru
+    câte fișiere încap în bugetul total. Nu este păstrat în cache - trăiește cât request-ul.
+    """
+
+    def __init__(self, client_chat_id: int, content_info: list,
+                 max_chars_per_file: int = RAG_FALLBACK_MAX_CHARS_PER_FILE,
+                 max_total_chars: int = RAG_FALLBACK_MAX_TOTAL_CHARS):
+        self.client_chat_id = client_chat_id
+        self.content_info = content_info or []
+        self.max_chars_per_file = max_chars_per_file
+        self.max_total_chars = max_total_chars
+        self._items = None
+
+    def _load(self) -> list:
+        if self._items is None:
+            if not self:
+                self._items = []
+                return self._items
+            # Fiecare fișier adăugat în prompt consumă cel puțin ~50 de caractere din buget
+            max_files = self.max_total_chars // 50 + 1
+            rows = get_rag_content_truncated(self.client_chat_id, self.max_chars_per_file, max_files)
+            items = []
+            total_chars = 0
+            for row in rows:
+                if total_chars >= self.max_total_chars:
+                    break
+                items.append({"filename": row.get("filename", ""), "content": row.get("content") or ""})
+                total_chars += len(items[-1]["content"])
+            self._items = items
+            print(f"📚 RAG content încărcat la cerere pentru {self.client_chat_id}: {len(items)} fișiere, {total_chars} caractere")
+        return self._items
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __getitem__(self, index):
+        return self._load()[index]
+
+    def __len__(self):
+        # Numărul de fișiere cu text util (din metadate, fără citirea textului)
+        return sum(1 for info in self.content_info if info.get("has_content"))
+
+    def __bool__(self):
+        return len(self) > 0
+
+def get_rag_content(config: dict) -> LazyRagContent:
+    """Returnează view-ul leneș peste conținutul RAG pentru un config din cache"""
+    if not config:
+        return LazyRagContent(0, [])
+    return LazyRagContent(int(config.get("tenant_id", 0)), config.get("rag_content_info", []))
+
+class _Flight:
+    """O încărcare din DB în curs, așteptată de toate cererile concurente pentru același chat_id"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.config = None
+
+def _evict_client_chat(client_chat_id: int):
+    """Elimină din cache toate cheile (id, name) care indică spre același chatbot. Apelat cu lock-ul ținut."""
+    for key in [k for k, entry in _config_cache.items() if entry["client_chat_id"] == client_chat_id]:
+        del _config_cache[key]
+
+def _poll_config_versions():
+    """
+    Verifică periodic (cel mult o dată la CONFIG_CACHE_POLL_SECONDS) client_chat.config_version
+    pentru config-urile din cache, cu o singură interogare pe cheia primară, și le elimină pe cele
+    modificate de alt worker. Fără migrarea 003, invalidarea între workeri se bazează doar pe TTL.
+    """
+    global _last_version_poll
+    now = time.monotonic()
+    with _config_cache_lock:
+        if now - _last_version_poll < CONFIG_CACHE_POLL_SECONDS or not _config_cache:
+            return
+        _last_version_poll = now
+        cached_versions = {entry["client_chat_id"]: entry["version"] for entry in _config_cache.values()}
+
+    current_versions = get_client_chat_config_versions(list(cached_versions))
+    if current_versions is None:
+        return
+
+    with _config_cache_lock:
+        for client_chat_id, version in cached_versions.items():
+            if current_versions.get(client_chat_id) != version:
+                _evict_client_chat(client_chat_id)
+
+def _load_config(chat_id: str):
+    """Încarcă config-ul din baza de date (doar metadate)"""
     db_config = get_client_chat(chat_id)
     if not db_config:
         return None
-    
-    # Încarcă conținutul RAG din baza de date
+
+    # Doar metadatele conținutului RAG (lungime / are text) - textul se citește la cerere
     client_chat_id = db_config.get("id")
-    rag_files_db = get_rag_files(client_chat_id, include_content=True)
-    
-    # Construiește rag_content din baza de date
-    rag_content = []
-    for rf in rag_files_db:
-        if rf.get("content"):
-            rag_content.append({
-                "filename": rf.get("file", ""),
-                "content": rf.get("content", "")
-            })
-    
+    rag_content_info = get_rag_content_info(client_chat_id)
+
     # Convertește la formatul așteptat
     config = {
         "name": db_config.get("name", "Chat nou"),
@@ -38,22 +133,75 @@ def get_cached_config(chat_id: str):
         "chat_subtitle": db_config.get("chat_subtitle"),
         "chat_color": db_config.get("chat_color", "#3b82f6"),
         "rag_files": db_config.get("rag_files", []),
-        "rag_content": rag_content,  # Conținutul RAG din baza de date
+        "rag_content_info": rag_content_info,  # Metadate RAG; textul prin get_rag_content(config)
         "institution": db_config.get("institution"),
         "created_at": db_config.get("created_at"),
         "updated_at": db_config.get("updated_at"),
-        "is_active": bool(db_config.get("is_active", True))
+        "is_active": bool(db_config.get("is_active", True)),
+        # Setările salvate pentru chatbot (fără cele implicite); vezi core/tenant_settings.get_tenant_settings
+        "settings": db_config.get("settings") or {}
     }
-    
-    # Salvează în cache
-    _config_cache[chat_id] = config
-    
-    return config
+    # Versiunea citită în același SELECT ca restul config-ului (None dacă migrarea 003 lipsește)
+    return config, client_chat_id, db_config.get("config_version")
+
+def get_cached_config(chat_id: str):
+    """
+    Obține config-ul din cache sau din baza de date.
+    Cache-ul este LRU (CONFIG_CACHE_MAX_ENTRIES), intrările expiră după CONFIG_CACHE_TTL_SECONDS,
+    iar cererile concurente pentru același config ratat din cache împart o singură încărcare din DB.
+    """
+    _poll_config_versions()
+
+    with _config_cache_lock:
+        entry = _config_cache.get(chat_id)
+        if entry and time.monotonic() - entry["loaded_at"] < CONFIG_CACHE_TTL_SECONDS:
+            _config_cache.move_to_end(chat_id)
+            return entry["config"]
+
+        flight = _inflight.get(chat_id)
+        is_leader = flight is None
+        if is_leader:
+            flight = _inflight[chat_id] = _Flight()
+
+    if not is_leader:
+        flight.done.wait()
+        return flight.config
+
+    try:
+        loaded = _load_config(chat_id)
+        if loaded:
+            config, client_chat_id, version = loaded
+            flight.config = config
+            with _config_cache_lock:
+                _config_cache[chat_id] = {
+                    "config": config,
+                    "loaded_at": time.monotonic(),
+                    "version": version,
+                    "client_chat_id": client_chat_id
+                }
+                _config_cache.move_to_end(chat_id)
+                while len(_config_cache) > CONFIG_CACHE_MAX_ENTRIES:
+                    _config_cache.popitem(last=False)
+        return flight.config
+    finally:
+        with _config_cache_lock:
+            _inflight.pop(chat_id, None)
+        flight.done.set()
+
+def get_cached_config_version(chat_id: str):
+    """client_chat.config_version al config-ului din cache (None dacă nu este în cache sau fără migrarea 003)"""
+    with _config_cache_lock:
+        entry = _config_cache.get(chat_id)
+        return entry["version"] if entry else None
 
 def invalidate_config_cache(chat_id: str):
-    """Invalidează cache-ul pentru un chat_id"""
-    if chat_id in _config_cache:
-        del _config_cache[chat_id]
-    if chat_id in _config_cache_timestamps:
-        del _config_cache_timestamps[chat_id]
+    """
+    Invalidează config-ul unui chat_id în acest proces și incrementează client_chat.config_version,
+    astfel încât și ceilalți workeri îl reîncarcă la următorul poll.
+    """
+    with _config_cache_lock:
+        entry = _config_cache.pop(chat_id, None)
+        if entry:
+            _evict_client_chat(entry["client_chat_id"])
 
+    bump_client_chat_config_version(chat_id)
@@ -0,0 +1,109 @@
+"""
+Coalescing pentru generările identice în curs (single-flight pe event loop-ul procesului).
+
+Cererile al căror prompt asamblat complet (model, mesaje cu system prompt-ul final, opțiuni) are
+același hash ca o generare în curs nu mai ajung la Ollama: se abonează la stream-ul ei. Bucățile deja
+emise sunt retrimise de la început, apoi fiecare abonat primește bucățile noi pe măsură ce apar.
+Fiecare cerere își salvează separat răspunsul în conversația ei (routers/chat.py).
+"""
+import asyncio
+import hashlib
+import json
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+# Statistici per proces: generări pornite și cereri servite din generarea altei cereri
+_stats = {"generations": 0, "coalesced": 0}
+
+
+class _Broadcast:
+    """O generare în curs: bucățile emise până acum și abonații care le citesc"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: str):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self):
+        self.done = True
+        self._notify()
+
+    def _notify(self):
+        # Fiecare schimbare trezește abonații care așteaptă evenimentul curent; cei noi așteaptă unul nou
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """Bucățile generării de la început (replay), apoi cele noi, până la final"""
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                changed = self._changed
+                while index < len(self.chunks):
+                    yield self.chunks[index]
+                    index += 1
+                if self.done:
+                    return
+                if changed is self._changed:
+                    await changed.wait()
+        finally:
+            self.subscribers -= 1
+            # Toți clienții s-au deconectat: generarea nu mai este necesară
+            if self.subscribers == 0 and not self.done and self.task:
+                self.task.cancel()
+
+
+_inflight: Dict[str, _Broadcast] = {}
+
+
+def prompt_key(model: str, messages: list, options: dict) -> str:
+    """Hash-ul prompt-ului asamblat complet (aceleași intrări = același răspuns așteptat)"""
+    encoded = json.dumps({"model": model, "messages": messages, "options": options},
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+async def _produce(key: str, broadcast: _Broadcast, generate: Callable[[], AsyncIterator[str]]):
+    try:
+        async for chunk in generate():
+            broadcast.publish(chunk)
+    except asyncio.CancelledError:
+        print(f"⚠️ Generare oprită (toți clienții s-au deconectat): {key[:12]}")
+    except Exception as e:
+        print(f"❌ Eroare în generarea partajată {key[:12]}: {e}")
+        if not broadcast.chunks:
+            broadcast.publish(f"Eroare: Generarea răspunsului a eșuat ({str(e)}).")
+    finally:
+        # Cererile care sosesc de acum pornesc o generare nouă
+        if _inflight.get(key) is broadcast:
+            del _inflight[key]
+        broadcast.finish()
+
+
+async def coalesced_stream(key: str, generate: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+    """
+    Stream-ul generării pentru key: prima cerere pornește generate() într-un task separat (continuă
+    și dacă acest client se deconectează, cât timp mai există abonați), următoarele se abonează la el.
+    """
+    broadcast = _inflight.get(key)
+    if broadcast is None:
+        broadcast = _inflight[key] = _Broadcast()
+        broadcast.task = asyncio.ensure_future(_produce(key, broadcast, generate))
+        _stats["generations"] += 1
+    else:
+        _stats["coalesced"] += 1
+        print(f"🔗 Cerere identică cu o generare în curs ({key[:12]}): abonat la stream "
+              f"({len(broadcast.chunks)} bucăți deja emise, {broadcast.subscribers} abonați)")
+    async for chunk in broadcast.subscribe():
+        yield chunk
+
+
+def coalescing_stats() -> Dict[str, int]:
+    """Generări pornite, cereri servite din generări în curs și generările în curs acum"""
+    return {**_stats, "inflight": len(_inflight)}
@@ -22,13 +22,51 @@ JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS', str(24 * 7)))  # De
 MAX_CONTEXT_CHARS = int(os.getenv('MAX_CONTEXT_CHARS', '32000'))  # ~8000 tokens (ajustabil in functie de model)
 CONTEXT_RESERVE = int(os.getenv('CONTEXT_RESERVE', '2000'))  # Rezerva pentru system prompt si mesajul curent
 
-# Verifica disponibilitatea PDF
-try:
-    import PyPDF2
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
-    print("[WARNING] PyPDF2 nu este instalat. Ruleaza: pip install PyPDF2")
+# Limite pentru continutul RAG folosit direct in prompt (cand cautarea vectoriala nu gaseste nimic)
+RAG_FALLBACK_MAX_CHARS_PER_FILE = int(os.getenv('RAG_FALLBACK_MAX_CHARS_PER_FILE', '5000'))
+RAG_FALLBACK_MAX_TOTAL_CHARS = int(os.getenv('RAG_FALLBACK_MAX_TOTAL_CHARS', '15000'))
+
+# Contextul RAG din prompt (core/context_packer.py; si per tenant in client_chat.settings)
+RAG_CONTEXT_TOKENS = int(os.getenv('RAG_CONTEXT_TOKENS', '2500'))  # Bugetul sectiunii de documente (tokens aproximativi)
+RAG_MIN_SCORE = float(os.getenv('RAG_MIN_SCORE', '0.3'))  # Rezultatele cu similaritate sub prag nu intra in prompt
+RAG_TOP_K = int(os.getenv('RAG_TOP_K', '8'))  # Rezultate cerute vector store-ului, din care se umple bugetul
+
+# Cache semantic de raspunsuri (core/answer_cache.py; optional, si per tenant in client_chat.settings)
+ANSWER_CACHE_ENABLED = os.getenv('ANSWER_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+ANSWER_CACHE_THRESHOLD = float(os.getenv('ANSWER_CACHE_THRESHOLD', '0.93'))  # Similaritatea minima intre intrebari
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv('ANSWER_CACHE_TTL_SECONDS', '86400'))  # Un raspuns este refolosit cel mult atat
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '500'))  # LRU per tenant (per proces worker)
+
+# Cererile identice in curs (acelasi prompt asamblat, acelasi model) impart o singura generare Ollama (core/coalescing.py)
+REQUEST_COALESCING = os.getenv('REQUEST_COALESCING', 'true').lower() in ('1', 'true', 'yes')
+
+# Modelele Ollama tinute incarcate (core/model_warmup.py): modelele chatbot-urilor active + EMBEDDING_MODEL
+MODEL_WARMUP_ENABLED = os.getenv('MODEL_WARMUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+MODEL_PING_SECONDS = float(os.getenv('MODEL_PING_SECONDS', '240'))  # Verificare / reincarcare periodica
+
+
+def parse_keep_alive(value: str):
+    """keep_alive pentru Ollama: durata ("30m", "2h") sau secunde ("600", "-1" = mereu incarcat)"""
+    value = (value or '').strip()
+    try:
+        return int(value)
+    except ValueError:
+        return value or None
+
+
+# Cat ramane un model incarcat in Ollama dupa ultima cerere (trimis la fiecare cerere de chat / embeddings)
+MODEL_KEEP_ALIVE = parse_keep_alive(os.getenv('MODEL_KEEP_ALIVE', '30m'))
+
+# Cache pentru config-urile chatbot-urilor (per proces worker)
+CONFIG_CACHE_MAX_ENTRIES = int(os.getenv('CONFIG_CACHE_MAX_ENTRIES', '256'))  # LRU
+CONFIG_CACHE_TTL_SECONDS = float(os.getenv('CONFIG_CACHE_TTL_SECONDS', '300'))  # Reincarcare fortata dupa TTL
+CONFIG_CACHE_POLL_SECONDS = float(os.getenv('CONFIG_CACHE_POLL_SECONDS', '2'))  # Verificare client_chat.config_version (invalidare intre workeri)
+
+# Verifica disponibilitatea PDF (PyMuPDF sau PyPDF2, vezi core/pdf_text.py)
+from core.pdf_text import PYMUPDF_AVAILABLE, PYPDF2_AVAILABLE
+PDF_AVAILABLE = PYMUPDF_AVAILABLE or PYPDF2_AVAILABLE
+if not PDF_AVAILABLE:
+    print("[WARNING] Nici PyMuPDF, nici PyPDF2 nu sunt instalate. Ruleaza: pip install pymupdf")
 
 # Verifica disponibilitatea pdf2image si Poppler
 PDF2IMAGE_AVAILABLE = False
@@ -0,0 +1,124 @@
+"""
+Împachetarea contextului RAG în prompt pe un buget de tokens.
+
+Rezultatele căutării sunt filtrate după scor (sub prag nu intră în prompt), chunk-urile vecine
+din același fișier sunt unite, iar bugetul este umplut în ordinea scorului: un rezultat care nu
+mai încape este trunchiat (dacă mai rămâne loc util) sau sărit în favoarea unuia mai scurt.
+Raportul (tokens per secțiune) face dimensiunea prompt-ului previzibilă.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional
+from rag_manager import merge_chunk_texts
+from core.conversation import estimate_tokens
+
+# Sub acest număr de tokens rămași, un rezultat nu mai este trunchiat ca să încapă
+_MIN_PARTIAL_TOKENS = 100
+# Cuvintele query-ului folosite la ordonarea conținutului fallback (fără vector store), comparate
+# după primele litere (formele flexionare ale aceluiași cuvânt: impozit / impozitul / impozitele)
+_WORD_RE = re.compile(r"\w{3,}", re.UNICODE)
+_WORD_PREFIX = 5
+
+
+def _word_stems(text: str) -> set:
+    return {word.lower()[:_WORD_PREFIX] for word in _WORD_RE.findall(text)}
+
+
+def _section_text(filename: str, content: str) -> str:
+    return f"\n--- {filename} ---\n{content}"
+
+
+def _truncate(content: str, max_chars: int) -> str:
+    """Trunchiază la max_chars, de preferință la un sfârșit de paragraf / propoziție"""
+    if len(content) <= max_chars:
+        return content
+    cut = content[:max_chars]
+    for separator in ("\n\n", "\n", ". "):
+        position = cut.rfind(separator)
+        if position > max_chars // 2:
+            return cut[:position + len(separator)].rstrip() + " [...]"
+    return cut.rstrip() + " [...]"
+
+
+def merge_adjacent_hits(hits: List[Dict]) -> List[Dict]:
+    """
+    Unește rezultatele din același fișier ale căror chunk-uri sunt consecutive (un rezultat acoperă
+    chunk_index ... chunk_index + chunk_count - 1); scorul rezultatului unit este cel maxim.
+    """
+    by_file: Dict[str, List[Dict]] = {}
+    for hit in hits:
+        by_file.setdefault(hit["filename"], []).append(dict(hit))
+    merged = []
+    for file_hits in by_file.values():
+        file_hits.sort(key=lambda hit: hit.get("chunk_index", 0))
+        current = file_hits[0]
+        for hit in file_hits[1:]:
+            current_end = current.get("chunk_index", 0) + current.get("chunk_count", 1)
+            if hit.get("chunk_index", 0) == current_end:
+                current["content"] = merge_chunk_texts(current["content"], hit["content"])
+                current["chunk_count"] = current.get("chunk_count", 1) + hit.get("chunk_count", 1)
+                current["score"] = max(current["score"], hit["score"])
+            else:
+                merged.append(current)
+                current = hit
+        merged.append(current)
+    return merged
+
+
+def pack_rag_context(hits: Iterable[Dict], budget_tokens: int, min_score: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Umple bugetul de tokens cu rezultatele ({filename, content, score, ...}) în ordinea scorului.
+    Returnează {"text", "tokens", "budget", "sections": [{filename, score, tokens, truncated}],
+    "dropped_low_score", "dropped_budget"}.
+    """
+    hits = [hit for hit in hits if hit.get("content", "").strip()]
+    relevant = [hit for hit in hits if min_score is None or hit["score"] >= min_score]
+    report: Dict[str, Any] = {
+        "text": "", "tokens": 0, "budget": budget_tokens, "sections": [],
+        "dropped_low_score": len(hits) - len(relevant), "dropped_budget": 0
+    }
+    parts = []
+    for hit in sorted(merge_adjacent_hits(relevant) if relevant else [], key=lambda hit: hit["score"], reverse=True):
+        remaining = budget_tokens - report["tokens"]
+        text = _section_text(hit["filename"], hit["content"])
+        tokens = estimate_tokens(text)
+        truncated = False
+        if tokens > remaining:
+            if remaining < _MIN_PARTIAL_TOKENS:
+                report["dropped_budget"] += 1
+                continue
+            # ~4 caractere per token (core.conversation.estimate_tokens), minus antetul secțiunii
+            max_chars = remaining * 4 - len(_section_text(hit["filename"], "")) - len(" [...]")
+            text = _section_text(hit["filename"], _truncate(hit["content"], max_chars))
+            tokens = estimate_tokens(text)
+            truncated = True
+        parts.append(text)
+        report["tokens"] += tokens
+        report["sections"].append({
+            "filename": hit["filename"],
+            "score": round(float(hit["score"]), 3),
+            "tokens": tokens,
+            "truncated": truncated
+        })
+    report["text"] = "\n".join(parts)
+    return report
+
+
+def score_fallback_content(items: Iterable[Dict], query: Optional[str]) -> List[Dict]:
+    """
+    Conținutul RAG folosit fără vector store ({filename, content}), cu un scor lexical față de
+    query (fracțiunea cuvintelor din query prezente în text), ca bugetul să fie umplut întâi cu
+    fișierele relevante, nu în ordinea încărcării. Fără query, ordinea încărcării se păstrează.
+    """
+    words = _word_stems(query or "")
+    scored = []
+    for position, item in enumerate(items):
+        content = (item.get("content") or "").strip()
+        if not content:
+            continue
+        if words:
+            present = _word_stems(content)
+            score = len(words & present) / len(words)
+        else:
+            score = 1.0 - position * 1e-6
+        scored.append({"filename": item.get("filename", "document"), "content": content, "score": score})
+    return scored
@@ -0,0 +1,209 @@
+"""
+Răspunsuri HTTP pentru descărcarea fișierelor în flux:
+detectarea tipului de conținut, ETag / Last-Modified, GET condiționat (304) și Range (206).
+"""
+import hashlib
+import mimetypes
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Iterator, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response, StreamingResponse
+
+# Câți octeți de la începutul fișierului sunt citiți pentru detectarea tipului
+SNIFF_BYTES = 16
+
+# (semnătură, offset, tip MIME)
+_MAGIC_SIGNATURES = [
+    (b"%PDF-", 0, "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", 0, "image/png"),
+    (b"\xff\xd8\xff", 0, "image/jpeg"),
+    (b"GIF87a", 0, "image/gif"),
+    (b"GIF89a", 0, "image/gif"),
+    (b"II*\x00", 0, "image/tiff"),
+    (b"MM\x00*", 0, "image/tiff"),
+    (b"BM", 0, "image/bmp"),
+    (b"WEBP", 8, "image/webp"),
+]
+
+# Containere generice - tipul exact se deduce din extensie (docx/xlsx/pptx, doc/xls)
+_ZIP_SIGNATURE = b"PK\x03\x04"
+_OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+RangeReader = Callable[[int, Optional[int]], Iterator[bytes]]
+
+
+def detect_content_type(filename: str, head: bytes = b"") -> str:
+    """
+    Detectează tipul de conținut după primii octeți (semnătură) și, ca rezervă, după extensie.
+    Semnătura are prioritate: un fișier numit .pdf care nu începe cu %PDF- nu este servit ca PDF.
+    """
+    guessed, _ = mimetypes.guess_type(filename or "")
+
+    for signature, offset, mime in _MAGIC_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return mime
+    if head.startswith(_ZIP_SIGNATURE):
+        return guessed if guessed and guessed.startswith("application/vnd.openxmlformats") else "application/zip"
+    if head.startswith(_OLE_SIGNATURE):
+        return guessed if guessed in ("application/msword", "application/vnd.ms-excel", "application/vnd.ms-powerpoint") else "application/x-ole-storage"
+
+    if guessed:
+        return guessed
+    if head:
+        try:
+            head.decode("utf-8")
+            return "text/plain; charset=utf-8"
+        except UnicodeDecodeError:
+            pass
+    return "application/octet-stream"
+
+
+def make_etag(sha256: Optional[str] = None, *parts) -> str:
+    """
+    ETag puternic din hash-ul conținutului (blob store) sau, pentru fișierele fără hash,
+    ETag slab derivat din metadate (id, dimensiune, data încărcării).
+    """
+    if sha256:
+        return f'"{sha256}"'
+    digest = hashlib.md5("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Datele din MySQL sunt naive - le tratăm ca UTC, important este doar să fie consecvente
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    """Formatează o dată pentru header-ele HTTP (Last-Modified)"""
+    return format_datetime(_as_utc(value).replace(microsecond=0), usegmt=True)
+
+
+def _etag_matches(header_value: str, etag: str) -> bool:
+    """Comparație slabă (RFC 7232) între If-None-Match / If-Range și ETag-ul curent"""
+    if header_value.strip() == "*":
+        return True
+    current = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header_value.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        return _as_utc(parsedate_to_datetime(value))
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def is_not_modified(request_headers: Mapping[str, str], etag: Optional[str],
+                    last_modified: Optional[datetime]) -> bool:
+    """GET condiționat: If-None-Match are prioritate față de If-Modified-Since"""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return bool(etag) and _etag_matches(if_none_match, etag)
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        since = _parse_http_date(if_modified_since)
+        if since is not None:
+            return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parsează header-ul HTTP Range (doar un singur interval, ex: bytes=0-1023, bytes=500-, bytes=-500).
+    Returnează (start, end) inclusiv, None dacă header-ul lipsește/este invalid (se servește tot fișierul),
+    sau ridică 416 dacă intervalul este în afara fișierului.
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].split(",")[0].strip()
+    first, _, last = spec.partition("-")
+    try:
+        if first == "":
+            # Sufix: ultimii N octeți
+            length = int(last)
+            if length <= 0:
+                return None
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Range Not Satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """Content-Disposition compatibil cu nume de fișiere non-ASCII (diacritice) - RFC 6266 / 5987"""
+    ascii_name = filename.encode("ascii", "replace").decode("ascii").replace("?", "_").replace('"', "'")
+    if ascii_name == filename:
+        return f'{disposition}; filename="{filename}"'
+    return f"{disposition}; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def stream_file_response(read_range: RangeReader, size: int, filename: str,
+                         request_headers: Optional[Mapping[str, str]] = None,
+                         etag: Optional[str] = None, last_modified: Optional[datetime] = None,
+                         media_type: Optional[str] = None) -> Response:
+    """
+    Construiește răspunsul pentru descărcarea unui fișier citit în flux prin read_range(start, end).
+    - 304 dacă clientul are deja versiunea curentă (If-None-Match / If-Modified-Since)
+    - 206 pentru Range (respectând If-Range), 200 altfel
+    - tipul de conținut este detectat din primii octeți dacă media_type nu este dat
+    request_headers=None dezactivează GET-ul condiționat și Range (ex: endpoint-uri POST).
+    """
+    request_headers = request_headers or {}
+    headers = {"Cache-Control": "private, no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+
+    if is_not_modified(request_headers, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if media_type is None:
+        head = b"".join(read_range(0, min(SNIFF_BYTES, size) - 1)) if size > 0 else b""
+        media_type = detect_content_type(filename, head)
+
+    headers["Content-Disposition"] = content_disposition(filename)
+    headers["Accept-Ranges"] = "bytes"
+
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if range_header and if_range and not (etag and _etag_matches(if_range, etag) and not etag.startswith("W/")):
+        # Fișierul s-a schimbat de la descărcarea parțială anterioară - se trimite complet
+        range_header = None
+
+    byte_range = parse_range_header(range_header, size)
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            read_range(start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers
+        )
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(read_range(0, None), media_type=media_type, headers=headers)
@@ -0,0 +1,437 @@
+"""
+Pipeline comun de ingestie a documentelor (upload RAG, re-procesare RAG, builder, extragere PDF).
+
+Etape, legate în flux (fiecare pagină trece mai departe imediat ce este gata):
+1. sniff: tipul documentului după conținut (semnătura fișierului), cu extensia ca rezervă
+2. extract: text per pagină - stratul de text PDF prin core.pdf_text, paginile scanate și imaginile
+   prin OCR pe pool-ul de procese (ocr_processor.worker_pool), TXT/MD/DOCX direct
+3. normalize: Unicode NFC, diacritice românești corecte (ș/ț cu virgulă), spații și linii goale
+4. chunk: ferestre de INGEST_CHUNK_SIZE caractere cu suprapunere INGEST_CHUNK_OVERLAP
+5. embed: embeddings Ollama, cel mult INGEST_EMBED_CONCURRENCY cereri simultane
+
+Fiecare etapă are concurență limitată, iar între extragere și embeddings este o coadă de cel mult
+INGEST_QUEUE_SIZE chunk-uri: OCR-ul paginilor următoare continuă cât timp se calculează embeddings
+pentru cele deja extrase, fără ca un document mare să fie ținut întreg în memorie de două ori.
+"""
+import asyncio
+import functools
+import io
+import os
+import re
+import unicodedata
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Configurare din variabile de mediu
+INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', '1000'))
+INGEST_CHUNK_OVERLAP = int(os.getenv('INGEST_CHUNK_OVERLAP', '200'))
+INGEST_EMBED_CONCURRENCY = max(1, int(os.getenv('INGEST_EMBED_CONCURRENCY', '4')))
+INGEST_NORMALIZE_CONCURRENCY = max(1, int(os.getenv('INGEST_NORMALIZE_CONCURRENCY', '2')))
+INGEST_QUEUE_SIZE = max(1, int(os.getenv('INGEST_QUEUE_SIZE', '16')))
+INGEST_OCR_DPI = int(os.getenv('INGEST_OCR_DPI', '150'))
+
+# Tipurile de documente suportate
+TEXT_EXTENSIONS = ('.txt', '.md')
+DOCX_EXTENSIONS = ('.doc', '.docx')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.webp')
+
+# Rulează OCR pe paginile primite (vezi ocr_processor.pdf_hybrid.OCRRunner), cu numele motorului
+NamedOCRRunner = Tuple[str, Callable]
+# Apelat după fiecare pagină extrasă / chunk procesat: {"stage", "pages_done", "chunks_done", ...}
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+def sniff_document_type(filename: Optional[str], data: bytes) -> Optional[str]:
+    """
+    Tipul documentului: "pdf", "docx", "image", "text" sau None (nesuportat).
+    Semnătura conținutului are prioritate (ex: un PDF salvat cu extensia greșită), apoi extensia.
+    """
+    head = data[:16]
+    name = (filename or "").lower()
+    if head.startswith(b'%PDF'):
+        return "pdf"
+    if head.startswith((b'\x89PNG', b'\xff\xd8\xff', b'II*\x00', b'MM\x00*', b'BM')) or head[8:12] == b'WEBP':
+        return "image"
+    if head.startswith(b'PK\x03\x04') and (name.endswith(DOCX_EXTENSIONS) or b'word/' in data[:4096]):
+        return "docx"
+    if name.endswith('.pdf'):
+        return "pdf"
+    if name.endswith(DOCX_EXTENSIONS):
+        return "docx"
+    if name.endswith(IMAGE_EXTENSIONS):
+        return "image"
+    if name.endswith(TEXT_EXTENSIONS):
+        return "text"
+    return None
+
+
+def _decode_text(data: bytes) -> str:
+    """Text UTF-8, cu latin-1 ca rezervă"""
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        print("⚠️ Eroare encoding UTF-8, încerc latin-1...")
+        return data.decode('latin-1')
+
+
+def _docx_text(data: bytes) -> str:
+    """Paragrafele și rândurile tabelelor (celule separate prin " | ") dintr-un DOCX"""
+    try:
+        from docx import Document
+    except ImportError:
+        print("⚠️ python-docx nu este instalat. Pentru DOC/DOCX, rulează: pip install python-docx")
+        return "[Fișier DOC/DOCX - instalează python-docx pentru extragere: pip install python-docx]"
+    doc = Document(io.BytesIO(data))
+    text = ""
+    for para in doc.paragraphs:
+        if para.text.strip():
+            text += para.text + "\n"
+    # Extrage și din tabele
+    for table in doc.tables:
+        for row in table.rows:
+            row_text = " | ".join([cell.text.strip() for cell in row.cells])
+            if row_text.strip():
+                text += row_text + "\n"
+    return text
+
+
+def default_ocr_runners(pdf_bytes: bytes) -> List[NamedOCRRunner]:
+    """PaddleOCR pe pool-ul de procese, dacă OCR-ul și rasterizarea sunt disponibile"""
+    try:
+        from ocr_processor.pdf_pages import RASTERIZE_AVAILABLE
+        from ocr_processor.processor import PADDLEOCR_AVAILABLE, OPENCV_AVAILABLE
+        from ocr_processor.pdf_hybrid import paddle_ocr_runner
+    except ImportError:
+        return []
+    if not (RASTERIZE_AVAILABLE and PADDLEOCR_AVAILABLE and OPENCV_AVAILABLE):
+        return []
+    return [("paddleocr", paddle_ocr_runner(pdf_bytes, lang='ro', dpi=INGEST_OCR_DPI))]
+
+
+async def _async_iter(items: List[int]) -> AsyncIterator[int]:
+    """Lista de pagini ca iterator asincron, forma primită de motoarele OCR (OCRRunner)"""
+    for item in items:
+        yield item
+
+
+async def _pdf_pages(
+    pdf_bytes: bytes,
+    max_pages: Optional[int],
+    layout: bool,
+    ocr_runners: List[NamedOCRRunner]
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Extragerea hibridă a unui PDF: paginile cu strat de text direct, paginile scanate prin primul
+    motor OCR; paginile la care acesta nu găsește text sunt reîncercate cu următorul motor.
+    Yields: rezultatele per pagină, în ordine (vezi ocr_processor.pdf_hybrid.hybrid_pdf_pages).
+    """
+    from ocr_processor.pdf_hybrid import hybrid_pdf_pages
+
+    method, run_ocr = ocr_runners[0] if ocr_runners else (None, None)
+    retry = []
+    async for page in hybrid_pdf_pages(pdf_bytes, 1, max_pages, run_ocr=run_ocr, ocr_method=method, layout=layout):
+        if page["kind"] == "image" and len(ocr_runners) > 1 and not page["text"].strip():
+            # Reîncercat cu următorul motor OCR după prima trecere
+            retry.append(page)
+            continue
+        if retry:
+            # Păstrează ordinea paginilor: după prima pagină de reîncercat, totul așteaptă fallback-ul
+            retry.append(page)
+            continue
+        yield page
+
+    if not retry:
+        return
+    fallback_method, fallback_ocr = ocr_runners[1]
+    failed = [page["page"] for page in retry if page["kind"] == "image" and not page["text"].strip()]
+    print(f"⚠️ {method} nu a extras text din paginile {failed}, încerc cu {fallback_method}...")
+    fallback = {}
+    async for result in fallback_ocr(_async_iter(failed)):
+        fallback[result["page"]] = result
+    for page in retry:
+        result = fallback.get(page["page"])
+        if result is not None and (result["text"] or not page.get("error")):
+            page = {**page, "text": result["text"], "method": fallback_method}
+            page.pop("error", None)
+            if result.get("error"):
+                page["error"] = result["error"]
+        yield page
+
+
+async def _image_pages(data: bytes) -> AsyncIterator[Dict[str, Any]]:
+    """OCR pe o imagine (o singură „pagină”), pe pool-ul de procese OCR"""
+    page = {"page": 1, "kind": "image", "text": "", "method": None}
+    try:
+        from PIL import Image
+        from ocr_processor.processor import PADDLEOCR_AVAILABLE, OPENCV_AVAILABLE
+        from ocr_processor.worker_pool import ocr_pages
+    except ImportError:
+        yield page
+        return
+    if not (PADDLEOCR_AVAILABLE and OPENCV_AVAILABLE):
+        yield page
+        return
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    async for result in ocr_pages([(1, image)], 'ro'):
+        page.update(text=result.get("text") or "", method="paddleocr")
+        if result.get("error"):
+            page["error"] = result["error"]
+    yield page
+
+
+async def extract_pages(
+    data: bytes,
+    kind: str,
+    max_pages: Optional[int] = None,
+    layout: bool = False,
+    ocr_runners: Optional[List[NamedOCRRunner]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Etapa de extragere: textul documentului, pagină cu pagină, în ordine.
+
+    Args:
+        kind: Tipul documentului (vezi sniff_document_type)
+        max_pages: Numărul maxim de pagini PDF (None = toate)
+        layout: Păstrează așezarea textului din paginile PDF (formulare)
+        ocr_runners: Motoarele OCR pentru paginile scanate, în ordinea preferinței;
+            None = default_ocr_runners, [] = fără OCR
+
+    Yields:
+        {"page", "kind", "text", "method", ["error"], ...}
+    """
+    if kind == "pdf":
+        runners = default_ocr_runners(data) if ocr_runners is None else ocr_runners
+        async for page in _pdf_pages(data, max_pages, layout, runners):
+            yield page
+    elif kind == "image":
+        if ocr_runners == []:
+            yield {"page": 1, "kind": "image", "text": "", "method": None}
+            return
+        async for page in _image_pages(data):
+            yield page
+    elif kind in ("text", "docx"):
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(None, _decode_text if kind == "text" else _docx_text, data)
+        yield {"page": 1, "kind": "text", "text": text, "method": "direct"}
+
+
+# Diacriticele cu sedilă (codificări vechi) înlocuite cu forma corectă, cu virgulă
+_DIACRITICS = str.maketrans({'ş': 'ș', 'Ş': 'Ș', 'ţ': 'ț', 'Ţ': 'Ț', '\u00ad': None, '\ufb01': 'fi', '\ufb02': 'fl'})
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+
+
+def normalize_text(text: str, layout: bool = False) -> str:
+    """
+    Normalizează textul extras: NFC, ș/ț cu virgulă, fără caractere de control sau cratime moi,
+    spațiile repetate comprimate (păstrate în modul layout) și cel mult o linie goală consecutivă.
+    """
+    text = unicodedata.normalize('NFC', text.replace('\r\n', '\n').replace('\r', '\n'))
+    text = _CONTROL_CHARS.sub('', text.translate(_DIACRITICS))
+    if not layout:
+        text = re.sub(r'[ \t\u00a0]+', ' ', text)
+    text = re.sub(r'[ \t]+\n', '\n', text)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+class TextChunker:
+    """
+    Împarte în flux textul unui document în chunk-uri de chunk_size caractere cu suprapunere
+    overlap, ca TenantRAGStore._chunk_text aplicat pe textul întreg (fără chunk-ul final redundant,
+    conținut integral în cel precedent).
+    """
+
+    def __init__(self, chunk_size: int = INGEST_CHUNK_SIZE, overlap: int = INGEST_CHUNK_OVERLAP):
+        self.chunk_size = chunk_size
+        self.step = max(1, chunk_size - overlap)
+        self._buffer = ""
+
+    def feed(self, text: str) -> Iterator[str]:
+        """Adaugă text; produce chunk-urile complete"""
+        self._buffer += text
+        while len(self._buffer) > self.chunk_size:
+            yield self._buffer[:self.chunk_size]
+            self._buffer = self._buffer[self.step:]
+
+    def flush(self) -> Iterator[str]:
+        """Restul textului, la finalul documentului"""
+        if self._buffer.strip():
+            yield self._buffer.rstrip()
+        self._buffer = ""
+
+
+async def bounded_map(items: AsyncIterator[Any], func: Callable[[Any], Any], concurrency: int) -> AsyncIterator[Any]:
+    """
+    Aplică func (blocantă) pe fiecare element, pe thread pool, cu cel mult `concurrency` apeluri
+    în lucru simultan; rezultatele sunt produse în ordinea elementelor.
+    """
+    loop = asyncio.get_running_loop()
+    in_flight: deque = deque()
+    try:
+        async for item in items:
+            in_flight.append(loop.run_in_executor(None, func, item))
+            if len(in_flight) >= concurrency:
+                yield await in_flight.popleft()
+        while in_flight:
+            yield await in_flight.popleft()
+    finally:
+        # La o eroare sau oprire: apelurile rămase nu mai sunt așteptate (nici erorile lor)
+        for future in in_flight:
+            if future.done() and not future.cancelled():
+                future.exception()
+            else:
+                future.cancel()
+
+
+async def prefetch(items: AsyncIterator[Any], maxsize: int = INGEST_QUEUE_SIZE) -> AsyncIterator[Any]:
+    """
+    Rulează etapele din amonte (items) într-un task separat, cu o coadă de cel mult maxsize
+    elemente, ca să continue în paralel cu etapa din aval.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    done = object()
+
+    async def produce():
+        try:
+            async for item in items:
+                await queue.put(item)
+        except Exception as e:
+            await queue.put(e)
+        await queue.put(done)
+
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def _pdf_page_count(data: bytes) -> int:
+    from core.pdf_text import open_pdf_text
+    with open_pdf_text(data) as pdf:
+        return pdf.page_count
+
+
+def _page_header(page: Dict[str, Any], kind: str) -> str:
+    return f"\n--- Pagina {page['page']} ---\n" if kind == "pdf" else ""
+
+
+async def ingest_document(
+    filename: str,
+    data: bytes,
+    layout: bool = False,
+    max_pages: Optional[int] = None,
+    embed: bool = True,
+    ocr_runners: Optional[List[NamedOCRRunner]] = None,
+    rag_store=None,
+    on_progress: Optional[ProgressCallback] = None,
+    embed_func: Optional[Callable[[str], List[float]]] = None,
+    kind: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Rulează pipeline-ul complet pe un document.
+
+    Args:
+        filename: Numele fișierului (tipul este detectat din conținut, cu extensia ca rezervă)
+        layout: Păstrează așezarea textului din paginile PDF (formulare)
+        max_pages: Numărul maxim de pagini PDF (None = toate)
+        embed: Calculează embeddings pentru chunk-uri (False = doar extragere + normalizare)
+        ocr_runners: Motoarele OCR (vezi extract_pages)
+        rag_store: Dacă este dat (TenantRAGStore), documentul este înlocuit în store doar după ce
+            toate chunk-urile au embeddings (căutările nu văd niciodată un document parțial)
+        on_progress: Apelat după fiecare pagină extrasă și fiecare chunk cu embedding
+        embed_func: Funcția de embedding (implicit rag_manager.get_embedding cu modelul store-ului, cu fallback hash;
+            jobs-urile RAG folosesc varianta strictă, cu reîncercări)
+        kind: Tipul documentului, dacă este deja cunoscut (ex: "text" pentru textul extras salvat
+            în baza de date, reindexat fără o nouă extragere); implicit detectat cu sniff_document_type
+
+    Returns:
+        {"filename", "type", "text", "pages", "page_kinds", "ocr_pages", "methods",
+         "chunks", "embeddings", "errors"}
+    """
+    kind = kind or sniff_document_type(filename, data)
+    result: Dict[str, Any] = {
+        "filename": filename, "type": kind, "text": "", "pages": 0,
+        "page_kinds": {"text": 0, "image": 0, "empty": 0}, "ocr_pages": [], "methods": [],
+        "chunks": [], "embeddings": [], "errors": []
+    }
+    if kind is None:
+        print(f"⚠️ Tip de fișier necunoscut: {filename}")
+        return result
+
+    progress = {"stage": "extract", "pages_total": None, "pages_done": 0, "chunks_done": 0}
+    text_parts: List[str] = []
+    chunker = TextChunker()
+    loop = asyncio.get_running_loop()
+
+    def report(**changes):
+        progress.update(changes)
+        if on_progress is not None:
+            on_progress(dict(progress))
+
+    def normalize_page(page: Dict[str, Any]) -> Dict[str, Any]:
+        return {**page, "text": normalize_text(page.get("text") or "", layout)}
+
+    async def chunks() -> AsyncIterator[str]:
+        pages = extract_pages(data, kind, max_pages, layout, ocr_runners)
+        async for page in bounded_map(pages, normalize_page, INGEST_NORMALIZE_CONCURRENCY):
+            result["pages"] += 1
+            page_kind = page.get("kind", "text")
+            result["page_kinds"][page_kind] = result["page_kinds"].get(page_kind, 0) + 1
+            if page_kind == "image":
+                result["ocr_pages"].append(page["page"])
+            if page.get("error"):
+                result["errors"].append({"page": page["page"], "error": page["error"]})
+            if page.get("method") and page["method"] not in result["methods"]:
+                result["methods"].append(page["method"])
+            report(pages_done=result["pages"])
+            if not page["text"]:
+                continue
+            piece = _page_header(page, kind) + page["text"] + ("\n" if kind == "pdf" else "")
+            if not text_parts:
+                piece = piece.lstrip("\n")
+            text_parts.append(piece)
+            for chunk in chunker.feed(piece):
+                yield chunk
+        for chunk in chunker.flush():
+            yield chunk
+
+    if kind == "pdf":
+        try:
+            total = await loop.run_in_executor(None, _pdf_page_count, data)
+            progress["pages_total"] = min(total, max_pages) if max_pages else total
+        except Exception as e:
+            print(f"⚠️ Numărul de pagini al {filename} nu poate fi citit: {e}")
+
+    store_model = rag_store.model if rag_store is not None else None
+    if embed:
+        if embed_func is None:
+            from rag_manager import get_embedding
+            embed_func = functools.partial(get_embedding, model=store_model)
+
+        async def remember(stream: AsyncIterator[str]) -> AsyncIterator[str]:
+            async for chunk in stream:
+                result["chunks"].append(chunk)
+                yield chunk
+
+        report(stage="embed")
+        async for embedding in bounded_map(remember(prefetch(chunks())), embed_func, INGEST_EMBED_CONCURRENCY):
+            result["embeddings"].append(embedding)
+            report(chunks_done=len(result["embeddings"]))
+    else:
+        async for chunk in chunks():
+            result["chunks"].append(chunk)
+
+    result["text"] = "".join(text_parts).strip()
+    if rag_store is not None and embed and result["chunks"]:
+        await loop.run_in_executor(None, rag_store.add_chunks, filename, result["chunks"], result["embeddings"], store_model)
+    report(stage="done")
+    print(f"✅ Ingestie {filename} ({kind}): {result['pages']} pagini, {len(result['text'])} caractere, "
+          f"{len(result['chunks'])} chunk-uri" + (f", OCR pe paginile {result['ocr_pages']}" if result['ocr_pages'] else ""))
+    return result
@@ -0,0 +1,157 @@
+"""
+Pre-încărcarea și menținerea în memorie a modelelor Ollama (lifespan-ul aplicației, main.py).
+
+La pornire sunt încărcate modelele chatbot-urilor active (client_chat.model distincte) și
+EMBEDDING_MODEL, cu keep_alive=MODEL_KEEP_ALIVE; la fiecare MODEL_PING_SECONDS lista este recitită,
+modelele descărcate (Ollama repornit, memorie insuficientă) sunt reîncărcate, iar celelalte primesc
+un ping care le prelungește keep_alive. GET /health/ready devine verde abia când modelele sunt rezidente.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+from core.config import ollama, MODEL_WARMUP_ENABLED, MODEL_KEEP_ALIVE, MODEL_PING_SECONDS
+from database import list_client_chat_models
+from rag_manager import EMBEDDING_MODEL
+
+
+def _normalize(model: str) -> str:
+    """Ollama raportează modelele cu tag (nomic-embed-text → nomic-embed-text:latest)"""
+    return model if ":" in model else f"{model}:latest"
+
+
+def _as_dict(obj) -> Dict[str, Any]:
+    """Răspunsurile clientului ollama sunt dict-uri sau modele Pydantic, în funcție de versiune"""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    return obj if isinstance(obj, dict) else {}
+
+
+class ModelWarmup:
+    """Starea modelelor pre-încărcate și task-ul care le menține încărcate"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # model -> {"kind": "chat" / "embedding", "state": "loading" / "resident" / "missing" / "error", ...}
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._ollama_reachable = False
+        self._last_check: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _target_models(self) -> Dict[str, str]:
+        """Modelele care trebuie ținute încărcate: model → tip"""
+        targets = {EMBEDDING_MODEL: "embedding"}
+        chat_models = list_client_chat_models()
+        if chat_models is None:
+            # DB indisponibil: păstrează lista modelelor de chat de la verificarea anterioară
+            with self._lock:
+                chat_models = [model for model, status in self._models.items() if status["kind"] == "chat"]
+        for model in chat_models:
+            targets.setdefault(model, "chat")
+        return targets
+
+    def _resident_models(self) -> Optional[Set[str]]:
+        """Modelele încărcate acum în Ollama (None dacă Ollama nu răspunde)"""
+        try:
+            response = _as_dict(ollama.ps())
+        except Exception as e:
+            print(f"⚠️ Ollama nu răspunde la verificarea modelelor încărcate: {e}")
+            return None
+        return {_normalize(_as_dict(item).get("model") or _as_dict(item).get("name") or "")
+                for item in response.get("models") or []}
+
+    def _load(self, model: str, kind: str):
+        """Încarcă modelul (sau îi prelungește keep_alive dacă este deja încărcat), fără a genera text"""
+        if kind == "embedding":
+            ollama.embeddings(model=model, prompt="warm-up", keep_alive=MODEL_KEEP_ALIVE)
+        else:
+            ollama.generate(model=model, prompt="", keep_alive=MODEL_KEEP_ALIVE)
+
+    def check(self):
+        """O trecere: încarcă modelele lipsă, prelungește keep_alive pentru celelalte, actualizează starea"""
+        targets = self._target_models()
+        resident = self._resident_models()
+        statuses: Dict[str, Dict[str, Any]] = {}
+        for model, kind in targets.items():
+            was_resident = resident is not None and _normalize(model) in resident
+            if not was_resident:
+                with self._lock:
+                    self._models.setdefault(model, {"kind": kind})["state"] = "loading"
+            started = time.perf_counter()
+            try:
+                self._load(model, kind)
+                statuses[model] = {"kind": kind, "state": "resident"}
+                if not was_resident:
+                    statuses[model]["load_seconds"] = round(time.perf_counter() - started, 2)
+                    print(f"🔥 Model {kind} încărcat în Ollama: {model} ({statuses[model]['load_seconds']}s)")
+            except Exception as e:
+                # Modelul nu există în Ollama (404, ex: nedescărcat cu ollama pull): serverul nu este ready
+                missing = getattr(e, "status_code", None) == 404
+                statuses[model] = {"kind": kind, "state": "missing" if missing else "error", "error": str(e)}
+                with self._lock:
+                    previous = self._models.get(model, {})
+                if previous.get("error") != str(e):
+                    print(f"⚠️ Modelul {model} nu a putut fi încărcat: {e}")
+
+        # Starea finală din Ollama (un model încărcat poate fi descărcat de următorul, dacă nu încap toate)
+        resident = self._resident_models()
+        if resident is not None:
+            for model, status in statuses.items():
+                if status["state"] == "resident" and _normalize(model) not in resident:
+                    status["state"] = "evicted"
+        with self._lock:
+            self._models = statuses
+            self._ollama_reachable = resident is not None
+            self._last_check = time.time()
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.check)
+            except Exception as e:
+                print(f"⚠️ Eroare la verificarea modelelor Ollama: {e}")
+            await asyncio.sleep(MODEL_PING_SECONDS)
+
+    def start(self):
+        """Pornește pre-încărcarea în fundal (serverul acceptă cereri imediat; vezi readiness())"""
+        if MODEL_WARMUP_ENABLED and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        ready = Ollama răspunde și fiecare model este încărcat; un model inexistent în Ollama ține
+        serverul not ready (listat în missing_models). Fără MODEL_WARMUP_ENABLED, mereu ready
+        """
+        with self._lock:
+            models = {model: dict(status) for model, status in self._models.items()}
+            reachable, last_check = self._ollama_reachable, self._last_check
+        if not MODEL_WARMUP_ENABLED:
+            return {"ready": True, "warmup": False, "models": models}
+        missing = sorted(model for model, status in models.items() if status["state"] == "missing")
+        ready = (last_check is not None and reachable
+                 and all(status["state"] == "resident" for status in models.values()))
+        return {"ready": ready, "warmup": True, "ollama_reachable": reachable,
+                "last_check": last_check, "missing_models": missing, "models": models}
+
+
+_model_warmup: Optional[ModelWarmup] = None
+
+
+def get_model_warmup() -> ModelWarmup:
+    """Obține managerul de pre-încărcare a modelelor (singleton per proces)"""
+    global _model_warmup
+    if _model_warmup is None:
+        _model_warmup = ModelWarmup()
+    return _model_warmup
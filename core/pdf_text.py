@@ -0,0 +1,231 @@
+"""
+Extragerea stratului de text din PDF-uri, cu backend interschimbabil.
+
+Backend-uri:
+- PyMuPDFTextBackend (fitz): implicit, de ordinul a 10x mai rapid decât PyPDF2
+- PyPDF2TextBackend: rezervă, când PyMuPDF nu este instalat
+
+Modul layout=True păstrează aproximativ așezarea din pagină (coloane, câmpuri de formular
+aliniate), util pentru formulare; modul implicit returnează textul în ordinea de citire.
+"""
+import io
+import os
+import textwrap
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Tuple
+
+# Configurare din variabile de mediu
+PDF_TEXT_BACKEND = os.getenv('PDF_TEXT_BACKEND', 'pymupdf')  # pymupdf | pypdf2
+
+try:
+    import fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    fitz = None
+    PYMUPDF_AVAILABLE = False
+
+try:
+    import PyPDF2
+    PYPDF2_AVAILABLE = True
+except ImportError:
+    PyPDF2 = None
+    PYPDF2_AVAILABLE = False
+
+# MuPDF nu este thread-safe: toate apelurile fitz din thread-uri diferite (extragere text,
+# rasterizare pentru OCR) sunt serializate per pagină prin acest lock
+FITZ_LOCK = threading.RLock()
+
+# 72 puncte / inch
+_POINTS_PER_SQ_INCH = 72.0 * 72.0
+
+
+class PDFTextBackend(ABC):
+    """Interfața comună; o instanță corespunde unui document deschis"""
+
+    name = "base"
+
+    def __init__(self, pdf_bytes: bytes):
+        self.pdf_bytes = pdf_bytes
+
+    @property
+    @abstractmethod
+    def page_count(self) -> int:
+        """Numărul de pagini ale documentului"""
+
+    @abstractmethod
+    def page_text(self, page_num: int, layout: bool = False) -> str:
+        """Textul paginii (1-based)"""
+
+    def image_coverage(self, page_num: int) -> Optional[float]:
+        """Fracțiunea din pagină acoperită de imagini, sau None dacă backend-ul nu o poate calcula"""
+        return None
+
+    @abstractmethod
+    def page_area_sq_in(self, page_num: int) -> float:
+        """Aria paginii în inch²"""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _layout_from_words(words: list) -> str:
+    """
+    Recompune textul păstrând așezarea: cuvintele (x0, y0, x1, y1, text, ...) sunt grupate pe rânduri
+    după poziția verticală și plasate pe o grilă de caractere după poziția orizontală.
+    """
+    if not words:
+        return ""
+    heights = sorted(w[3] - w[1] for w in words)
+    char_widths = sorted((w[2] - w[0]) / max(len(w[4]), 1) for w in words)
+    line_tolerance = max(heights[len(heights) // 2] / 2, 1.0)
+    char_width = max(char_widths[len(char_widths) // 2], 1.0)
+
+    lines = []
+    for word in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        center = (word[1] + word[3]) / 2
+        if lines and abs(lines[-1][0] - center) <= line_tolerance:
+            lines[-1][1].append(word)
+        else:
+            lines.append([center, [word]])
+
+    rendered = []
+    for _, line_words in lines:
+        line = ""
+        for word in sorted(line_words, key=lambda w: w[0]):
+            column = int(word[0] / char_width)
+            # Cel puțin un spațiu între cuvinte, altfel coloana din pagină
+            line += " " * max(column - len(line), 1 if line else 0) + word[4]
+        rendered.append(line.rstrip())
+    # Marginea stângă a paginii nu este păstrată
+    return textwrap.dedent("\n".join(rendered))
+
+
+class PyMuPDFTextBackend(PDFTextBackend):
+    """Backend PyMuPDF (fitz)"""
+
+    name = "pymupdf"
+
+    def __init__(self, pdf_bytes: bytes):
+        super().__init__(pdf_bytes)
+        with FITZ_LOCK:
+            self._doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+
+    @property
+    def page_count(self) -> int:
+        return self._doc.page_count
+
+    def page_text(self, page_num: int, layout: bool = False) -> str:
+        with FITZ_LOCK:
+            page = self._doc.load_page(page_num - 1)
+            if layout:
+                return _layout_from_words(page.get_text("words"))
+            return page.get_text("text") or ""
+
+    def image_coverage(self, page_num: int) -> Optional[float]:
+        with FITZ_LOCK:
+            page = self._doc.load_page(page_num - 1)
+            page_rect = page.rect
+            page_area = abs(page_rect)
+            if not page_area:
+                return 0.0
+            covered = sum(abs(fitz.Rect(info["bbox"]) & page_rect) for info in page.get_image_info())
+        return min(1.0, covered / page_area)
+
+    def page_area_sq_in(self, page_num: int) -> float:
+        with FITZ_LOCK:
+            return abs(self._doc.load_page(page_num - 1).rect) / _POINTS_PER_SQ_INCH
+
+    def close(self):
+        with FITZ_LOCK:
+            self._doc.close()
+
+
+class PyPDF2TextBackend(PDFTextBackend):
+    """Backend PyPDF2 (Python pur, mai lent); rezervă când PyMuPDF lipsește"""
+
+    name = "pypdf2"
+
+    def __init__(self, pdf_bytes: bytes):
+        super().__init__(pdf_bytes)
+        self._reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+
+    @property
+    def page_count(self) -> int:
+        return len(self._reader.pages)
+
+    def page_text(self, page_num: int, layout: bool = False) -> str:
+        page = self._reader.pages[page_num - 1]
+        if layout:
+            try:
+                # Disponibil doar în versiunile mai noi (pypdf)
+                return page.extract_text(extraction_mode="layout") or ""
+            except TypeError:
+                pass
+        return page.extract_text() or ""
+
+    def image_coverage(self, page_num: int) -> Optional[float]:
+        # PyPDF2 nu dă pozițiile imaginilor: 0 dacă pagina nu are imagini, altfel necunoscut
+        try:
+            page = self._reader.pages[page_num - 1]
+            resources = page["/Resources"].get_object() if "/Resources" in page else {}
+            xobjects = resources["/XObject"].get_object() if "/XObject" in resources else {}
+            has_images = any(xobjects[name].get_object().get("/Subtype") == "/Image" for name in xobjects)
+        except Exception:
+            return None
+        return None if has_images else 0.0
+
+    def page_area_sq_in(self, page_num: int) -> float:
+        box = self._reader.pages[page_num - 1].mediabox
+        return float(box.width) * float(box.height) / _POINTS_PER_SQ_INCH
+
+
+def open_pdf_text(pdf_bytes: bytes, backend: Optional[str] = None) -> PDFTextBackend:
+    """
+    Deschide un PDF cu backend-ul configurat (PDF_TEXT_BACKEND), cu PyPDF2 ca rezervă.
+
+    Raises:
+        ImportError: dacă niciun backend nu este instalat
+    """
+    backend = (backend or PDF_TEXT_BACKEND).lower()
+    if backend == 'pymupdf' and PYMUPDF_AVAILABLE:
+        return PyMuPDFTextBackend(pdf_bytes)
+    if PYPDF2_AVAILABLE:
+        return PyPDF2TextBackend(pdf_bytes)
+    if PYMUPDF_AVAILABLE:
+        return PyMuPDFTextBackend(pdf_bytes)
+    raise ImportError("Nici PyMuPDF, nici PyPDF2 nu sunt instalate. Ruleaza: pip install pymupdf")
+
+
+def iter_pdf_text(pdf_bytes: bytes, first_page: int = 1, last_page: Optional[int] = None,
+                  layout: bool = False) -> Iterator[Tuple[int, str]]:
+    """
+    Textul paginilor [first_page, last_page] (1-based), una câte una.
+    O pagină care nu poate fi citită este raportată și produce text gol.
+    """
+    with open_pdf_text(pdf_bytes) as pdf:
+        last = min(last_page or pdf.page_count, pdf.page_count)
+        for page_num in range(max(first_page, 1), last + 1):
+            try:
+                yield page_num, pdf.page_text(page_num, layout)
+            except Exception as e:
+                print(f"⚠️ Eroare la extragerea paginii {page_num}: {e}")
+                yield page_num, ""
+
+
+def extract_pdf_text(pdf_bytes: bytes, max_pages: Optional[int] = None, layout: bool = False) -> str:
+    """
+    Textul întregului PDF (sau al primelor max_pages pagini), cu antete "--- Pagina N ---"
+    pentru paginile care au text.
+    """
+    text_content = ""
+    for page_num, page_text in iter_pdf_text(pdf_bytes, 1, max_pages, layout):
+        if page_text.strip():
+            text_content += f"\n--- Pagina {page_num} ---\n{page_text}\n"
+    return text_content
@@ -1,5 +1,10 @@
 from rag_manager import get_tenant_rag_store
 from prompt_builder import build_dynamic_system_prompt
+from core.config import MAX_CONTEXT_CHARS, CONTEXT_RESERVE
+from core.cache import get_cached_config
+from core.context_packer import pack_rag_context, score_fallback_content
+from core.conversation import estimate_tokens
+from core.tenant_settings import apply_rag_settings, get_tenant_settings
 
 # === Construiește prompt optimizat pentru JSON (o singură dată) ===
 def build_json_instructions():
@@ -13,62 +18,36 @@ _JSON_INSTRUCTIONS = build_json_instructions()
 def enhance_prompt_for_autofill(base_prompt, page_context=None, pdf_text=None, rag_content=None, institution_data=None, rag_search_query=None, tenant_id=None):
     """
     Îmbunătățește prompt-ul bazat pe contextul paginii, textul din PDF, conținutul RAG și datele instituției
-    OPTIMIZAT: Folosește cache și format compact
+    OPTIMIZAT: Folosește cache și format compact; contextul RAG respectă bugetul de tokens al tenant-ului
     """
-    # Dacă avem tenant_id și query pentru RAG, folosește vector store
-    rag_context_text = None
+    # Contextul RAG: rezultatele căutării (sau, fără vector store, conținutul fișierelor) împachetate
+    # în ordinea relevanței pe bugetul de tokens al tenant-ului (core/context_packer.py)
+    rag_settings = get_tenant_settings(get_cached_config(tenant_id) if tenant_id else None)["rag"]
+    budget = min(rag_settings["context_tokens"], (MAX_CONTEXT_CHARS - CONTEXT_RESERVE) // 4)
+    packed = None
     if tenant_id and rag_search_query:
         try:
             rag_store = get_tenant_rag_store(tenant_id)
-            rag_results = rag_store.search(rag_search_query, top_k=5)
+            # Setările RAG ale tenant-ului (cuantizare, diversificare), din config-ul din cache
+            apply_rag_settings(rag_store, rag_settings)
+            rag_results = rag_store.search(rag_search_query, top_k=rag_settings["top_k"])
             if rag_results:
-                rag_context_parts = []
-                for result in rag_results:
-                    rag_context_parts.append(f"\n--- {result['filename']} ---\n{result['content'][:2000]}")  # Limitează la 2000 caractere per chunk
-                rag_context_text = "\n".join(rag_context_parts)
-                print(f"✅ RAG search pentru tenant {tenant_id}: {len(rag_results)} rezultate relevante")
+                packed = pack_rag_context(rag_results, budget, rag_settings["min_score"])
+                print(f"✅ RAG search pentru tenant {tenant_id}: {len(packed['sections'])}/{len(rag_results)} rezultate în prompt "
+                      f"(~{packed['tokens']}/{budget} tokens, {packed['dropped_low_score']} sub scorul {rag_settings['min_score']}, "
+                      f"{packed['dropped_budget']} peste buget)")
         except Exception as e:
             print(f"⚠️ Eroare la căutarea RAG pentru tenant {tenant_id}: {e}")
     
-    # Dacă nu am folosit vector store, folosește rag_content direct
-    if not rag_context_text and rag_content:
-        rag_text = ""
-        total_chars = 0
-        max_total = 15000  # Mărim limita totală pentru RAG
-        
-        for item in rag_content:
-            filename = item.get("filename", "document")
-            content = item.get("content", "").strip()
-            
-            # Skip dacă conținutul este gol sau doar whitespace
-            if not content or content == "\n":
-                continue
-            
-            # Calculează cât mai putem adăuga
-            remaining = max_total - total_chars
-            if remaining <= 0:
-                break
-            
-            # Limitează conținutul per fișier dar păstrăm mai mult (5000 per fișier)
-            content_limited = content[:5000] if len(content) > 5000 else content
-            
-            # Verifică dacă mai avem spațiu
-            if total_chars + len(content_limited) + len(filename) + 50 > max_total:
-                # Adaugă doar cât mai încape
-                available = max_total - total_chars - len(filename) - 50
-                if available > 100:  # Doar dacă mai avem cel puțin 100 caractere
-                    content_limited = content[:available]
-                else:
-                    break
-            
-            rag_text += f"\n\n--- {filename} ---\n{content_limited}"
-            total_chars += len(content_limited) + len(filename) + 50
-        
-        if rag_text:
-            rag_context_text = rag_text
-            print(f"✅ RAG content adăugat în prompt: {len(rag_text)} caractere din {len(rag_content)} fișiere")
+    # Dacă nu am folosit vector store, folosește rag_content direct, ordonat după cuvintele din query
+    # (rag_content este un view leneș - textul este citit din DB abia aici, trunchiat per fișier)
+    if packed is None and rag_content:
+        packed = pack_rag_context(score_fallback_content(rag_content, rag_search_query), budget)
+        if packed["text"]:
+            print(f"✅ RAG content adăugat în prompt: {len(packed['sections'])} fișiere, ~{packed['tokens']}/{budget} tokens")
         else:
-            print(f"⚠️ RAG content este gol sau invalid. Fișiere procesate: {len(rag_content) if rag_content else 0}")
+            print(f"⚠️ RAG content este gol sau invalid. Fișiere procesate: {len(rag_content)}")
+    rag_context_text = packed["text"] if packed and packed["text"] else None
     
     # Folosește prompt builder pentru generarea dinamică
     enhanced = build_dynamic_system_prompt(
@@ -77,6 +56,11 @@ def enhance_prompt_for_autofill(base_prompt, page_context=None, pdf_text=None, r
         rag_context=rag_context_text
     )
     
+    # Tokens per secțiune, pentru raportul de la final
+    section_tokens = {"instrucțiuni": estimate_tokens(enhanced) - (packed["tokens"] if rag_context_text else 0),
+                      "documente RAG": packed["tokens"] if rag_context_text else 0}
+    length_before = len(enhanced)
+    
     # Adaugă textul din PDF/imagini dacă există (format compact pentru viteză)
     if pdf_text:
         # Limitează la primele 1500 caractere pentru prompt (optimizare viteză mai agresivă)
@@ -113,6 +97,9 @@ def enhance_prompt_for_autofill(base_prompt, page_context=None, pdf_text=None, r
         enhanced += "\n```"
         enhanced += "\nApoi adaugă text explicativ după blocul JSON. JSON-ul trebuie să fie primul lucru din răspuns!"
     
+    section_tokens["document încărcat"] = estimate_tokens(enhanced[length_before:])
+    length_before = len(enhanced)
+    
     if page_context and page_context.get("has_form"):
         # Folosește informațiile detaliate despre câmpuri dacă sunt disponibile
         fields_detailed = page_context.get("fields_detailed", [])
@@ -146,5 +133,9 @@ def enhance_prompt_for_autofill(base_prompt, page_context=None, pdf_text=None, r
                 fields_info = fields_info[:1000] + "..."
             enhanced += f"\n\n=== CÂMPURI FORMULAR ===\n{fields_info}\n\n{_JSON_INSTRUCTIONS}"
     
+    section_tokens["formular"] = estimate_tokens(enhanced[length_before:])
+    print(f"📏 Prompt sistem{f' pentru {tenant_id}' if tenant_id else ''}: ~{estimate_tokens(enhanced)} tokens ("
+          + ", ".join(f"{name} {tokens}" for name, tokens in section_tokens.items() if tokens) + ")")
+    
     return enhanced
 
@@ -0,0 +1,500 @@
+"""
+Jobs asincrone pentru ingestia documentelor RAG.
+
+Upload-ul salvează fișierul în blob store și pune un job în coadă (sqlite local, partajat de toate
+procesele serverului de pe aceeași mașină), apoi răspunde imediat cu ID-ul job-ului. Task-urile
+worker (pornite la startup, RAG_JOB_WORKERS per proces) preiau job-urile și rulează pipeline-ul
+de ingestie (core/ingestion.py), actualizând progresul (pagini extrase, chunk-uri cu embeddings).
+
+- Erorile tranzitorii Ollama sunt reîncercate: întâi fiecare cerere de embedding (RAG_EMBED_RETRIES),
+  apoi job-ul întreg, cu backoff exponențial (RAG_JOB_MAX_ATTEMPTS)
+- Vector store-ul trece la noua versiune a documentului doar după ce toate chunk-urile au embeddings
+- Un job rămas "running" fără heartbeat RAG_JOB_STALE_SECONDS (proces oprit) este repus în coadă
+- Ștergerea fișierului anulează job-urile lui de upload neterminate ("cancelled"); un job în lucru
+  verifică anularea înainte și după scrierea în vector store / baza de date
+- Blob-ul unui job neterminat este o referință (database._blob_reference_count): nu este șters
+  de ștergerea altui fișier cu același conținut înainte ca job-ul să creeze rândul rag_file;
+  un job anulat sau eșuat definitiv eliberează blob-ul (database.release_rag_blob)
+
+Job-urile "reindex" (un tenant întreg, core/rag_reindex.py) folosesc aceeași coadă și aceleași worker-e.
+"""
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# Configurare din variabile de mediu
+RAG_JOBS_PATH = os.getenv('RAG_JOBS_PATH', os.path.join('rag_jobs', 'rag_jobs.sqlite3'))
+RAG_JOB_WORKERS = int(os.getenv('RAG_JOB_WORKERS', '2'))
+RAG_JOB_MAX_ATTEMPTS = max(1, int(os.getenv('RAG_JOB_MAX_ATTEMPTS', '3')))
+RAG_JOB_RETRY_SECONDS = float(os.getenv('RAG_JOB_RETRY_SECONDS', '30'))
+RAG_JOB_STALE_SECONDS = float(os.getenv('RAG_JOB_STALE_SECONDS', '600'))
+RAG_JOB_POLL_SECONDS = float(os.getenv('RAG_JOB_POLL_SECONDS', '1'))
+RAG_EMBED_RETRIES = max(1, int(os.getenv('RAG_EMBED_RETRIES', '3')))
+RAG_EMBED_RETRY_SECONDS = float(os.getenv('RAG_EMBED_RETRY_SECONDS', '2'))
+
+# Actualizările de progres sunt scrise în sqlite cel mult o dată la acest interval (secunde)
+_PROGRESS_INTERVAL = 0.5
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+_JSON_COLUMNS = ("options", "result")
+
+
+class JobCancelled(Exception):
+    """Job-ul a fost anulat în timpul procesării (ex: fișierul a fost șters)"""
+
+
+class RagJobQueue:
+    """Coada de job-uri RAG, persistentă în sqlite"""
+
+    def __init__(self, path: str = RAG_JOBS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: tranzacțiile sunt deschise explicit (BEGIN IMMEDIATE la preluare)
+        self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS rag_job (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                chat_id TEXT NOT NULL,
+                tenant_id TEXT NOT NULL,
+                client_chat_id INTEGER,
+                filename TEXT NOT NULL,
+                blob_sha256 TEXT,
+                options TEXT NOT NULL DEFAULT '{}',
+                status TEXT NOT NULL,
+                stage TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                pages_total INTEGER,
+                pages_done INTEGER NOT NULL DEFAULT 0,
+                chunks_done INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                next_attempt_at REAL NOT NULL,
+                finished_at REAL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_rag_job_status ON rag_job (status, next_attempt_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_rag_job_chat ON rag_job (chat_id, created_at)")
+
+    @staticmethod
+    def _row_to_job(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        for column in _JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job.get(column) else None
+        return job
+
+    def enqueue(self, kind: str, chat_id: str, tenant_id: str, filename: str, client_chat_id: Optional[int] = None,
+                blob_sha256: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> str:
+        """Adaugă un job în coadă și returnează ID-ul lui"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO rag_job (id, kind, chat_id, tenant_id, client_chat_id, filename, blob_sha256, options, "
+                "status, created_at, updated_at, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, chat_id, tenant_id, client_chat_id, filename, blob_sha256,
+                 json.dumps(options or {}), now, now, now)
+            )
+        return job_id
+
+    def find_active(self, kind: str, tenant_id: str) -> Optional[Dict[str, Any]]:
+        """Job-ul de tipul dat încă neterminat (queued / running) al unui tenant, dacă există"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM rag_job WHERE kind = ? AND tenant_id = ? AND status IN ('queued', 'running') "
+                "ORDER BY created_at LIMIT 1",
+                (kind, tenant_id)
+            ).fetchone()
+        return self._row_to_job(row)
+
+    def count_blob_references(self, blob_sha256: str) -> int:
+        """Job-urile neterminate (queued / running) care au nevoie de blob-ul dat"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*) AS count FROM rag_job WHERE blob_sha256 = ? AND status IN ('queued', 'running')",
+                (blob_sha256,)
+            ).fetchone()
+        return row["count"]
+
+    def cancel_uploads(self, client_chat_id: int, filename: str) -> List[str]:
+        """
+        Anulează job-urile de upload neterminate ale unui fișier (șters între timp).
+        Returnează blob-urile job-urilor anulate (de eliberat cu database.release_rag_blob).
+        """
+        now = time.time()
+        where = "kind = 'upload' AND client_chat_id = ? AND filename = ? AND status IN ('queued', 'running')"
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    f"SELECT blob_sha256 FROM rag_job WHERE {where}", (client_chat_id, filename)
+                ).fetchall()
+                self._db.execute(
+                    f"UPDATE rag_job SET status = 'cancelled', error = 'Fișierul a fost șters', updated_at = ?, "
+                    f"finished_at = ? WHERE {where}",
+                    (now, now, client_chat_id, filename)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return [row["blob_sha256"] for row in rows if row["blob_sha256"]]
+
+    def is_cancelled(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT status FROM rag_job WHERE id = ?", (job_id,)).fetchone()
+        return row is None or row["status"] == "cancelled"
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Preia următorul job scadent (status "running", attempts + 1), atomic între procese.
+        Job-urile "running" fără heartbeat recent sunt repuse în coadă înainte.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE rag_job SET status = 'queued', stage = NULL, next_attempt_at = ? "
+                    "WHERE status = 'running' AND updated_at < ?",
+                    (now, now - RAG_JOB_STALE_SECONDS)
+                )
+                row = self._db.execute(
+                    "SELECT id FROM rag_job WHERE status = 'queued' AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at, created_at LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                self._db.execute(
+                    "UPDATE rag_job SET status = 'running', stage = 'start', attempts = attempts + 1, "
+                    "pages_done = 0, chunks_done = 0, updated_at = ? WHERE id = ?",
+                    (now, row["id"])
+                )
+                job = self._db.execute("SELECT * FROM rag_job WHERE id = ?", (row["id"],)).fetchone()
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return self._row_to_job(job)
+
+    def progress(self, job_id: str, stage: Optional[str] = None, pages_total: Optional[int] = None,
+                 pages_done: Optional[int] = None, chunks_done: Optional[int] = None):
+        """Actualizează progresul (și heartbeat-ul) unui job în lucru"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE rag_job SET stage = COALESCE(?, stage), pages_total = COALESCE(?, pages_total), "
+                "pages_done = COALESCE(?, pages_done), chunks_done = COALESCE(?, chunks_done), updated_at = ? "
+                "WHERE id = ? AND status = 'running'",
+                (stage, pages_total, pages_done, chunks_done, time.time(), job_id)
+            )
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE rag_job SET status = 'done', stage = 'done', error = NULL, result = ?, "
+                "updated_at = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+                (json.dumps(result, ensure_ascii=False), now, now, job_id)
+            )
+
+    def fail(self, job_id: str, error: str, retry: bool = False) -> str:
+        """
+        Marchează eșecul unei încercări. Dacă retry și mai sunt încercări, job-ul revine în coadă
+        după un backoff exponențial; altfel devine "failed". Returnează noul status.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT attempts, status FROM rag_job WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and row["status"] == "cancelled":
+                return "cancelled"
+            attempts = row["attempts"] if row else RAG_JOB_MAX_ATTEMPTS
+            if retry and attempts < RAG_JOB_MAX_ATTEMPTS:
+                delay = RAG_JOB_RETRY_SECONDS * (2 ** (attempts - 1))
+                self._db.execute(
+                    "UPDATE rag_job SET status = 'queued', stage = NULL, error = ?, updated_at = ?, "
+                    "next_attempt_at = ? WHERE id = ?",
+                    (error, now, now + delay, job_id)
+                )
+                return "queued"
+            self._db.execute(
+                "UPDATE rag_job SET status = 'failed', error = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+                (error, now, now, job_id)
+            )
+            return "failed"
+
+    def release(self, job_id: str):
+        """Repune în coadă un job întrerupt (ex: oprirea serverului), fără să consume o încercare"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE rag_job SET status = 'queued', stage = NULL, attempts = MAX(attempts - 1, 0), "
+                "updated_at = ?, next_attempt_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), time.time(), job_id)
+            )
+
+    def retry(self, job_id: str) -> bool:
+        """Repune manual în coadă un job eșuat (cu încercările resetate)"""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE rag_job SET status = 'queued', stage = NULL, attempts = 0, error = NULL, "
+                "updated_at = ?, next_attempt_at = ?, finished_at = NULL WHERE id = ? AND status = 'failed'",
+                (now, now, job_id)
+            )
+            return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM rag_job WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def list_jobs(self, chat_id: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Cele mai recente job-uri, opțional filtrate după chat și status"""
+        where, params = [], []
+        if chat_id is not None:
+            where.append("chat_id = ?")
+            params.append(chat_id)
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        query = "SELECT * FROM rag_job"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(query, (*params, limit)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) AS count FROM rag_job GROUP BY status").fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({row["status"]: row["count"] for row in rows})
+        return counts
+
+
+_queue: Optional[RagJobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_rag_job_queue() -> RagJobQueue:
+    """Returnează coada de job-uri RAG (singleton per proces)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = RagJobQueue()
+    return _queue
+
+
+def job_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Reprezentarea publică a unui job (fără câmpurile interne)"""
+    if job["kind"] == "reindex":
+        # La reindexare, coloanele de pagini numără fișierele tenant-ului
+        progress = {"files_total": job["pages_total"], "files_done": job["pages_done"], "chunks_embedded": job["chunks_done"]}
+    else:
+        progress = {"pages_total": job["pages_total"], "pages_done": job["pages_done"], "chunks_embedded": job["chunks_done"]}
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "chat_id": job["chat_id"],
+        "filename": job["filename"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "attempts": job["attempts"],
+        "progress": progress,
+        "error": job["error"],
+        "result": job["result"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "finished_at": job["finished_at"]
+    }
+
+
+def _embed_with_retry(text: str, model: Optional[str] = None) -> List[float]:
+    """Embedding strict (fără fallback hash), reîncercat cu backoff la erorile Ollama"""
+    from rag_manager import EmbeddingError, get_embedding
+    for attempt in range(RAG_EMBED_RETRIES):
+        try:
+            return get_embedding(text, strict=True, model=model)
+        except EmbeddingError as e:
+            if attempt == RAG_EMBED_RETRIES - 1:
+                raise
+            delay = RAG_EMBED_RETRY_SECONDS * (2 ** attempt)
+            print(f"⚠️ Embedding eșuat ({e}), reîncerc în {delay:.0f}s...")
+            time.sleep(delay)
+
+
+def _is_transient(error: Exception) -> bool:
+    """
+    Erorile pentru care job-ul merită reîncercat: Ollama / rețea indisponibile temporar sau
+    store-ul trecut la alt model de embeddings în timpul job-ului (reîncercarea folosește modelul nou)
+    """
+    from rag_manager import EmbeddingError, EmbeddingMismatchError
+    return isinstance(error, (EmbeddingError, EmbeddingMismatchError, ConnectionError, TimeoutError, asyncio.TimeoutError))
+
+
+async def run_upload_job(job: Dict[str, Any], queue: RagJobQueue):
+    """
+    Ingestia unui fișier încărcat: blob store → pipeline (extragere, OCR, chunk-uri, embeddings) →
+    vector store (înlocuire completă a documentului) → rândul rag_file din baza de date.
+    Dacă fișierul este șters în timpul job-ului (cancel_uploads), nu rămâne nimic scris.
+    """
+    from core.blob_store import get_blob_store
+    from core.cache import invalidate_config_cache
+    from core.ingestion import ingest_document
+    from database import add_rag_file, delete_rag_file
+    from rag_manager import get_tenant_rag_store
+
+    loop = asyncio.get_running_loop()
+    filename = job["filename"]
+    options = job["options"] or {}
+    file_data = await loop.run_in_executor(None, get_blob_store().get, job["blob_sha256"])
+    if file_data is None:
+        raise FileNotFoundError(f"Fișierul {filename} nu mai există în blob store ({job['blob_sha256']})")
+
+    last_write = [0.0]
+
+    def on_progress(progress: Dict[str, Any]):
+        now = time.monotonic()
+        if progress["stage"] != "done" and now - last_write[0] < _PROGRESS_INTERVAL:
+            return
+        last_write[0] = now
+        queue.progress(job["id"], progress["stage"], progress["pages_total"], progress["pages_done"], progress["chunks_done"])
+
+    # Embeddings cu modelul store-ului (în timpul unei migrări: modelul vechi, încă servit; reindexarea
+    # preia apoi fișierul și în indexul nou)
+    rag_store = get_tenant_rag_store(job["tenant_id"])
+    model = rag_store.model
+    ingested = await ingest_document(
+        filename, file_data, layout=options.get("layout", False),
+        on_progress=on_progress, embed_func=functools.partial(_embed_with_retry, model=model)
+    )
+
+    if queue.is_cancelled(job["id"]):
+        raise JobCancelled(f"Fișierul {filename} a fost șters în timpul procesării")
+    queue.progress(job["id"], stage="index")
+    if ingested["chunks"]:
+        await loop.run_in_executor(None, rag_store.add_chunks, filename, ingested["chunks"], ingested["embeddings"], model)
+
+    text_content = ingested["text"]
+    file_id = await loop.run_in_executor(None, add_rag_file, job["client_chat_id"], filename, text_content or None, file_data)
+    if file_id is None:
+        raise RuntimeError(f"Fișierul {filename} nu a putut fi salvat în baza de date")
+
+    # Ștergerea anulează job-ul înainte de a șterge rândul și documentul: dacă anularea a ajuns în
+    # timpul scrierilor de mai sus, ștergerea lor poate să fi rulat deja, deci sunt anulate aici
+    if queue.is_cancelled(job["id"]):
+        await loop.run_in_executor(None, rag_store.remove_document, filename)
+        await loop.run_in_executor(None, delete_rag_file, job["client_chat_id"], filename)
+        invalidate_config_cache(job["chat_id"])
+        raise JobCancelled(f"Fișierul {filename} a fost șters în timpul procesării")
+    invalidate_config_cache(job["chat_id"])
+
+    return {
+        "has_content": bool(text_content),
+        "content_length": len(text_content),
+        "pages": ingested["pages"],
+        "page_kinds": ingested["page_kinds"],
+        "ocr_pages": ingested["ocr_pages"],
+        "chunks": len(ingested["chunks"]),
+        "page_errors": ingested["errors"]
+    }
+
+
+async def run_reindex_job(job: Dict[str, Any], queue: RagJobQueue):
+    """Reindexarea tuturor fișierelor unui tenant într-un index shadow (vezi core/rag_reindex.py)"""
+    from core.rag_reindex import reindex_tenant
+    return await reindex_tenant(job, queue)
+
+
+# Handler-ele pe tipuri de job
+JOB_HANDLERS = {
+    "upload": run_upload_job,
+    "reindex": run_reindex_job,
+}
+
+
+async def _release_job_blob(job: Dict[str, Any]):
+    """Blob-ul unui job terminat fără rând rag_file (anulat / eșuat) este șters dacă nu mai are referințe"""
+    if not job.get("blob_sha256"):
+        return
+    from database import release_rag_blob
+    await asyncio.get_running_loop().run_in_executor(None, release_rag_blob, job["blob_sha256"])
+
+
+async def _process(job: Dict[str, Any], queue: RagJobQueue):
+    handler = JOB_HANDLERS.get(job["kind"])
+    print(f"⚙️ Job RAG {job['id']} ({job['kind']}, {job['filename']}), încercarea {job['attempts']}")
+    if handler is None:
+        queue.fail(job["id"], f"Tip de job necunoscut: {job['kind']}")
+        return
+    try:
+        result = await handler(job, queue)
+    except asyncio.CancelledError:
+        queue.release(job["id"])
+        raise
+    except JobCancelled as e:
+        print(f"🚫 Job RAG {job['id']} anulat: {e}")
+        await _release_job_blob(job)
+        return
+    except Exception as e:
+        status = queue.fail(job["id"], str(e), retry=_is_transient(e))
+        print(f"❌ Job RAG {job['id']} eșuat ({e}) - {'reîncercat mai târziu' if status == 'queued' else 'abandonat'}")
+        if status != "queued":
+            await _release_job_blob(job)
+        return
+    queue.complete(job["id"], result)
+    print(f"✅ Job RAG {job['id']} finalizat: {job['filename']}")
+
+
+async def _worker_loop(worker_index: int):
+    queue = get_rag_job_queue()
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            job = await loop.run_in_executor(None, queue.claim)
+        except sqlite3.Error as e:
+            print(f"⚠️ Eroare la citirea cozii de job-uri RAG: {e}")
+            job = None
+        if job is None:
+            await asyncio.sleep(RAG_JOB_POLL_SECONDS)
+            continue
+        await _process(job, queue)
+
+
+_worker_tasks: List[asyncio.Task] = []
+
+
+def start_rag_job_workers(workers: int = RAG_JOB_WORKERS):
+    """Pornește task-urile worker în event loop-ul curent (apelat la startup)"""
+    if _worker_tasks or workers <= 0:
+        return
+    get_rag_job_queue()
+    for index in range(workers):
+        _worker_tasks.append(asyncio.ensure_future(_worker_loop(index)))
+    print(f"✅ Worker-e pentru job-uri RAG pornite: {workers}")
+
+
+async def stop_rag_job_workers():
+    """Oprește task-urile worker; job-urile în lucru sunt repuse în coadă"""
+    for task in _worker_tasks:
+        task.cancel()
+    if _worker_tasks:
+        await asyncio.gather(*_worker_tasks, return_exceptions=True)
+    _worker_tasks.clear()
@@ -0,0 +1,362 @@
+"""
+Reindexarea RAG a unui tenant (job-uri "reindex" din core/rag_jobs.py).
+
+Sursele sunt citite din baza de date: textul extras salvat în rag_file.content (reindexare rapidă,
+ex: după schimbarea EMBEDDING_MODEL - doar embeddings, fără extragere / OCR) sau, cu reextract,
+fișierul original din blob store / coloana file_data. Tenanții fără rânduri rag_file folosesc
+directorul vechi rag/{chat_id}.
+
+- Fișierele sunt procesate în paralel (RAG_REINDEX_CONCURRENCY per tenant; tenanții diferiți rulează
+  în paralel pe worker-ele de job-uri, RAG_JOB_WORKERS)
+- Rezultatul este construit într-un index shadow (RAG_REINDEX_DIR/{tenant_id}); indexul folosit de
+  chat rămâne neschimbat până la final, când este înlocuit atomic (TenantRAGStore.swap_in)
+- Progresul (fișier → versiunea reindexată) este salvat după fiecare fișier: un job întrerupt
+  (crash, oprirea serverului) continuă de unde a rămas, fără să recalculeze fișierele terminate
+- Fișierele încărcate / șterse în timpul reindexării sunt respectate la înlocuire: versiunea din
+  baza de date de la final decide ce document vine din shadow și ce rămâne din indexul curent
+
+Migrarea la alt model de embeddings (EMBEDDING_MODEL schimbat) este o reindexare din textul salvat:
+fiecare index are modelul în manifest, iar până la înlocuire tenant-ul este servit din indexul vechi,
+cu query-uri calculate cu modelul vechi. Vectorii de la modele diferite nu sunt amestecați niciodată.
+"""
+import asyncio
+import functools
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.rag_jobs import RagJobQueue, _embed_with_retry, _is_transient, get_rag_job_queue
+from rag_manager import (
+    EMBEDDING_MODEL, EMBEDDING_MODEL_LEGACY, VECTOR_STORE_DIR, TenantRAGStore,
+    get_tenant_rag_store, get_tenant_vector_store_path, read_store_manifest
+)
+
+# Configurare din variabile de mediu
+RAG_REINDEX_CONCURRENCY = max(1, int(os.getenv('RAG_REINDEX_CONCURRENCY', '2')))
+RAG_REINDEX_DIR = os.getenv('RAG_REINDEX_DIR', os.path.join(VECTOR_STORE_DIR, '.reindex'))
+# La startup, tenanții al căror index folosește alt model decât EMBEDDING_MODEL sunt migrați automat
+EMBEDDING_AUTO_MIGRATE = os.getenv('EMBEDDING_AUTO_MIGRATE', 'true').lower() in ('1', 'true', 'yes')
+
+# Directorul vechi cu fișierele RAG (înainte de stocarea în baza de date)
+LEGACY_RAG_DIR = "rag"
+
+_PROGRESS_FILE = "progress.json"
+_HEARTBEAT_INTERVAL = 5.0
+# Treceri suplimentare pentru fișierele încărcate / modificate în timpul reindexării
+_CATCH_UP_PASSES = 3
+
+
+def get_shadow_store_path(tenant_id: str) -> str:
+    """Directorul indexului shadow al unui tenant"""
+    return os.path.join(RAG_REINDEX_DIR, tenant_id)
+
+
+def _load_progress(shadow_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(shadow_dir, _PROGRESS_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_progress(shadow_dir: str, progress: Dict[str, Any]):
+    path = os.path.join(shadow_dir, _PROGRESS_FILE)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(progress, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _list_sources(chat_id: str, client_chat_id: Optional[int]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Fișierele tenant-ului: {filename: {"version", "id", "file_sha256", "has_content", "has_file_data", "path"}}.
+    "version" se schimbă la fiecare reîncărcare a fișierului. None dacă baza de date nu răspunde.
+    """
+    from database import get_rag_file_sources
+
+    rows = get_rag_file_sources(client_chat_id) if client_chat_id is not None else []
+    if rows is None:
+        return None
+    sources = {
+        row["file"]: {
+            "version": f"{row['file_sha256'] or ''}@{row['uploaded_at']}",
+            "id": row["id"],
+            "file_sha256": row["file_sha256"],
+            "has_content": row["has_content"],
+            "has_file_data": row["has_file_data"],
+            "path": None
+        }
+        for row in rows
+    }
+    legacy_dir = os.path.join(LEGACY_RAG_DIR, chat_id)
+    if not sources and os.path.isdir(legacy_dir):
+        for filename in sorted(os.listdir(legacy_dir)):
+            path = os.path.join(legacy_dir, filename)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                sources[filename] = {
+                    "version": f"{stat.st_size}@{stat.st_mtime_ns}",
+                    "id": None, "file_sha256": None, "has_content": False, "has_file_data": False,
+                    "path": path
+                }
+    return sources
+
+
+def _read_source_bytes(source: Dict[str, Any]) -> Optional[bytes]:
+    """Fișierul original: blob store, coloana file_data (rânduri vechi) sau directorul rag/"""
+    if source["file_sha256"]:
+        from core.blob_store import get_blob_store
+        data = get_blob_store().get(source["file_sha256"])
+        if data is not None:
+            return data
+    if source["has_file_data"]:
+        from database import iter_rag_file_data
+        return b"".join(iter_rag_file_data(source["id"]))
+    if source["path"]:
+        with open(source["path"], "rb") as f:
+            return f.read()
+    return None
+
+
+async def _reindex_file(filename: str, source: Dict[str, Any], options: Dict[str, Any], model: str,
+                        heartbeat) -> Dict[str, Any]:
+    from core.ingestion import ingest_document
+    from database import get_rag_file_content
+
+    loop = asyncio.get_running_loop()
+    embed_func = functools.partial(_embed_with_retry, model=model)
+    if not options.get("reextract") and source["has_content"]:
+        content = await loop.run_in_executor(None, get_rag_file_content, source["id"])
+        if content and content.strip():
+            # Textul salvat este deja normalizat: layout=True îl lasă neschimbat (fără comprimarea spațiilor)
+            return await ingest_document(
+                filename, content.encode("utf-8"), layout=True, kind="text",
+                on_progress=heartbeat, embed_func=embed_func
+            )
+
+    data = await loop.run_in_executor(None, _read_source_bytes, source)
+    if data is None:
+        raise FileNotFoundError(f"Fișierul {filename} nu există nici în blob store, nici în baza de date")
+    return await ingest_document(
+        filename, data, layout=options.get("layout", False),
+        on_progress=heartbeat, embed_func=embed_func
+    )
+
+
+async def reindex_tenant(job: Dict[str, Any], queue: RagJobQueue) -> Dict[str, Any]:
+    """Handler-ul job-ului "reindex": reconstruiește indexul tenant-ului în shadow, apoi îl activează"""
+    from core.cache import invalidate_config_cache
+
+    loop = asyncio.get_running_loop()
+    chat_id, tenant_id = job["chat_id"], job["tenant_id"]
+    options = job["options"] or {}
+
+    sources = await loop.run_in_executor(None, _list_sources, chat_id, job["client_chat_id"])
+    if sources is None:
+        raise ConnectionError("Baza de date nu răspunde, lista fișierelor RAG nu poate fi citită")
+
+    # Reia indexul shadow rămas de la o rulare întreruptă doar dacă a fost construit cu același model și mod
+    shadow_dir = get_shadow_store_path(tenant_id)
+    progress = _load_progress(shadow_dir)
+    build = {"layout": bool(options.get("layout")), "reextract": bool(options.get("reextract"))}
+    if not progress or progress.get("model") != EMBEDDING_MODEL or progress.get("options") != build:
+        shutil.rmtree(shadow_dir, ignore_errors=True)
+        os.makedirs(shadow_dir, exist_ok=True)
+        progress = {"model": EMBEDDING_MODEL, "options": build, "files": {}}
+        _save_progress(shadow_dir, progress)
+    shadow = TenantRAGStore(tenant_id, store_path=shadow_dir)
+    done: Dict[str, str] = progress["files"]
+
+    pending = [filename for filename, source in sources.items() if done.get(filename) != source["version"]]
+    resumed = len(sources) - len(pending)
+    if resumed:
+        print(f"🔁 Reindexare {tenant_id}: reluată, {resumed} din {len(sources)} fișiere deja procesate")
+    counters = {"files_done": resumed, "chunks": 0}
+    errors: List[Dict[str, str]] = []
+    failed_versions: Dict[str, str] = {}
+    queue.progress(job["id"], stage="reindex", pages_total=len(sources), pages_done=resumed, chunks_done=0)
+
+    last_beat = [time.monotonic()]
+
+    def heartbeat(_progress: Dict[str, Any]):
+        # Un fișier mare (OCR) poate dura mult: job-ul nu trebuie să pară abandonat
+        now = time.monotonic()
+        if now - last_beat[0] >= _HEARTBEAT_INTERVAL:
+            last_beat[0] = now
+            queue.progress(job["id"])
+
+    semaphore = asyncio.Semaphore(RAG_REINDEX_CONCURRENCY)
+    transient_errors: List[Exception] = []
+
+    async def reindex_one(filename: str, source: Dict[str, Any]):
+        async with semaphore:
+            if transient_errors:
+                return
+            try:
+                ingested = await _reindex_file(filename, source, options, shadow.model, heartbeat)
+            except Exception as e:
+                if _is_transient(e):
+                    # Fișierele deja în lucru sunt terminate (și salvate), cele rămase așteaptă reîncercarea job-ului
+                    transient_errors.append(e)
+                    return
+                # Eroare permanentă (fișier lipsă / corupt): documentul rămâne în versiunea curentă
+                print(f"⚠️ Reindexare {tenant_id}: {filename} sărit ({e})")
+                errors.append({"filename": filename, "error": str(e)})
+                failed_versions[filename] = source["version"]
+                return
+            if ingested["chunks"]:
+                await loop.run_in_executor(None, shadow.add_chunks, filename, ingested["chunks"], ingested["embeddings"], shadow.model)
+            else:
+                await loop.run_in_executor(None, shadow.remove_document, filename)
+            done[filename] = source["version"]
+            await loop.run_in_executor(None, _save_progress, shadow_dir, progress)
+            counters["files_done"] += 1
+            counters["chunks"] += len(ingested["chunks"])
+            queue.progress(job["id"], pages_done=counters["files_done"], chunks_done=counters["chunks"])
+
+    async def run_pass(batch: Dict[str, Dict[str, Any]]):
+        tasks = [asyncio.ensure_future(reindex_one(filename, source)) for filename, source in batch.items()]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # La oprirea serverului fișierele în lucru sunt abandonate; progresul celor terminate rămâne salvat
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if transient_errors:
+            raise transient_errors[0]
+
+    async def list_current() -> Dict[str, Dict[str, Any]]:
+        current = await loop.run_in_executor(None, _list_sources, chat_id, job["client_chat_id"])
+        if current is None:
+            raise ConnectionError("Baza de date nu răspunde, indexul nou nu poate fi activat")
+        return current
+
+    await run_pass({filename: sources[filename] for filename in pending})
+
+    # Fișierele încărcate / modificate între timp intră și ele în indexul nou (necesar la schimbarea
+    # modelului de embeddings: vectorii lor din indexul curent nu pot fi păstrați)
+    for _ in range(_CATCH_UP_PASSES):
+        current = await list_current()
+        changed = {
+            filename: source for filename, source in current.items()
+            if done.get(filename) != source["version"] and failed_versions.get(filename) != source["version"]
+        }
+        if not changed:
+            break
+        print(f"🔁 Reindexare {tenant_id}: {len(changed)} fișiere încărcate în timpul reindexării")
+        queue.progress(job["id"], pages_total=counters["files_done"] + len(changed))
+        await run_pass(changed)
+
+    # Înlocuirea: lista curentă din baza de date decide ce vine din shadow (versiune identică cu cea
+    # reindexată) și ce rămâne din indexul curent (modificat chiar acum, eșuat); restul a fost șters
+    queue.progress(job["id"], stage="swap")
+    current = await list_current()
+    from_shadow = {filename for filename, source in current.items() if done.get(filename) == source["version"]}
+    keep_live = set(current) - from_shadow
+    live = get_tenant_rag_store(tenant_id)
+    previous_model = live.model
+    kept = await loop.run_in_executor(None, live.swap_in, shadow, from_shadow, keep_live)
+    shutil.rmtree(shadow_dir, ignore_errors=True)
+    invalidate_config_cache(chat_id)
+
+    return {
+        "model": shadow.model,
+        "previous_model": previous_model,
+        "files_total": len(current),
+        "files_reindexed": len(from_shadow),
+        "files_resumed": resumed,
+        "files_kept": sorted(kept),
+        "files_dropped": sorted(keep_live - kept),
+        "chunks": sum(len(shadow.get_document_chunks(filename)) for filename in from_shadow),
+        "failed_files": errors
+    }
+
+
+def enqueue_tenant_reindex(chat_id: str, client_chat_id: Optional[int], layout: bool = False,
+                           reextract: bool = False) -> Tuple[str, bool]:
+    """
+    Pune în coadă reindexarea unui tenant. Dacă tenant-ul are deja o reindexare în coadă / în lucru,
+    returnează ID-ul acesteia. Returnează (job_id, creat_acum).
+    """
+    from core.conversation import get_tenant_id_from_chat_id
+
+    queue = get_rag_job_queue()
+    tenant_id = get_tenant_id_from_chat_id(chat_id)
+    active = queue.find_active("reindex", tenant_id)
+    if active:
+        return active["id"], False
+    job_id = queue.enqueue("reindex", chat_id, tenant_id, "*", client_chat_id, None,
+                           {"layout": layout, "reextract": reextract})
+    return job_id, True
+
+
+def enqueue_all_reindex(layout: bool = False, reextract: bool = False) -> List[Dict[str, Any]]:
+    """Pune în coadă reindexarea tuturor tenanților din baza de date: [{chat_id, job_id, created}, ...]"""
+    from database import list_all_client_chats
+
+    jobs = []
+    for chat in list_all_client_chats():
+        chat_id = str(chat["id"])
+        job_id, created = enqueue_tenant_reindex(chat_id, chat["id"], layout, reextract)
+        jobs.append({"chat_id": chat_id, "job_id": job_id, "created": created})
+    return jobs
+
+
+def get_tenant_store_model(tenant_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Modelul de embeddings al indexului unui tenant ({"model", "dim"}), citit din manifest fără a
+    încărca vectorii. Store-urile vechi, fără manifest, sunt considerate EMBEDDING_MODEL_LEGACY.
+    None dacă tenant-ul nu are încă un index.
+    """
+    store_path = get_tenant_vector_store_path(tenant_id)
+    manifest = read_store_manifest(store_path)
+    if manifest:
+        return manifest
+    if os.path.exists(os.path.join(store_path, "embeddings.pkl")):
+        return {"model": EMBEDDING_MODEL_LEGACY, "dim": None}
+    return None
+
+
+def embedding_status() -> Dict[str, Any]:
+    """Modelul indexului fiecărui tenant față de EMBEDDING_MODEL și migrările în curs"""
+    from core.conversation import get_tenant_id_from_chat_id
+    from database import list_all_client_chats
+
+    queue = get_rag_job_queue()
+    tenants = []
+    for chat in list_all_client_chats():
+        chat_id = str(chat["id"])
+        tenant_id = get_tenant_id_from_chat_id(chat_id)
+        store = get_tenant_store_model(tenant_id)
+        active = queue.find_active("reindex", tenant_id)
+        tenants.append({
+            "chat_id": chat_id,
+            "model": store["model"] if store else None,
+            "dim": store.get("dim") if store else None,
+            "current": store is None or store["model"] == EMBEDDING_MODEL,
+            "reindex_job_id": active["id"] if active else None
+        })
+    return {
+        "target_model": EMBEDDING_MODEL,
+        "tenants": tenants,
+        "pending": sum(1 for tenant in tenants if not tenant["current"])
+    }
+
+
+def enqueue_embedding_migration() -> List[Dict[str, Any]]:
+    """
+    Pune în coadă reindexarea (doar embeddings, din textul salvat) pentru tenanții al căror index
+    folosește alt model decât EMBEDDING_MODEL. Până la finalul fiecărei reindexări, tenant-ul este
+    servit din indexul vechi, cu modelul vechi; apoi trece la indexul nou (per tenant).
+    """
+    jobs = []
+    for tenant in embedding_status()["tenants"]:
+        if tenant["current"]:
+            continue
+        job_id, created = enqueue_tenant_reindex(tenant["chat_id"], int(tenant["chat_id"]))
+        jobs.append({"chat_id": tenant["chat_id"], "from_model": tenant["model"], "job_id": job_id, "created": created})
+    if jobs:
+        print(f"🔁 Migrare embeddings la {EMBEDDING_MODEL}: {len(jobs)} tenanți")
+    return jobs
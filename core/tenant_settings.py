@@ -0,0 +1,117 @@
+"""
+Setări per tenant (coloana JSON client_chat.settings, migrations/004), grupate pe secțiuni.
+Config-ul din cache (core/cache.py) păstrează doar valorile salvate pentru chatbot; restul vin din
+valorile implicite de mai jos (configurabile din .env).
+
+Exemplu client_chat.settings:
+    {"rag": {"quantization": "int8", "rerank_candidates": 80, "mmr_lambda": 0.5, "max_chunks_per_file": 2},
+     "answer_cache": {"enabled": true, "threshold": 0.95}}
+"""
+from typing import Any, Callable, Dict, Tuple
+from rag_manager import (
+    QUANTIZATION_MODES, RAG_QUANTIZATION, RAG_RERANK_CANDIDATES,
+    RAG_MMR_LAMBDA, RAG_MAX_CHUNKS_PER_FILE, RAG_MERGE_ADJACENT
+)
+from core.config import (
+    RAG_CONTEXT_TOKENS, RAG_MIN_SCORE, RAG_TOP_K,
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_ENTRIES
+)
+
+
+def _int_between(low: int, high: int) -> Callable[[Any], int]:
+    def validate(value):
+        if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+            raise ValueError(f"trebuie să fie un număr întreg între {low} și {high}")
+        return value
+    return validate
+
+
+def _float_between(low: float, high: float) -> Callable[[Any], float]:
+    def validate(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+            raise ValueError(f"trebuie să fie un număr între {low} și {high}")
+        return float(value)
+    return validate
+
+
+def _boolean(value) -> bool:
+    if not isinstance(value, bool):
+        raise ValueError("trebuie să fie true sau false")
+    return value
+
+
+def _one_of(*options: str) -> Callable[[Any], str]:
+    def validate(value):
+        if value not in options:
+            raise ValueError(f"variante: {', '.join(options)}")
+        return value
+    return validate
+
+
+# Secțiune → setare → (valoare implicită, validare)
+TENANT_SETTINGS_SCHEMA: Dict[str, Dict[str, Tuple[Any, Callable[[Any], Any]]]] = {
+    "rag": {
+        # Reprezentarea vectorilor în memorie (rag_manager.TenantRAGStore.configure)
+        "quantization": (RAG_QUANTIZATION, _one_of(*QUANTIZATION_MODES)),
+        # Candidați reordonați cu vectorii float32 exacți (dacă sunt cuantizați) și diversificați cu MMR
+        "rerank_candidates": (RAG_RERANK_CANDIDATES, _int_between(1, 1000)),
+        # Diversificarea rezultatelor: MMR (1.0 = doar relevanță), chunk-uri per fișier, unirea chunk-urilor vecine
+        "mmr_lambda": (RAG_MMR_LAMBDA, _float_between(0.0, 1.0)),
+        "max_chunks_per_file": (RAG_MAX_CHUNKS_PER_FILE, _int_between(1, 50)),
+        "merge_adjacent": (RAG_MERGE_ADJACENT, _boolean),
+        # Contextul din prompt (core/context_packer.py): rezultate căutate, scorul minim, bugetul de tokens
+        "top_k": (RAG_TOP_K, _int_between(1, 50)),
+        "min_score": (RAG_MIN_SCORE, _float_between(0.0, 1.0)),
+        "context_tokens": (RAG_CONTEXT_TOKENS, _int_between(100, 32000)),
+    },
+    "answer_cache": {
+        # Cache semantic de răspunsuri (core/answer_cache.py): întrebări apropiate primesc răspunsul salvat
+        "enabled": (ANSWER_CACHE_ENABLED, _boolean),
+        "threshold": (ANSWER_CACHE_THRESHOLD, _float_between(0.5, 1.0)),
+        "ttl_seconds": (ANSWER_CACHE_TTL_SECONDS, _int_between(60, 30 * 86400)),
+        "max_entries": (ANSWER_CACHE_MAX_ENTRIES, _int_between(1, 10000)),
+    },
+}
+
+
+def get_tenant_settings(config: dict) -> Dict[str, Dict[str, Any]]:
+    """Setările complete ale unui tenant: valorile salvate în config["settings"] peste cele implicite"""
+    saved = (config or {}).get("settings") or {}
+    return {
+        section: {name: (saved.get(section) or {}).get(name, default) for name, (default, _) in fields.items()}
+        for section, fields in TENANT_SETTINGS_SCHEMA.items()
+    }
+
+
+def merge_tenant_settings(saved: dict, updates: dict) -> Dict[str, Dict[str, Any]]:
+    """
+    Aplică modificările (parțiale, pe secțiuni) peste setările salvate și le validează.
+    O valoare None readuce setarea la valoarea implicită. Ridică ValueError pentru setări necunoscute / invalide.
+    """
+    if not isinstance(updates, dict):
+        raise ValueError("settings trebuie să fie un obiect JSON")
+    merged = {section: dict(values) for section, values in (saved or {}).items() if section in TENANT_SETTINGS_SCHEMA}
+    for section, values in updates.items():
+        fields = TENANT_SETTINGS_SCHEMA.get(section)
+        if fields is None or not isinstance(values, dict):
+            raise ValueError(f"Secțiune de setări necunoscută: {section}")
+        for name, value in values.items():
+            if name not in fields:
+                raise ValueError(f"Setare necunoscută: {section}.{name}")
+            if value is None:
+                merged.setdefault(section, {}).pop(name, None)
+                continue
+            try:
+                merged.setdefault(section, {})[name] = fields[name][1](value)
+            except ValueError as e:
+                raise ValueError(f"{section}.{name}: {e}") from None
+    return {section: values for section, values in merged.items() if values}
+
+
+# Setările din secțiunea "rag" aplicate pe vector store (restul sunt folosite la construirea prompt-ului)
+_STORE_SETTINGS = ("quantization", "rerank_candidates", "mmr_lambda", "max_chunks_per_file", "merge_adjacent")
+
+
+def apply_rag_settings(rag_store, rag_settings: Dict[str, Any]):
+    """Aplică setările RAG ale tenant-ului (secțiunea "rag") pe vector store-ul lui (nu face nimic dacă nu s-au schimbat)"""
+    rag_store.configure(**{name: rag_settings[name] for name in _STORE_SETTINGS})
@@ -3,9 +3,10 @@ Modul pentru gestionarea conexiunii și operațiilor pe baza de date MySQL.
 Folosește mysql-connector-python pentru conexiune.
 """
 import os
+from contextlib import contextmanager
 import mysql.connector
 from mysql.connector import Error, pooling
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 from datetime import datetime
 import json
 
@@ -51,6 +52,26 @@ def get_db_connection():
         print(f"❌ Eroare la obținerea conexiunii: {e}")
         raise
 
+# Cache pentru existența coloanelor adăugate prin migrări (evită INFORMATION_SCHEMA la fiecare apel).
+# După rularea unei migrări, serverul trebuie repornit pentru a folosi coloanele noi.
+_column_cache: Dict[str, bool] = {}
+
+def _column_exists(cursor, table: str, column: str) -> bool:
+    """Verifică (o singură dată per proces) dacă o coloană există în tabel"""
+    key = f"{table}.{column}"
+    if key not in _column_cache:
+        cursor.execute("""
+            SELECT COUNT(*) 
+            FROM INFORMATION_SCHEMA.COLUMNS 
+            WHERE TABLE_SCHEMA = DATABASE() 
+              AND TABLE_NAME = %s 
+              AND COLUMN_NAME = %s
+        """, (table, column))
+        row = cursor.fetchone()
+        count = row['COUNT(*)'] if isinstance(row, dict) else row[0]
+        _column_cache[key] = count > 0
+    return _column_cache[key]
+
 # ==================== OPERAȚII PE TABELUL client_chat ====================
 
 def get_client_chat(chat_id: str) -> Optional[Dict[str, Any]]:
@@ -87,6 +108,15 @@ def get_client_chat(chat_id: str) -> Optional[Dict[str, Any]]:
             rag_files = get_rag_files(result['id'])
             result['rag_files'] = [rf['file'] for rf in rag_files]
             
+            # Setările per tenant (coloana JSON din migrarea 004, returnată ca text)
+            settings = result.get('settings')
+            if isinstance(settings, (str, bytes, bytearray)):
+                try:
+                    result['settings'] = json.loads(settings)
+                except (json.JSONDecodeError, TypeError) as e:
+                    print(f"⚠️ client_chat.settings invalid pentru {result['id']}: {e}")
+                    result['settings'] = {}
+            
             return result
         
         return None
@@ -128,8 +158,8 @@ def create_client_chat(name: str, model: str, prompt: str, chat_title: str = Non
 
 def update_client_chat(chat_id: int, name: str = None, model: str = None, prompt: str = None,
                        chat_title: str = None, chat_subtitle: str = None, 
-                       chat_color: str = None, is_active: bool = None):
-    """Actualizează un chatbot existent"""
+                       chat_color: str = None, is_active: bool = None, settings: dict = None):
+    """Actualizează un chatbot existent (settings: setările per tenant complete, vezi core/tenant_settings.py)"""
     connection = None
     try:
         connection = get_db_connection()
@@ -159,6 +189,12 @@ def update_client_chat(chat_id: int, name: str = None, model: str = None, prompt
         if is_active is not None:
             updates.append("is_active = %s")
             values.append(int(is_active))
+        if settings is not None:
+            if not _column_exists(cursor, 'client_chat', 'settings'):
+                print("❌ Coloana client_chat.settings lipsește - rulează migrations/004_client_chat_settings.sql")
+                return False
+            updates.append("settings = %s")
+            values.append(json.dumps(settings, ensure_ascii=False))
         
         if not updates:
             return True
@@ -180,6 +216,60 @@ def update_client_chat(chat_id: int, name: str = None, model: str = None, prompt
             cursor.close()
             connection.close()
 
+def bump_client_chat_config_version(chat_id: str) -> bool:
+    """
+    Incrementează client_chat.config_version pentru un chatbot (după id sau name), astfel încât
+    toate procesele worker să-și invalideze config-ul din cache la următorul poll.
+    Returnează False dacă migrarea 003 nu a fost rulată (coloana lipsește).
+    """
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        if not _column_exists(cursor, 'client_chat', 'config_version'):
+            return False
+        
+        try:
+            cursor.execute("UPDATE client_chat SET config_version = config_version + 1 WHERE id = %s", (int(chat_id),))
+        except ValueError:
+            cursor.execute("UPDATE client_chat SET config_version = config_version + 1 WHERE name = %s", (chat_id,))
+        connection.commit()
+        return True
+    except Error as e:
+        print(f"❌ Eroare la actualizarea config_version: {e}")
+        if connection:
+            connection.rollback()
+        return False
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def get_client_chat_config_versions(client_chat_ids: List[int]) -> Optional[Dict[int, int]]:
+    """
+    Citește config_version pentru mai mulți chatboți într-o singură interogare (pe cheia primară).
+    Returnează None dacă migrarea 003 nu a fost rulată; chatboții șterși lipsesc din rezultat.
+    """
+    if not client_chat_ids:
+        return {}
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        if not _column_exists(cursor, 'client_chat', 'config_version'):
+            return None
+        
+        placeholders = ", ".join(["%s"] * len(client_chat_ids))
+        cursor.execute(f"SELECT id, config_version FROM client_chat WHERE id IN ({placeholders})", tuple(client_chat_ids))
+        return {int(row[0]): int(row[1]) for row in cursor.fetchall()}
+    except Error as e:
+        print(f"❌ Eroare la citirea config_version: {e}")
+        return None
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
 def list_all_client_chats() -> List[Dict[str, Any]]:
     """Listează toate chatbot-urile"""
     connection = None
@@ -214,6 +304,25 @@ def list_all_client_chats() -> List[Dict[str, Any]]:
             cursor.close()
             connection.close()
 
+def list_client_chat_models() -> Optional[List[str]]:
+    """Modelele distincte folosite de chatbot-urile active (pentru pre-încărcarea în Ollama); None la eroare"""
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT DISTINCT model FROM client_chat
+            WHERE is_active = 1 AND model IS NOT NULL AND model <> ''
+        """)
+        return [row[0] for row in cursor.fetchall()]
+    except Error as e:
+        print(f"❌ Eroare la listarea modelelor client_chat: {e}")
+        return None
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
 # ==================== OPERAȚII PE TABELUL client_type ====================
 
 def get_client_type(client_chat_id: int) -> Optional[Dict[str, Any]]:
@@ -289,25 +398,29 @@ def get_rag_files(client_chat_id: int, include_content: bool = False, include_fi
         cursor = connection.cursor(dictionary=True)
         
         # Selectează doar câmpurile necesare (exclude content dacă nu e necesar pentru performanță)
-        # Verifică mai întâi dacă câmpul file_data există
-        cursor.execute("""
-            SELECT COUNT(*) as count 
-            FROM INFORMATION_SCHEMA.COLUMNS 
-            WHERE TABLE_SCHEMA = DATABASE() 
-              AND TABLE_NAME = 'rag_file' 
-              AND COLUMN_NAME = 'file_data'
-        """)
-        has_file_data_column = cursor.fetchone()['count'] > 0
+        # (coloanele content / file_data / file_sha256 sunt adăugate prin migrări și pot lipsi)
+        has_content_column = _column_exists(cursor, 'rag_file', 'content')
+        has_file_data_column = _column_exists(cursor, 'rag_file', 'file_data')
+        has_blob_columns = _column_exists(cursor, 'rag_file', 'file_sha256')
         
         fields = ["id", "file", "id_client_chat", "uploaded_at"]
-        if include_content:
+        if has_blob_columns:
+            # Referința către blob store (hash + dimensiune) - metadate mici
+            fields.extend(["file_sha256", "file_size"])
+        if include_content and has_content_column:
             fields.append("content")
         if include_file_data and has_file_data_column:
             fields.append("file_data")
         if not include_content and not include_file_data:
-            fields.append("CASE WHEN content IS NOT NULL THEN 1 ELSE 0 END as has_content")
+            if has_content_column:
+                fields.append("CASE WHEN content IS NOT NULL THEN 1 ELSE 0 END as has_content")
+            binary_conditions = []
             if has_file_data_column:
-                fields.append("CASE WHEN file_data IS NOT NULL THEN 1 ELSE 0 END as has_file_data")
+                binary_conditions.append("file_data IS NOT NULL")
+            if has_blob_columns:
+                binary_conditions.append("file_sha256 IS NOT NULL")
+            if binary_conditions:
+                fields.append(f"CASE WHEN {' OR '.join(binary_conditions)} THEN 1 ELSE 0 END as has_file_data")
         
         query = f"SELECT {', '.join(fields)} FROM rag_file WHERE id_client_chat = %s ORDER BY uploaded_at DESC"
         cursor.execute(query, (client_chat_id,))
@@ -321,130 +434,412 @@ def get_rag_files(client_chat_id: int, include_content: bool = False, include_fi
         return results
     except Error as e:
         print(f"❌ Eroare la citirea rag_file: {e}")
-        # Dacă câmpul content sau file_data nu există încă, încercă fără el
-        if "Unknown column" in str(e):
-            try:
-                # Încearcă fără file_data
-                fields = ["id", "file", "id_client_chat", "uploaded_at"]
-                if include_content:
-                    fields.append("content")
-                if not include_content:
-                    fields.append("CASE WHEN content IS NOT NULL THEN 1 ELSE 0 END as has_content")
-                query = f"SELECT {', '.join(fields)} FROM rag_file WHERE id_client_chat = %s ORDER BY uploaded_at DESC"
-                cursor.execute(query, (client_chat_id,))
-                results = cursor.fetchall()
-                for result in results:
-                    if result.get('uploaded_at'):
-                        result['uploaded_at'] = result['uploaded_at'].isoformat() if hasattr(result['uploaded_at'], 'isoformat') else str(result['uploaded_at'])
-                return results
-            except:
-                pass
         return []
     finally:
         if connection and connection.is_connected():
             cursor.close()
             connection.close()
 
+def get_rag_content_info(client_chat_id: int) -> List[Dict[str, Any]]:
+    """
+    Metadate despre conținutul text al fișierelor RAG (lungime, dacă are text util),
+    calculate în MySQL - textul în sine nu este transferat.
+    """
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        if not _column_exists(cursor, 'rag_file', 'content'):
+            return []
+        
+        query = """
+            SELECT file AS filename,
+                   COALESCE(CHAR_LENGTH(content), 0) AS content_length,
+                   CASE WHEN content IS NOT NULL AND TRIM(content) <> '' THEN 1 ELSE 0 END AS has_content
+            FROM rag_file
+            WHERE id_client_chat = %s
+            ORDER BY uploaded_at DESC
+        """
+        cursor.execute(query, (client_chat_id,))
+        results = cursor.fetchall()
+        for result in results:
+            result['content_length'] = int(result['content_length'])
+            result['has_content'] = bool(result['has_content'])
+        return results
+    except Error as e:
+        print(f"❌ Eroare la citirea rag_file: {e}")
+        return []
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def get_rag_content_truncated(client_chat_id: int, max_chars_per_file: int, max_files: Optional[int] = None) -> List[Dict[str, str]]:
+    """
+    Obține conținutul text al fișierelor RAG (cele mai recente primele), trunchiat în SQL
+    la max_chars_per_file caractere per fișier. Fișierele fără text util sunt excluse.
+    """
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        if not _column_exists(cursor, 'rag_file', 'content'):
+            return []
+        
+        query = """
+            SELECT file AS filename, SUBSTRING(TRIM(content), 1, %s) AS content
+            FROM rag_file
+            WHERE id_client_chat = %s AND content IS NOT NULL AND TRIM(content) <> ''
+            ORDER BY uploaded_at DESC
+        """
+        params = [max_chars_per_file, client_chat_id]
+        if max_files is not None:
+            query += " LIMIT %s"
+            params.append(max_files)
+        cursor.execute(query, tuple(params))
+        return cursor.fetchall()
+    except Error as e:
+        print(f"❌ Eroare la citirea conținutului rag_file: {e}")
+        return []
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def get_rag_file(client_chat_id: int, filename: str) -> Optional[Dict[str, Any]]:
+    """
+    Obține metadatele unui singur fișier RAG după (chatbot, nume fișier), fără content și fără BLOB.
+    Pentru fișierele vechi (BLOB în file_data) returnează și file_data_size, calculat în MySQL.
+    uploaded_at rămâne datetime (folosit pentru Last-Modified).
+    """
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        
+        fields = ["id", "file", "id_client_chat", "uploaded_at"]
+        if _column_exists(cursor, 'rag_file', 'file_sha256'):
+            fields.extend(["file_sha256", "file_size"])
+        if _column_exists(cursor, 'rag_file', 'file_data'):
+            fields.append("LENGTH(file_data) as file_data_size")
+        
+        query = f"SELECT {', '.join(fields)} FROM rag_file WHERE id_client_chat = %s AND file = %s LIMIT 1"
+        cursor.execute(query, (client_chat_id, filename))
+        return cursor.fetchone()
+    except Error as e:
+        print(f"❌ Eroare la citirea rag_file: {e}")
+        return None
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def get_rag_file_sources(client_chat_id: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Sursele fișierelor RAG ale unui chatbot, pentru reindexare: id, file, uploaded_at, file_sha256,
+    has_content (text extras salvat) și has_file_data (BLOB vechi), fără conținut.
+    Returnează None la eroare (spre deosebire de get_rag_files), ca apelantul să nu confunde
+    o bază de date indisponibilă cu un chatbot fără fișiere.
+    """
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        
+        fields = ["id", "file", "uploaded_at"]
+        fields.append("file_sha256" if _column_exists(cursor, 'rag_file', 'file_sha256') else "NULL AS file_sha256")
+        if _column_exists(cursor, 'rag_file', 'content'):
+            fields.append("CASE WHEN content IS NOT NULL AND TRIM(content) <> '' THEN 1 ELSE 0 END AS has_content")
+        else:
+            fields.append("0 AS has_content")
+        if _column_exists(cursor, 'rag_file', 'file_data'):
+            fields.append("CASE WHEN file_data IS NOT NULL THEN 1 ELSE 0 END AS has_file_data")
+        else:
+            fields.append("0 AS has_file_data")
+        
+        query = f"SELECT {', '.join(fields)} FROM rag_file WHERE id_client_chat = %s ORDER BY uploaded_at DESC"
+        cursor.execute(query, (client_chat_id,))
+        results = cursor.fetchall()
+        for result in results:
+            if result.get('uploaded_at'):
+                result['uploaded_at'] = result['uploaded_at'].isoformat() if hasattr(result['uploaded_at'], 'isoformat') else str(result['uploaded_at'])
+            result['has_content'] = bool(result['has_content'])
+            result['has_file_data'] = bool(result['has_file_data'])
+        return results
+    except Error as e:
+        print(f"❌ Eroare la citirea surselor rag_file: {e}")
+        return None
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def get_rag_file_content(rag_file_id: int) -> Optional[str]:
+    """Textul extras salvat pentru un singur fișier RAG (None dacă lipsește)"""
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        if not _column_exists(cursor, 'rag_file', 'content'):
+            return None
+        cursor.execute("SELECT content FROM rag_file WHERE id = %s", (rag_file_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except Error as e:
+        print(f"❌ Eroare la citirea conținutului rag_file: {e}")
+        return None
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
+# Dimensiunea bucăților citite din coloana file_data (un round-trip MySQL per bucată)
+RAG_FILE_DATA_CHUNK_SIZE = 1024 * 1024
+
+def iter_rag_file_data(rag_file_id: int, start: int = 0, end: Optional[int] = None,
+                       chunk_size: int = RAG_FILE_DATA_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Citește în flux octeții [start, end] (inclusiv) din coloana file_data a unui fișier RAG vechi,
+    cu SUBSTRING, fără a încărca tot BLOB-ul în memorie. Conexiunea este luată din pool doar
+    pe durata fiecărei bucăți, ca descărcările lente să nu blocheze pool-ul.
+    """
+    if end is None:
+        connection = get_db_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT LENGTH(file_data) FROM rag_file WHERE id = %s", (rag_file_id,))
+            row = cursor.fetchone()
+            cursor.close()
+        finally:
+            connection.close()
+        if not row or row[0] is None:
+            return
+        end = int(row[0]) - 1
+    
+    offset = start
+    while offset <= end:
+        length = min(chunk_size, end - offset + 1)
+        connection = get_db_connection()
+        try:
+            cursor = connection.cursor()
+            # SUBSTRING este indexat de la 1
+            cursor.execute("SELECT SUBSTRING(file_data, %s, %s) FROM rag_file WHERE id = %s",
+                           (offset + 1, length, rag_file_id))
+            row = cursor.fetchone()
+            cursor.close()
+        finally:
+            connection.close()
+        chunk = row[0] if row else None
+        if not chunk:
+            break
+        offset += len(chunk)
+        yield bytes(chunk)
+
+# Blob-urile RAG sunt deduplicate după sha256. Adăugarea unei referințe (put + rândul rag_file) și
+# ștergerea unui blob rămas fără referințe rulează sub același lock MySQL per hash (GET_LOCK, comun
+# tuturor proceselor): o încărcare identică nu poate refolosi un blob care este șters în același timp.
+_BLOB_LOCK_TIMEOUT = 30
+
+def _blob_lock_name(sha256: str) -> str:
+    # Numele lock-urilor MySQL au cel mult 64 de caractere
+    return f"rag_blob:{sha256[:40]}"
+
+def _acquire_blob_lock(cursor, sha256: str) -> bool:
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (_blob_lock_name(sha256), _BLOB_LOCK_TIMEOUT))
+    return cursor.fetchone()[0] == 1
+
+def _release_blob_lock(cursor, sha256: str):
+    cursor.execute("SELECT RELEASE_LOCK(%s)", (_blob_lock_name(sha256),))
+    cursor.fetchone()
+
+def _blob_reference_count(cursor, sha256: str) -> int:
+    """Referințele la un blob: rândurile rag_file cu hash-ul lui și job-urile de upload neterminate"""
+    cursor.execute("SELECT COUNT(*) FROM rag_file WHERE file_sha256 = %s", (sha256,))
+    count = cursor.fetchone()[0]
+    # Un job de upload (core/rag_jobs.py) referă blob-ul până când creează rândul rag_file
+    try:
+        from core.rag_jobs import get_rag_job_queue
+        count += get_rag_job_queue().count_blob_references(sha256)
+    except Exception as e:
+        print(f"⚠️ Coada de job-uri RAG indisponibilă, blob-ul {sha256} este păstrat: {e}")
+        count += 1
+    return count
+
+@contextmanager
+def rag_blob_lock(sha256: str):
+    """
+    Ține lock-ul blob-ului sha256 pe o conexiune proprie, pentru referințele create în afara
+    tabelului rag_file (ex: upload-ul salvează blob-ul și pune job-ul în coadă sub lock).
+    """
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        if not _acquire_blob_lock(cursor, sha256):
+            raise TimeoutError(f"Lock indisponibil pentru blob-ul {sha256}")
+        try:
+            yield
+        finally:
+            _release_blob_lock(cursor, sha256)
+    finally:
+        cursor.close()
+        connection.close()
+
+def _delete_blob_if_unreferenced(connection, cursor, sha256: str) -> bool:
+    """Șterge blob-ul dacă nu mai are referințe; numărarea și ștergerea rulează sub lock-ul hash-ului"""
+    if not _acquire_blob_lock(cursor, sha256):
+        print(f"⚠️ Lock indisponibil pentru blob-ul {sha256}, nu este șters acum")
+        return False
+    try:
+        # Tranzacție nouă după obținerea lock-ului: numărarea vede rândurile salvate de ceilalți până acum
+        connection.commit()
+        if _blob_reference_count(cursor, sha256) > 0:
+            return False
+        try:
+            from core.blob_store import get_blob_store
+            get_blob_store().delete(sha256)
+            return True
+        except Exception as e:
+            print(f"⚠️ Eroare la ștergerea blob-ului {sha256}: {e}")
+            return False
+    finally:
+        _release_blob_lock(cursor, sha256)
+
+def release_rag_blob(sha256: str) -> bool:
+    """
+    Eliberează blob-ul unui job de upload terminat fără rând rag_file (anulat sau eșuat definitiv):
+    este șters dacă nu mai este referit de alt fișier sau job. Returnează True dacă a fost șters.
+    """
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        deleted = _delete_blob_if_unreferenced(connection, cursor, sha256)
+        if deleted:
+            print(f"🗑️ Blob RAG {sha256} șters (job de upload neterminat)")
+        return deleted
+    except Error as e:
+        print(f"❌ Eroare la eliberarea blob-ului {sha256}: {e}")
+        return False
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
 def add_rag_file(client_chat_id: int, filename: str, content: str = None, file_data: bytes = None) -> Optional[int]:
-    """Adaugă un fișier RAG în baza de date cu conținutul text și fișierul binar"""
+    """
+    Adaugă un fișier RAG în baza de date cu conținutul text și fișierul binar.
+    Dacă migrarea 002 a fost rulată, octeții fișierului merg în blob store (adresat după sha256)
+    și rândul păstrează doar file_sha256 + file_size; altfel se folosește coloana BLOB file_data.
+    """
     connection = None
+    locked_sha256 = None
     try:
         connection = get_db_connection()
         cursor = connection.cursor()
         
-        # Verifică dacă fișierul există deja
-        check_query = "SELECT id FROM rag_file WHERE id_client_chat = %s AND file = %s"
+        has_file_data_column = _column_exists(cursor, 'rag_file', 'file_data')
+        has_blob_columns = _column_exists(cursor, 'rag_file', 'file_sha256')
+        
+        columns = {}
+        if content is not None:
+            columns["content"] = content
+        
+        if file_data is not None:
+            blob_ref = None
+            if has_blob_columns:
+                try:
+                    from core.blob_store import compute_sha256, get_blob_store
+                    # Lock-ul hash-ului este ținut până după commit-ul rândului care referă blob-ul
+                    sha256 = compute_sha256(file_data)
+                    if not _acquire_blob_lock(cursor, sha256):
+                        raise TimeoutError(f"lock indisponibil pentru blob-ul {sha256}")
+                    locked_sha256 = sha256
+                    blob_ref = get_blob_store().put(file_data)
+                except Exception as e:
+                    print(f"⚠️ Eroare la salvarea în blob store, folosesc coloana file_data: {e}")
+            
+            if blob_ref:
+                columns["file_sha256"], columns["file_size"] = blob_ref
+                if has_file_data_column:
+                    # Eliberează BLOB-ul vechi (dacă rândul exista deja)
+                    columns["file_data"] = None
+            elif has_file_data_column:
+                columns["file_data"] = file_data
+            else:
+                print(f"⚠️ Fișier RAG salvat fără date binare (nu există nici file_data, nici file_sha256): {filename}")
+        
+        # Verifică dacă fișierul există deja (și ce blob referea, ca să fie eliberat la înlocuire)
+        check_query = f"SELECT id{', file_sha256' if has_blob_columns else ''} FROM rag_file WHERE id_client_chat = %s AND file = %s FOR UPDATE"
         cursor.execute(check_query, (client_chat_id, filename))
         existing = cursor.fetchone()
+        previous_sha256 = existing[1] if existing and has_blob_columns else None
         
         if existing:
-            # Actualizează fișierul existent
-            updates = []
-            params = []
-            
-            if content is not None:
-                updates.append("content = %s")
-                params.append(content)
-            
-            if file_data is not None:
-                updates.append("file_data = %s")
-                params.append(file_data)
-            
-            if updates:
-                params.append(existing[0])
-                query = f"UPDATE rag_file SET {', '.join(updates)}, uploaded_at = CURRENT_TIMESTAMP WHERE id = %s"
-                cursor.execute(query, tuple(params))
-            else:
-                # Dacă nu avem conținut sau date, doar actualizăm uploaded_at
-                query = "UPDATE rag_file SET uploaded_at = CURRENT_TIMESTAMP WHERE id = %s"
-                cursor.execute(query, (existing[0],))
+            # Actualizează fișierul existent (doar uploaded_at dacă nu avem conținut sau date)
+            updates = [f"{column} = %s" for column in columns]
+            updates.append("uploaded_at = CURRENT_TIMESTAMP")
+            query = f"UPDATE rag_file SET {', '.join(updates)} WHERE id = %s"
+            cursor.execute(query, (*columns.values(), existing[0]))
             file_id = existing[0]
             print(f"✅ Fișier RAG actualizat în DB: {filename} (ID: {file_id})")
         else:
             # Creează fișier nou
-            if file_data is not None:
-                if content is not None:
-                    query = "INSERT INTO rag_file (file, content, file_data, id_client_chat) VALUES (%s, %s, %s, %s)"
-                    cursor.execute(query, (filename, content, file_data, client_chat_id))
-                else:
-                    query = "INSERT INTO rag_file (file, file_data, id_client_chat) VALUES (%s, %s, %s)"
-                    cursor.execute(query, (filename, file_data, client_chat_id))
-            elif content is not None:
-                query = "INSERT INTO rag_file (file, content, id_client_chat) VALUES (%s, %s, %s)"
-                cursor.execute(query, (filename, content, client_chat_id))
-            else:
-                query = "INSERT INTO rag_file (file, id_client_chat) VALUES (%s, %s)"
-                cursor.execute(query, (filename, client_chat_id))
+            insert_columns = ["file", "id_client_chat", *columns.keys()]
+            placeholders = ", ".join(["%s"] * len(insert_columns))
+            query = f"INSERT INTO rag_file ({', '.join(insert_columns)}) VALUES ({placeholders})"
+            cursor.execute(query, (filename, client_chat_id, *columns.values()))
             file_id = cursor.lastrowid
             print(f"✅ Fișier RAG adăugat în DB: {filename} (ID: {file_id})")
         
         connection.commit()
+        if locked_sha256:
+            _release_blob_lock(cursor, locked_sha256)
+            locked_sha256 = None
+        
+        # Blob-ul versiunii înlocuite rămâne doar dacă îl mai referă alt fișier
+        if previous_sha256 and "file_sha256" in columns and previous_sha256 != columns["file_sha256"]:
+            _delete_blob_if_unreferenced(connection, cursor, previous_sha256)
         return file_id
     except Error as e:
         print(f"❌ Eroare la adăugarea rag_file: {e}")
-        # Dacă câmpul file_data nu există, încercă fără el
-        if "Unknown column 'file_data'" in str(e):
-            try:
-                if existing:
-                    if content is not None:
-                        query = "UPDATE rag_file SET content = %s WHERE id = %s"
-                        cursor.execute(query, (content, existing[0]))
-                    else:
-                        query = "UPDATE rag_file SET uploaded_at = CURRENT_TIMESTAMP WHERE id = %s"
-                        cursor.execute(query, (existing[0],))
-                else:
-                    if content is not None:
-                        query = "INSERT INTO rag_file (file, content, id_client_chat) VALUES (%s, %s, %s)"
-                        cursor.execute(query, (filename, content, client_chat_id))
-                    else:
-                        query = "INSERT INTO rag_file (file, id_client_chat) VALUES (%s, %s)"
-                        cursor.execute(query, (filename, client_chat_id))
-                    file_id = cursor.lastrowid
-                connection.commit()
-                print(f"⚠️ Fișier RAG salvat fără file_data (câmp inexistent): {filename}")
-                return file_id if not existing else existing[0]
-            except:
-                pass
         if connection:
             connection.rollback()
         return None
     finally:
         if connection and connection.is_connected():
+            if locked_sha256:
+                try:
+                    _release_blob_lock(cursor, locked_sha256)
+                except Error:
+                    pass
             cursor.close()
             connection.close()
 
 def delete_rag_file(client_chat_id: int, filename: str) -> bool:
-    """Șterge un fișier RAG din baza de date"""
+    """Șterge un fișier RAG din baza de date (și blob-ul, dacă nu mai este referit de alt rând)"""
     connection = None
     try:
         connection = get_db_connection()
         cursor = connection.cursor()
         
+        sha256 = None
+        if _column_exists(cursor, 'rag_file', 'file_sha256'):
+            cursor.execute(
+                "SELECT file_sha256 FROM rag_file WHERE id_client_chat = %s AND file = %s FOR UPDATE",
+                (client_chat_id, filename)
+            )
+            row = cursor.fetchone()
+            sha256 = row[0] if row else None
+        
         query = "DELETE FROM rag_file WHERE id_client_chat = %s AND file = %s"
         cursor.execute(query, (client_chat_id, filename))
+        deleted = cursor.rowcount > 0
         connection.commit()
         
-        deleted = cursor.rowcount > 0
+        # Blob-urile sunt deduplicate: șterge doar dacă niciun alt fișier nu mai folosește hash-ul
+        if deleted and sha256:
+            _delete_blob_if_unreferenced(connection, cursor, sha256)
+        
         if deleted:
             print(f"✅ Fișier RAG șters din DB: {filename}")
         else:
@@ -461,6 +856,63 @@ def delete_rag_file(client_chat_id: int, filename: str) -> bool:
             cursor.close()
             connection.close()
 
+def migrate_rag_file_data_to_blob_store(batch_size: int = 20) -> int:
+    """
+    Mută BLOB-urile existente din rag_file.file_data în blob store (după rularea migrării 002).
+    Procesează câte un lot mic de rânduri pentru a nu încărca toate fișierele în memorie.
+    Returnează numărul de fișiere mutate.
+    """
+    from core.blob_store import compute_sha256, get_blob_store
+    store = get_blob_store()
+    moved = 0
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        
+        if not _column_exists(cursor, 'rag_file', 'file_sha256') or not _column_exists(cursor, 'rag_file', 'file_data'):
+            print("⚠️ Rulează mai întâi migrations/002_rag_file_blob_store.sql")
+            return 0
+        
+        while True:
+            cursor.execute(
+                "SELECT id FROM rag_file WHERE file_data IS NOT NULL AND file_sha256 IS NULL LIMIT %s",
+                (batch_size,)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            for file_id in ids:
+                cursor.execute("SELECT file_data FROM rag_file WHERE id = %s", (file_id,))
+                file_data = bytes(cursor.fetchone()[0])
+                sha256 = compute_sha256(file_data)
+                if not _acquire_blob_lock(cursor, sha256):
+                    # Rândul ar fi reales la lotul următor: oprește migrarea (poate fi rulată din nou)
+                    print(f"⚠️ Lock indisponibil pentru blob-ul {sha256}, migrarea se oprește la fișierul {file_id}")
+                    return moved
+                try:
+                    sha256, size = store.put(file_data)
+                    cursor.execute(
+                        "UPDATE rag_file SET file_sha256 = %s, file_size = %s, file_data = NULL WHERE id = %s",
+                        (sha256, size, file_id)
+                    )
+                    connection.commit()
+                finally:
+                    _release_blob_lock(cursor, sha256)
+                moved += 1
+            print(f"✅ Mutate {moved} fișiere RAG în blob store...")
+        
+        return moved
+    except Error as e:
+        print(f"❌ Eroare la migrarea rag_file.file_data: {e}")
+        if connection:
+            connection.rollback()
+        return moved
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
 # ==================== OPERAȚII PE TABELUL chat_session ====================
 
 def create_chat_session(user_id: int, client_chat_id: int, title: str = None) -> Optional[int]:
@@ -775,6 +1227,186 @@ def get_conversation_history(chat_id: str = None, session_id: int = None, user_i
             cursor.close()
             connection.close()
 
+def _has_user_chat_file_info(cursor) -> bool:
+    """Verifică dacă coloana file_info există în user_chat_id"""
+    return _column_exists(cursor, 'user_chat_id', 'file_info')
+
+def _history_scope(cursor, chat_id: str = None, session_id: int = None, user_id: int = None):
+    """Construiește clauza WHERE pentru istoric (sesiune sau chat vechi). Returnează (where, params) sau None."""
+    if session_id:
+        return "id_chat_session = %s", [session_id]
+    if chat_id:
+        try:
+            client_chat_id = int(chat_id)
+        except ValueError:
+            cursor.execute("SELECT id FROM client_chat WHERE name = %s", (chat_id,))
+            result = cursor.fetchone()
+            if not result:
+                return None
+            client_chat_id = result['id']
+        if user_id:
+            return "id_client_chat = %s AND user_id = %s", [client_chat_id, user_id]
+        return "id_client_chat = %s", [client_chat_id]
+    return None
+
+def _history_row_to_message(row: Dict[str, Any], has_file_info: bool) -> Dict[str, Any]:
+    """Convertește un rând din user_chat_id la formatul de mesaj (cu id pentru paginare)"""
+    message = {
+        "id": row['id'],
+        "role": row['role'],
+        "content": row['content']
+    }
+    if has_file_info:
+        file_info_value = row.get('file_info')
+        message['file_info'] = None
+        if file_info_value:
+            try:
+                if isinstance(file_info_value, str):
+                    if file_info_value.strip():
+                        message['file_info'] = json.loads(file_info_value)
+                else:
+                    message['file_info'] = file_info_value
+            except (json.JSONDecodeError, TypeError) as e:
+                print(f"⚠️ Eroare la parsarea file_info: {e}, valoare: {file_info_value}")
+    return message
+
+def _fetch_history_desc(cursor, where: str, params: list, has_file_info: bool,
+                        limit: int, before: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Citește mesajele în ordine inversă (cele mai noi primele) folosind keyset pe (created_at, id).
+    Folosește indexurile compuse (id_chat_session, created_at) / (id_client_chat, user_id, created_at).
+    """
+    fields = "id, role, content, created_at" + (", file_info" if has_file_info else "")
+    query = f"SELECT {fields} FROM user_chat_id WHERE {where}"
+    query_params = list(params)
+    if before:
+        query += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+        query_params.extend([before['created_at'], before['created_at'], before['id']])
+    query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+    query_params.append(limit)
+    cursor.execute(query, tuple(query_params))
+    return cursor.fetchall()
+
+def get_conversation_page(chat_id: str = None, session_id: int = None, user_id: int = None,
+                          before_id: int = None, limit: int = 50) -> Dict[str, Any]:
+    """
+    Obține o pagină din istoricul conversației (paginare keyset, de la coadă spre început).
+
+    Args:
+        before_id: ID-ul celui mai vechi mesaj deja încărcat (None = ultimele mesaje)
+        limit: Numărul maxim de mesaje din pagină
+
+    Returns:
+        {"messages": [...] (ordine cronologică), "has_more": bool, "next_before_id": int | None}
+    """
+    empty = {"messages": [], "has_more": False, "next_before_id": None}
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+
+        scope = _history_scope(cursor, chat_id, session_id, user_id)
+        if not scope:
+            return empty
+        where, params = scope
+        has_file_info = _has_user_chat_file_info(cursor)
+
+        before = None
+        if before_id:
+            # Cursorul keyset: (created_at, id) al mesajului de referință, limitat la același scope
+            cursor.execute(f"SELECT id, created_at FROM user_chat_id WHERE id = %s AND {where}", (before_id, *params))
+            before = cursor.fetchone()
+            if not before:
+                return empty
+
+        # Citim un rând în plus pentru a ști dacă mai există mesaje mai vechi
+        rows = _fetch_history_desc(cursor, where, params, has_file_info, limit + 1, before)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        messages = [_history_row_to_message(row, has_file_info) for row in reversed(rows)]
+        return {
+            "messages": messages,
+            "has_more": has_more,
+            "next_before_id": messages[0]['id'] if has_more and messages else None
+        }
+    except Error as e:
+        print(f"❌ Eroare la citirea paginii de conversație: {e}")
+        return empty
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def get_recent_conversation_history(chat_id: str = None, session_id: int = None, user_id: int = None,
+                                    max_messages: int = None, max_chars: int = None,
+                                    min_messages: int = 2, batch_size: int = 20) -> List[Dict[str, Any]]:
+    """
+    Obține ultimele mesaje ale conversației care încap în bugetul de context.
+    Citește în ordine inversă, în loturi, și se oprește imediat ce bugetul este atins
+    (nu încarcă tot istoricul sesiunii).
+
+    Args:
+        max_messages: Numărul maxim de mesaje returnate (None = fără limită)
+        max_chars: Bugetul de caractere (~4 caractere = 1 token); None = fără limită
+        min_messages: Numărul minim de mesaje păstrate chiar dacă depășesc bugetul
+
+    Returns:
+        Lista de mesaje în ordine cronologică
+    """
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+
+        scope = _history_scope(cursor, chat_id, session_id, user_id)
+        if not scope:
+            return []
+        where, params = scope
+        has_file_info = _has_user_chat_file_info(cursor)
+
+        selected = []
+        total_chars = 0
+        before = None
+        done = False
+
+        while not done:
+            wanted = batch_size if max_messages is None else min(batch_size, max_messages - len(selected))
+            if wanted <= 0:
+                break
+            rows = _fetch_history_desc(cursor, where, params, has_file_info, wanted, before)
+
+            for row in rows:
+                message = _history_row_to_message(row, has_file_info)
+                message_chars = len(message.get('content') or '')
+                file_info = message.get('file_info')
+                if isinstance(file_info, dict) and file_info.get('text'):
+                    # În context intră și un extras de max 500 caractere din fișierul atașat
+                    message_chars += min(len(file_info['text']), 500)
+
+                if max_chars is not None and total_chars + message_chars > max_chars and len(selected) >= min_messages:
+                    done = True
+                    break
+                selected.append(message)
+                total_chars += message_chars
+                if max_messages is not None and len(selected) >= max_messages:
+                    done = True
+                    break
+
+            if len(rows) < wanted:
+                break
+            before = {"id": rows[-1]['id'], "created_at": rows[-1]['created_at']}
+
+        selected.reverse()
+        return selected
+    except Error as e:
+        print(f"❌ Eroare la citirea istoricului recent: {e}")
+        return []
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+
 def add_message_to_conversation(session_id: int = None, chat_id: str = None, role: str = None, content: str = None, user_id: int = None, file_info: dict = None) -> bool:
     print("=" * 80)
     print("🔍 DEBUG add_message_to_conversation - ÎNCEPUT")
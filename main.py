@@ -2,10 +2,11 @@ from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from contextlib import asynccontextmanager
 import traceback
 
 # Importă router-urile
-from routers import auth, chat, admin, files, static, ocr
+from routers import auth, chat, admin, files, static, ocr, health
 
 # Importă router PDF (opțional - doar dacă reportlab este disponibil)
 # Comentat pentru că router-urile nu există încă
@@ -25,10 +26,69 @@ PDF_GENERATOR_AVAILABLE = False
 #     PDF_FORM_AVAILABLE = False
 PDF_FORM_AVAILABLE = False
 
-app = FastAPI(title="Integra AI Builder")
+# OCRProcessor se încarcă la primul request care necesită OCR (lazy loading), cu excepția
+# limbilor din OCR_WARMUP_LANGS, pre-încărcate la pornire. Modelele nefolosite mai mult de
+# OCR_IDLE_UNLOAD_SECONDS sunt descărcate periodic pentru a elibera memoria.
+async def warm_up_ocr_models():
+    """Pre-încarcă modelele OCR configurate și pornește descărcarea modelelor nefolosite"""
+    import asyncio
+    from ocr_processor.singleton import get_ocr_registry, OCR_WARMUP_LANGS, OCR_IDLE_UNLOAD_SECONDS
+    
+    registry = get_ocr_registry()
+    loop = asyncio.get_event_loop()
+    if OCR_WARMUP_LANGS:
+        loaded = await loop.run_in_executor(None, registry.warm_up, OCR_WARMUP_LANGS)
+        print(f"🔥 Modele OCR pre-încărcate: {', '.join(loaded) or 'niciunul'}")
+    
+    if OCR_IDLE_UNLOAD_SECONDS > 0:
+        async def unload_idle_models():
+            while True:
+                await asyncio.sleep(max(OCR_IDLE_UNLOAD_SECONDS / 2, 30))
+                await loop.run_in_executor(None, registry.unload_idle, OCR_IDLE_UNLOAD_SECONDS)
+        
+        asyncio.create_task(unload_idle_models())
+
+# Job-urile de ingestie RAG (upload) rulează în fundal, pe task-uri worker din fiecare proces
+async def start_rag_jobs():
+    """Pornește worker-ele care procesează coada de job-uri RAG și migrarea embeddings (dacă e cazul)"""
+    import asyncio
+    from core.rag_jobs import start_rag_job_workers
+    from core.rag_reindex import EMBEDDING_AUTO_MIGRATE, enqueue_embedding_migration
+    start_rag_job_workers()
+    if EMBEDDING_AUTO_MIGRATE:
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, enqueue_embedding_migration)
+        except Exception as e:
+            print(f"⚠️ Migrarea embeddings nu a putut fi pornită: {e}")
+
+async def stop_rag_jobs():
+    """Oprește worker-ele RAG; job-urile în lucru revin în coadă"""
+    from core.rag_jobs import stop_rag_job_workers
+    await stop_rag_job_workers()
+
+async def shutdown_ocr_workers():
+    """Oprește pool-ul de procese OCR (dacă a fost pornit)"""
+    from ocr_processor.worker_pool import shutdown_ocr_executor
+    shutdown_ocr_executor()
+
+# Modelele Ollama (chatbot-uri active + EMBEDDING_MODEL) sunt pre-încărcate în fundal și ținute
+# încărcate (core/model_warmup.py); GET /health/ready devine verde când sunt rezidente
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Pornirea și oprirea serviciilor de fundal ale fiecărui proces worker"""
+    from core.model_warmup import get_model_warmup
+    model_warmup = get_model_warmup()
+    model_warmup.start()
+    await warm_up_ocr_models()
+    await start_rag_jobs()
+    try:
+        yield
+    finally:
+        await model_warmup.stop()
+        await stop_rag_jobs()
+        await shutdown_ocr_workers()
 
-# OCRProcessor se va încărca automat la primul request care necesită OCR (lazy loading)
-# Nu mai pre-încărcăm la start-up pentru a accelera pornirea serverului
+app = FastAPI(title="Integra AI Builder", lifespan=lifespan)
 
 # Exception handler global pentru a returna erori ca JSON
 @app.exception_handler(Exception)
@@ -73,6 +133,7 @@ app.include_router(admin.router)
 app.include_router(files.router)
 app.include_router(static.router)
 app.include_router(ocr.router)
+app.include_router(health.router)
 
 # Înregistrează router PDF dacă este disponibil
 if PDF_GENERATOR_AVAILABLE:
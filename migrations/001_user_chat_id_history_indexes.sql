@@ -0,0 +1,20 @@
+-- ============================================
+-- Indexuri compuse pentru citirea istoricului conversațiilor
+-- ============================================
+-- Istoricul este citit de la coadă (ultimele mesaje) cu paginare keyset pe (created_at, id):
+--   WHERE id_chat_session = ? [AND (created_at, id) < (?, ?)] ORDER BY created_at DESC, id DESC LIMIT ?
+-- InnoDB adaugă automat cheia primară (id) la finalul fiecărui index secundar,
+-- deci ordonarea după (created_at, id) este servită direct din index, fără filesort.
+--
+-- Rulare:
+--   mysql -u root -p Integra_chat_ai < migrations/001_user_chat_id_history_indexes.sql
+
+USE Integra_chat_ai;
+
+-- Mod nou: istoric per sesiune de chat
+ALTER TABLE user_chat_id
+    ADD INDEX idx_user_chat_session_created (id_chat_session, created_at);
+
+-- Mod vechi (compatibilitate): istoric per chatbot și utilizator
+ALTER TABLE user_chat_id
+    ADD INDEX idx_user_chat_client_user_created (id_client_chat, user_id, created_at);
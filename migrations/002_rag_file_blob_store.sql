@@ -0,0 +1,19 @@
+-- ============================================
+-- Fișierele RAG în blob store adresat după conținut
+-- ============================================
+-- Octeții fișierelor nu mai sunt păstrați în rag_file.file_data (BLOB), ci în blob store
+-- (core/blob_store.py - local sharduit după sha256 sau S3 compatibil).
+-- Rândul păstrează doar hash-ul (file_sha256) și dimensiunea (file_size).
+-- Încărcările identice au același hash și sunt stocate o singură dată.
+--
+-- Rulare:
+--   mysql -u root -p Integra_chat_ai < migrations/002_rag_file_blob_store.sql
+-- Apoi mută BLOB-urile existente în blob store (în loturi mici):
+--   python -c "from database import migrate_rag_file_data_to_blob_store; migrate_rag_file_data_to_blob_store()"
+
+USE Integra_chat_ai;
+
+ALTER TABLE rag_file
+    ADD COLUMN file_sha256 CHAR(64) NULL,
+    ADD COLUMN file_size BIGINT NULL,
+    ADD INDEX idx_rag_file_sha256 (file_sha256);
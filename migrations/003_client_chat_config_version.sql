@@ -0,0 +1,16 @@
+-- ============================================
+-- Versiune config per chatbot (invalidarea cache-ului între procese worker)
+-- ============================================
+-- Fiecare worker (uvicorn --workers N) are propriul cache de config-uri (core/cache.py).
+-- La orice modificare (prompt, model, fișiere RAG) config_version este incrementat,
+-- iar fiecare worker verifică periodic (CONFIG_CACHE_POLL_SECONDS) versiunile config-urilor
+-- din cache cu o singură interogare pe cheia primară și le reîncarcă pe cele modificate.
+-- Fără această coloană, cache-ul expiră doar după CONFIG_CACHE_TTL_SECONDS.
+--
+-- Rulare:
+--   mysql -u root -p Integra_chat_ai < migrations/003_client_chat_config_version.sql
+
+USE Integra_chat_ai;
+
+ALTER TABLE client_chat
+    ADD COLUMN config_version INT UNSIGNED NOT NULL DEFAULT 0;
@@ -0,0 +1,15 @@
+-- ============================================
+-- Setări per chatbot (client_chat.settings)
+-- ============================================
+-- Setări tehnice per tenant, ca obiect JSON grupat pe secțiuni (core/tenant_settings.py), de ex.
+-- cuantizarea vectorilor RAG: {"rag": {"quantization": "int8", "rerank_candidates": 80}}.
+-- Se modifică prin PUT /admin/tenant/{chat_id}/config cu {"settings": {...}} (modificări parțiale);
+-- setările lipsă folosesc valorile implicite din .env (ex: RAG_QUANTIZATION).
+--
+-- Rulare:
+--   mysql -u root -p Integra_chat_ai < migrations/004_client_chat_settings.sql
+
+USE Integra_chat_ai;
+
+ALTER TABLE client_chat
+    ADD COLUMN settings JSON NULL;
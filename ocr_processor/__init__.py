@@ -4,7 +4,8 @@ Modul pentru procesarea OCR folosind PaddleOCR și preprocesare OpenCV.
 
 from .processor import OCRProcessor, process_document, process_image, process_pdf
 from .postprocess import correct_ocr_text, identify_missing_fields
-from .singleton import get_ocr_processor
+from .singleton import get_ocr_processor, get_ocr_registry, OCRModelRegistry
+from .result_cache import get_ocr_cache, OCRResultCache
 
 __all__ = [
     'OCRProcessor', 
@@ -13,6 +14,10 @@ __all__ = [
     'process_pdf',
     'correct_ocr_text',
     'identify_missing_fields',
-    'get_ocr_processor'
+    'get_ocr_processor',
+    'get_ocr_registry',
+    'OCRModelRegistry',
+    'get_ocr_cache',
+    'OCRResultCache'
 ]
 
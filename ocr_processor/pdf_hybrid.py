@@ -0,0 +1,198 @@
+"""
+Extragere hibridă pentru PDF-uri mixte (ex: pagini tipărite urmate de anexe scanate).
+
+Fiecare pagină este clasificată după stratul de text (număr / densitate de caractere) și
+acoperirea cu imagini:
+- "text": are strat de text suficient - textul este folosit direct
+- "image": fără text, acoperită de imagini (pagină scanată) - trimisă la OCR
+- "empty": fără text și fără imagini - ignorată
+
+Clasificarea rulează pagină cu pagină pe un thread, în paralel cu OCR-ul paginilor scanate deja
+găsite (pool-ul OCR); rezultatele sunt reasamblate în ordinea paginilor. Stratul de text și
+acoperirea cu imagini vin din backend-ul configurat în core.pdf_text (PyMuPDF implicit).
+"""
+
+import asyncio
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from core.pdf_text import open_pdf_text
+
+# Sub acest număr de caractere, stratul de text al paginii este considerat absent
+PDF_TEXT_MIN_CHARS = int(os.getenv('PDF_TEXT_MIN_CHARS', '30'))
+# Fracțiunea minimă din pagină acoperită de imagini pentru ca o pagină fără text să meargă la OCR
+PDF_IMAGE_MIN_COVERAGE = float(os.getenv('PDF_IMAGE_MIN_COVERAGE', '0.3'))
+
+# Rulează OCR pe paginile primite (iterator asincron de numere de pagină, alimentat pe măsură ce
+# clasificarea găsește pagini scanate) și produce, în ordine, rezultate {"page", "text", "error", ...}
+OCRRunner = Callable[[AsyncIterator[int]], AsyncIterator[Dict[str, Any]]]
+
+
+def classify_page(chars: int, image_coverage: Optional[float]) -> str:
+    """
+    Clasifică o pagină: "text", "image" sau "empty".
+    image_coverage=None înseamnă necunoscut (backend fără poziții de imagini): o pagină fără text
+    este atunci trimisă la OCR, ca înainte.
+    """
+    if chars >= PDF_TEXT_MIN_CHARS:
+        return "text"
+    if image_coverage is None or image_coverage >= PDF_IMAGE_MIN_COVERAGE:
+        return "image"
+    return "text" if chars else "empty"
+
+
+def _page_info(page_num: int, text: str, coverage: Optional[float], area_sq_in: float) -> Dict[str, Any]:
+    chars = len(text.strip())
+    return {
+        "page": page_num,
+        "kind": classify_page(chars, coverage),
+        "chars": chars,
+        "text_density": round(chars / area_sq_in, 1) if area_sq_in else None,
+        "image_coverage": round(coverage, 3) if coverage is not None else None,
+        "text": text
+    }
+
+
+def iter_page_analysis(pdf_bytes: bytes, first_page: int = 1, last_page: Optional[int] = None,
+                       layout: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Analizează paginile [first_page, last_page] una câte una: stratul de text, densitatea lui
+    (caractere / inch²), acoperirea cu imagini și clasificarea.
+    layout=True păstrează așezarea textului din pagină (formulare), vezi core.pdf_text.
+
+    Yields:
+        {"page", "kind", "chars", "text_density", "image_coverage", "text"}
+    """
+    with open_pdf_text(pdf_bytes) as pdf:
+        last = min(last_page or pdf.page_count, pdf.page_count)
+        for page_num in range(max(first_page, 1), last + 1):
+            try:
+                text = pdf.page_text(page_num, layout)
+            except Exception as e:
+                print(f"⚠️ Eroare la extragerea paginii {page_num}: {e}")
+                text = ""
+            yield _page_info(page_num, text, pdf.image_coverage(page_num), pdf.page_area_sq_in(page_num))
+
+
+def paddle_ocr_runner(pdf_bytes: bytes, lang: str = 'ro', dpi: int = 150, return_boxes: bool = False) -> OCRRunner:
+    """OCR cu PaddleOCR (pool-ul de procese, dacă este configurat), cu cache-ul OCR per pagină"""
+    from .result_cache import cached_pdf_page_stream
+    from .worker_pool import ocr_pages
+
+    def run(page_numbers: AsyncIterator[int]) -> AsyncIterator[Dict[str, Any]]:
+        pages, cached, page_key = cached_pdf_page_stream(pdf_bytes, page_numbers, lang, dpi, return_boxes)
+        return ocr_pages(pages, lang, return_boxes, cached=cached, page_key=page_key)
+
+    return run
+
+
+async def hybrid_pdf_pages(
+    pdf_bytes: bytes,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+    run_ocr: Optional[OCRRunner] = None,
+    ocr_method: str = "paddleocr",
+    layout: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Extrage textul fiecărei pagini: direct din stratul de text sau, pentru paginile scanate, prin
+    run_ocr. Paginile scanate sunt trimise la OCR imediat ce sunt găsite, iar clasificarea
+    paginilor următoare continuă în paralel.
+
+    Args:
+        run_ocr: Funcția OCR (ex: paddle_ocr_runner(...)); None = fără OCR (paginile scanate rămân goale)
+        ocr_method: Numele metodei OCR raportat în rezultate
+        layout: Păstrează așezarea textului paginilor cu strat de text (formulare)
+
+    Yields (în ordinea paginilor):
+        {"page", "kind", "chars", "text_density", "image_coverage", "text", "method", ["error"], ...}
+        method: "direct" (strat de text), ocr_method sau None (pagină goală / OCR indisponibil)
+    """
+    loop = asyncio.get_running_loop()
+    analysis = iter_page_analysis(pdf_bytes, first_page, last_page, layout)
+    # Coada este citită pe event loop (nu pe thread pool, ocupat de clasificare și rasterizare)
+    ocr_queue: "asyncio.Queue[Optional[int]]" = asyncio.Queue()
+    ocr_results: Dict[int, asyncio.Future] = {}
+    ocr_task: Optional[asyncio.Task] = None
+    ocr_error: Dict[str, str] = {}
+    pending: deque = deque()
+
+    async def queued_pages() -> AsyncIterator[int]:
+        while True:
+            page_num = await ocr_queue.get()
+            if page_num is None:
+                return
+            yield page_num
+
+    def resolve(page_num: int, result: Dict[str, Any]):
+        future = ocr_results.setdefault(page_num, loop.create_future())
+        if not future.done():
+            future.set_result(result)
+
+    async def consume_ocr():
+        try:
+            async for result in run_ocr(queued_pages()):
+                resolve(result["page"], result)
+        except Exception as e:
+            print(f"⚠️ Eroare OCR în extragerea hibridă: {e}")
+            ocr_error["error"] = str(e)
+        finally:
+            # Paginile rămase fără rezultat (OCR oprit de o eroare) primesc eroarea
+            for page_num, future in list(ocr_results.items()):
+                if not future.done():
+                    future.set_result({"page": page_num, "text": "", "error": ocr_error.get("error", "OCR întrerupt")})
+
+    def merged(info: Dict[str, Any], result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if info["kind"] == "text":
+            return {**info, "method": "direct"}
+        if result is None:
+            return {**info, "text": "", "method": None}
+        merged_result = {**info, "text": result.get("text") or "", "method": ocr_method}
+        for key in ("error", "boxes", "preprocess"):
+            if result.get(key):
+                merged_result[key] = result[key]
+        if (result.get("preprocess") or {}).get("cached"):
+            merged_result["cached"] = True
+        return merged_result
+
+    def is_ocr_page(info: Dict[str, Any]) -> bool:
+        return info["kind"] == "image" and run_ocr is not None
+
+    try:
+        while True:
+            info = await loop.run_in_executor(None, next, analysis, None)
+            if info is None:
+                break
+            if is_ocr_page(info):
+                if ocr_error:
+                    resolve(info["page"], {"page": info["page"], "text": "", "error": ocr_error["error"]})
+                else:
+                    ocr_results.setdefault(info["page"], loop.create_future())
+                    ocr_queue.put_nowait(info["page"])
+                    if ocr_task is None:
+                        ocr_task = asyncio.ensure_future(consume_ocr())
+            pending.append(info)
+            # Emite paginile deja gata, în ordine
+            while pending and (not is_ocr_page(pending[0]) or ocr_results[pending[0]["page"]].done()):
+                head = pending.popleft()
+                yield merged(head, ocr_results[head["page"]].result() if is_ocr_page(head) else None)
+
+        ocr_queue.put_nowait(None)
+        while pending:
+            head = pending.popleft()
+            result = await ocr_results[head["page"]] if is_ocr_page(head) else None
+            yield merged(head, result)
+    finally:
+        # Oprește iteratorul de pagini OCR dacă fluxul a fost întrerupt
+        ocr_queue.put_nowait(None)
+        if ocr_task is not None and not ocr_task.done():
+            ocr_task.cancel()
+
+
+def summarize_pages(pages: list) -> Dict[str, int]:
+    """Numărul de pagini per clasă (pentru răspunsuri și log-uri)"""
+    summary = {"text": 0, "image": 0, "empty": 0}
+    for page in pages:
+        summary[page["kind"]] = summary.get(page["kind"], 0) + 1
+    return summary
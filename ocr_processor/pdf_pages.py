@@ -0,0 +1,145 @@
+"""
+Rasterizarea paginilor PDF pentru OCR, doar pentru intervalul de pagini cerut.
+Paginile sunt produse una câte una (generator), deci memoria folosită este de ordinul
+unei singure pagini, iar timpul este proporțional cu numărul de pagini procesate.
+
+Backend-uri: PyMuPDF (fitz, pixmap per pagină) preferat, pdf2image (first_page/last_page) ca rezervă.
+"""
+
+import asyncio
+import io
+from collections import deque
+from typing import AsyncIterator, Callable, Iterable, Iterator, Optional, Set, Tuple
+
+# Verifică disponibilitatea PyMuPDF
+try:
+    import fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    fitz = None
+    PYMUPDF_AVAILABLE = False
+
+# Verifică disponibilitatea pdf2image
+try:
+    from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+    PDF2IMAGE_AVAILABLE = True
+except ImportError:
+    PDF2IMAGE_AVAILABLE = False
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# MuPDF nu este thread-safe: același lock ca pentru extragerea stratului de text (core.pdf_text)
+from core.pdf_text import FITZ_LOCK
+
+RASTERIZE_AVAILABLE = (PYMUPDF_AVAILABLE and Image is not None) or PDF2IMAGE_AVAILABLE
+
+
+def get_pdf_page_count(pdf_bytes: bytes) -> int:
+    """Numărul de pagini al PDF-ului, fără a rasteriza nimic"""
+    if PYMUPDF_AVAILABLE:
+        with FITZ_LOCK, fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            return doc.page_count
+    if PDF2IMAGE_AVAILABLE:
+        return int(pdfinfo_from_bytes(pdf_bytes).get("Pages", 0))
+    import PyPDF2
+    return len(PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+
+def iter_pdf_pages(
+    pdf_bytes: bytes,
+    dpi: int = 150,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+    skip_pages: Optional[Set[int]] = None
+) -> Iterator[Tuple[int, Optional["Image.Image"]]]:
+    """
+    Rasterizează paginile [first_page, last_page] (1-based, inclusiv) una câte una.
+    Paginile din skip_pages (ex: deja în cache-ul OCR) nu sunt rasterizate și apar ca (număr, None).
+
+    Yields:
+        (număr pagină, imagine PIL RGB sau None)
+    """
+    skip_pages = skip_pages or set()
+    total = get_pdf_page_count(pdf_bytes)
+    last = min(last_page or total, total)
+    return render_pdf_pages(pdf_bytes, range(max(first_page, 1), last + 1), dpi, skip_pages.__contains__)
+
+
+def render_pdf_pages(
+    pdf_bytes: bytes,
+    page_numbers: Iterable[int],
+    dpi: int = 150,
+    skip: Optional[Callable[[int], bool]] = None
+) -> Iterator[Tuple[int, Optional["Image.Image"]]]:
+    """
+    Rasterizează paginile date (1-based), în ordinea primită; page_numbers poate fi un iterator
+    produs pe parcurs (ex: paginile scanate descoperite de clasificatorul hibrid).
+    Paginile pentru care skip(număr) este adevărat nu sunt rasterizate și apar ca (număr, None).
+    """
+    if PYMUPDF_AVAILABLE and Image is not None:
+        with FITZ_LOCK:
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        try:
+            for page_num in page_numbers:
+                if skip is not None and skip(page_num):
+                    yield page_num, None
+                    continue
+                with FITZ_LOCK:
+                    pixmap = doc.load_page(page_num - 1).get_pixmap(dpi=dpi, alpha=False)
+                    image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+                    del pixmap
+                yield page_num, image
+        finally:
+            with FITZ_LOCK:
+                doc.close()
+        return
+
+    if not PDF2IMAGE_AVAILABLE:
+        raise ImportError("Nici PyMuPDF, nici pdf2image nu sunt instalate. Ruleaza: pip install pymupdf")
+
+    for page_num in page_numbers:
+        if skip is not None and skip(page_num):
+            yield page_num, None
+            continue
+        # Poppler rasterizează doar pagina cerută
+        images = convert_from_bytes(pdf_bytes, dpi=dpi, first_page=page_num, last_page=page_num)
+        if images:
+            yield page_num, images[0]
+
+
+async def render_pdf_pages_async(
+    pdf_bytes: bytes,
+    page_numbers: AsyncIterator[int],
+    dpi: int = 150,
+    skip: Optional[Callable[[int], bool]] = None
+) -> AsyncIterator[Tuple[int, Optional["Image.Image"]]]:
+    """
+    Ca render_pdf_pages, pentru numere de pagină produse asincron (ex: clasificatorul hibrid).
+    Numărul este așteptat pe event loop; pe thread pool rulează doar rasterizarea unei pagini deja
+    cunoscute, deci niciun thread nu rămâne blocat în așteptarea următoarei pagini.
+    """
+    loop = asyncio.get_running_loop()
+    known: deque = deque()
+
+    def known_pages() -> Iterator[int]:
+        # render_pdf_pages cere următorul număr doar după ce a fost adăugat în known
+        while known:
+            yield known.popleft()
+
+    pages = render_pdf_pages(pdf_bytes, known_pages(), dpi, skip)
+    try:
+        async for page_num in page_numbers:
+            known.append(page_num)
+            page = await loop.run_in_executor(None, next, pages, None)
+            if page is None:
+                return
+            yield page
+    finally:
+        try:
+            pages.close()
+        except ValueError:
+            # Generatorul încă rulează pe thread pool (flux întrerupt în timpul rasterizării)
+            pass
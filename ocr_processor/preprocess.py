@@ -0,0 +1,250 @@
+"""
+Pipeline de preprocesare pentru imaginile color trimise la PaddleOCR.
+
+Înclinarea este estimată o singură dată, pe o copie grayscale micșorată, și corectată cu un singur
+warpAffine pe imaginea color (în loc de deskew separat pe fiecare canal B/G/R, care calcula
+trei unghiuri posibil diferite și rotea de trei ori imaginea la rezoluție completă).
+
+Etapele pot fi activate / dezactivate individual (OCR_PREPROCESS_RESIZE, OCR_PREPROCESS_DESKEW,
+OCR_PREPROCESS_DENOISE sau argumentele funcției preprocess_color_image). Pe lângă asta, fiecare
+imagine este evaluată rapid (pe aceeași copie micșorată) și etapele inutile sunt sărite:
+- resize: pozele de 12+ MP sunt micșorate până când înălțimea estimată a textului ajunge la
+  OCR_TARGET_TEXT_HEIGHT px (PaddleOCR oricum redimensionează intern)
+- deskew: doar dacă unghiul estimat depășește MIN_SKEW_ANGLE
+- denoise: sărit pentru imaginile deja neclare (varianța Laplacianului sub prag), unde
+  bilateralFilter ar pierde și mai mult din contur
+"""
+
+import hashlib
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+def _env_flag(name: str, default: str = '1') -> bool:
+    return os.getenv(name, default).lower() not in ('0', 'false', 'no')
+
+
+# Etapele pipeline-ului de preprocesare
+OCR_PREPROCESS_RESIZE = _env_flag('OCR_PREPROCESS_RESIZE')
+OCR_PREPROCESS_DESKEW = _env_flag('OCR_PREPROCESS_DESKEW')
+OCR_PREPROCESS_DENOISE = _env_flag('OCR_PREPROCESS_DENOISE')
+# Înălțimea țintă a textului (px) după micșorare; imaginile nu sunt niciodată mărite
+OCR_TARGET_TEXT_HEIGHT = float(os.getenv('OCR_TARGET_TEXT_HEIGHT', '32'))
+# Latura maximă (px) a imaginii trimise la OCR, când înălțimea textului nu poate fi estimată
+OCR_MAX_IMAGE_SIDE = int(os.getenv('OCR_MAX_IMAGE_SIDE', '4000'))
+# Sub această varianță a Laplacianului (măsurată pe copia micșorată) imaginea este considerată neclară (denoise sărit)
+OCR_DENOISE_MIN_BLUR_VARIANCE = float(os.getenv('OCR_DENOISE_MIN_BLUR_VARIANCE', '250'))
+# Latura maximă (px) a copiei grayscale pe care se estimează înclinarea
+SKEW_ESTIMATE_MAX_SIDE = int(os.getenv('OCR_SKEW_ESTIMATE_MAX_SIDE', '1024'))
+# Sub acest unghi (grade) imaginea nu este rotită
+MIN_SKEW_ANGLE = 0.5
+
+
+def preprocess_fingerprint() -> str:
+    """
+    Amprenta configurației efective de preprocesare (etape și praguri din mediu); face parte din
+    cheia cache-ului OCR, ca o modificare a configurației să nu servească rezultate vechi.
+    """
+    config = (
+        OCR_PREPROCESS_RESIZE, OCR_PREPROCESS_DESKEW, OCR_PREPROCESS_DENOISE,
+        OCR_TARGET_TEXT_HEIGHT, OCR_MAX_IMAGE_SIDE, OCR_DENOISE_MIN_BLUR_VARIANCE,
+        SKEW_ESTIMATE_MAX_SIDE, MIN_SKEW_ANGLE,
+    )
+    return hashlib.sha256(repr(config).encode("utf-8")).hexdigest()[:8]
+
+
+def to_small_gray(image: "np.ndarray", max_side: int = SKEW_ESTIMATE_MAX_SIDE) -> "np.ndarray":
+    """Copie grayscale, micșorată astfel încât latura cea mai mare să fie cel mult max_side"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    h, w = gray.shape[:2]
+    scale = max_side / float(max(h, w))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def text_mask(gray: "np.ndarray") -> "np.ndarray":
+    """Pixelii de text (închiși la culoare pe fond deschis) ca prim-plan (Otsu)"""
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    return mask
+
+
+def estimate_text_height(mask: "np.ndarray", min_components: int = 20) -> Optional[float]:
+    """
+    Înălțimea mediană (px) a componentelor conexe de mărimea unor caractere, pe masca de text.
+    Returnează None dacă nu sunt destule componente (ex: fotografie fără text).
+    """
+    h, w = mask.shape[:2]
+    count, _, components, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if count <= 1:
+        return None
+    heights = components[1:, cv2.CC_STAT_HEIGHT]
+    widths = components[1:, cv2.CC_STAT_WIDTH]
+    areas = components[1:, cv2.CC_STAT_AREA]
+    # Ignoră punctele de zgomot și blocurile mari (linii de tabel, imagini, margini)
+    chars = heights[(heights >= 3) & (heights < h / 10) & (widths < w / 5) & (areas >= 6)]
+    if len(chars) < min_components:
+        return None
+    return float(np.median(chars))
+
+
+def blur_variance(gray: "np.ndarray") -> float:
+    """Varianța Laplacianului: valori mici = imagine neclară"""
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def estimate_skew_angle(gray: "np.ndarray", mask: Optional["np.ndarray"] = None) -> float:
+    """
+    Estimează înclinarea textului (grade, în [-45, 45]) pe o imagine grayscale.
+    Pozitiv = textul coboară spre dreapta; rotate_image(image, unghi) îl îndreaptă.
+    """
+    if mask is None:
+        mask = text_mask(gray)
+    points = cv2.findNonZero(mask)
+    if points is None or len(points) < 10:
+        return 0.0
+
+    # Unghiul unei laturi a dreptunghiului minim, independent de convenția versiunii OpenCV
+    corners = cv2.boxPoints(cv2.minAreaRect(points))
+    (x0, y0), (x1, y1) = corners[0], corners[1]
+    angle = math.degrees(math.atan2(y1 - y0, x1 - x0))
+    while angle > 45:
+        angle -= 90
+    while angle < -45:
+        angle += 90
+    return angle
+
+
+def rotate_image(image: "np.ndarray", angle: float) -> "np.ndarray":
+    """Rotește imaginea (color sau grayscale) cu un singur warpAffine"""
+    h, w = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def denoise_color(image: "np.ndarray") -> "np.ndarray":
+    """Reducere zgomot care păstrează marginile (și culorile)"""
+    return cv2.bilateralFilter(image, 5, 50, 50)
+
+
+def _resize_scale(text_height: Optional[float], width: int, height: int) -> float:
+    """Factorul de micșorare (<= 1): textul adus la OCR_TARGET_TEXT_HEIGHT, latura maximă limitată"""
+    scale = 1.0
+    if text_height:
+        scale = min(scale, OCR_TARGET_TEXT_HEIGHT / text_height)
+    scale = min(scale, OCR_MAX_IMAGE_SIDE / float(max(width, height)))
+    # Sub ~20% micșorare câștigul nu justifică interpolarea
+    return scale if scale < 0.8 else 1.0
+
+
+def preprocess_color_image(
+    image: "np.ndarray",
+    resize: Optional[bool] = None,
+    deskew: Optional[bool] = None,
+    denoise: Optional[bool] = None,
+    stats: Optional[Dict[str, Any]] = None
+) -> "np.ndarray":
+    """
+    Preprocesează o imagine BGR pentru PaddleOCR (fără binarizare - PaddleOCR preferă imagini color).
+
+    Args:
+        image: Imaginea BGR (3 canale) sau grayscale
+        resize / deskew / denoise: Activează etapa; None = valoarea din configurare (env).
+            O etapă activă poate fi totuși sărită dacă măsurătorile arată că nu e necesară.
+        stats: Dacă este dat, primește etapele rulate ("stages"), cele sărite și motivul ("skipped"),
+               măsurătorile ("text_height", "blur_variance", "skew_angle"), factorul de scalare
+               ("scale" - coordonatele rezultatelor OCR trebuie împărțite la el) și duratele ("timings_ms")
+
+    Returns:
+        Imaginea preprocesată (BGR, 3 canale)
+    """
+    resize = OCR_PREPROCESS_RESIZE if resize is None else resize
+    deskew = OCR_PREPROCESS_DESKEW if deskew is None else deskew
+    denoise = OCR_PREPROCESS_DENOISE if denoise is None else denoise
+    stages = []
+    skipped: Dict[str, str] = {}
+    timings: Dict[str, float] = {}
+    metrics: Dict[str, Any] = {}
+    scale = 1.0
+
+    if len(image.shape) == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    height, width = image.shape[:2]
+
+    # Măsurători rapide, toate pe aceeași copie grayscale micșorată
+    started = time.perf_counter()
+    small = to_small_gray(image)
+    small_scale = small.shape[1] / float(width)
+    mask = text_mask(small) if (resize or deskew) else None
+    if resize:
+        small_text_height = estimate_text_height(mask)
+        metrics["text_height"] = round(small_text_height / small_scale, 1) if small_text_height else None
+    if denoise:
+        metrics["blur_variance"] = round(blur_variance(small), 1)
+    angle = estimate_skew_angle(small, mask) if deskew else 0.0
+    if deskew:
+        metrics["skew_angle"] = round(angle, 2)
+    timings["analyze"] = round((time.perf_counter() - started) * 1000, 2)
+
+    if resize:
+        scale = _resize_scale(metrics["text_height"], width, height)
+        if scale < 1.0:
+            started = time.perf_counter()
+            # INTER_AREA evită aliasing-ul la micșorări mari; până la 2x INTER_LINEAR e mult mai rapid
+            interpolation = cv2.INTER_LINEAR if scale >= 0.5 else cv2.INTER_AREA
+            image = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                               interpolation=interpolation)
+            timings["resize"] = round((time.perf_counter() - started) * 1000, 2)
+            stages.append("resize")
+        else:
+            skipped["resize"] = "text deja la rezoluția țintă" if metrics["text_height"] else "dimensiune sub limită"
+
+    if deskew:
+        if abs(angle) > MIN_SKEW_ANGLE:
+            started = time.perf_counter()
+            image = rotate_image(image, angle)
+            timings["deskew"] = round((time.perf_counter() - started) * 1000, 2)
+            stages.append("deskew")
+        else:
+            skipped["deskew"] = f"unghi {angle:.2f}° sub {MIN_SKEW_ANGLE}°"
+
+    if denoise:
+        if metrics["blur_variance"] >= OCR_DENOISE_MIN_BLUR_VARIANCE:
+            started = time.perf_counter()
+            image = denoise_color(image)
+            timings["denoise"] = round((time.perf_counter() - started) * 1000, 2)
+            stages.append("denoise")
+        else:
+            skipped["denoise"] = f"imagine neclară (varianță {metrics['blur_variance']})"
+
+    if stats is not None:
+        stats.update(metrics)
+        stats["stages"] = stages
+        stats["skipped"] = skipped
+        stats["scale"] = round(scale, 4)
+        stats["size"] = [image.shape[1], image.shape[0]]
+        stats["timings_ms"] = timings
+    return image
+
+
+def rescale_boxes(boxes: List[Dict[str, Any]], scale: float) -> List[Dict[str, Any]]:
+    """Readuce coordonatele bounding box-urilor la rezoluția imaginii originale"""
+    if scale == 1.0:
+        return boxes
+    for box in boxes:
+        coords = box.get('box')
+        if coords is not None:
+            box['box'] = [[float(x) / scale, float(y) / scale] for x, y in coords]
+    return boxes
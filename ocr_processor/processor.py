@@ -7,6 +7,10 @@ from typing import Tuple, Optional, List, Dict, Any, Union
 import io
 import os
 
+# Versiunea pipeline-ului de preprocesare; face parte din cheia cache-ului OCR.
+# Se incrementează la orice modificare a preprocesării care schimbă rezultatul OCR.
+PREPROCESS_VERSION = 3
+
 # Verifică disponibilitatea numpy
 try:
     import numpy as np
@@ -105,38 +109,31 @@ class OCRProcessor:
         
         return binary
     
-    def _preprocess_color_image(self, image: np.ndarray) -> np.ndarray:
+    def _preprocess_color_image(self, image: np.ndarray, stats: Optional[Dict[str, Any]] = None) -> np.ndarray:
         """
         Preprocesează imaginea color pentru PaddleOCR:
-        - Deskew (corecție înclinare) - păstrează color
+        - Micșorare adaptivă (după înălțimea estimată a textului)
+        - Deskew (corecție înclinare) - unghi estimat o singură dată, o singură rotire a imaginii color
         - Reducere zgomot - păstrează color
         - NU binarizează (PaddleOCR preferă imagini color)
         
+        Etapele pot fi dezactivate (OCR_PREPROCESS_RESIZE/DESKEW/DENOISE=0) și sunt sărite automat
+        când măsurătorile arată că nu sunt necesare, vezi ocr_processor/preprocess.py.
+        
         Args:
             image: Imaginea ca numpy array (BGR format din OpenCV, 3 canale)
+            stats: Dicționar opțional în care se raportează etapele rulate / sărite
         
         Returns:
             Imaginea preprocesată (color, 3 canale)
         """
-        # Asigură-te că imaginea este color
-        if len(image.shape) == 2:
-            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
-        
-        # 1. Deskew pe fiecare canal separat
-        b, g, r = cv2.split(image)
-        b_deskewed = self._deskew(b)
-        g_deskewed = self._deskew(g)
-        r_deskewed = self._deskew(r)
-        deskewed = cv2.merge([b_deskewed, g_deskewed, r_deskewed])
-        
-        # 2. Reducere zgomot (pe fiecare canal)
-        denoised = cv2.bilateralFilter(deskewed, 5, 50, 50)
-        
-        return denoised
+        from .preprocess import preprocess_color_image
+        return preprocess_color_image(image, stats=stats)
     
     def _deskew(self, image: np.ndarray) -> np.ndarray:
         """
         Corectează înclinarea textului din imagine.
+        Unghiul este estimat pe o copie micșorată; rotirea se aplică o singură dată.
         
         Args:
             image: Imaginea în grayscale
@@ -144,32 +141,13 @@ class OCRProcessor:
         Returns:
             Imaginea cu textul corectat
         """
-        # Detectează unghiul de înclinare folosind transformata Hough
-        coords = np.column_stack(np.where(image > 0))
+        from .preprocess import MIN_SKEW_ANGLE, estimate_skew_angle, rotate_image, to_small_gray
         
-        if len(coords) == 0:
-            return image
-        
-        # Calculează unghiul minim de rotație
-        angle = cv2.minAreaRect(coords)[-1]
-        
-        # Corectează unghiul
-        if angle < -45:
-            angle = -(90 + angle)
-        else:
-            angle = -angle
+        angle = estimate_skew_angle(to_small_gray(image))
         
         # Rotirea doar dacă unghiul este semnificativ (> 0.5 grade)
-        if abs(angle) > 0.5:
-            (h, w) = image.shape[:2]
-            center = (w // 2, h // 2)
-            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            rotated = cv2.warpAffine(
-                image, M, (w, h), 
-                flags=cv2.INTER_CUBIC, 
-                borderMode=cv2.BORDER_REPLICATE
-            )
-            return rotated
+        if abs(angle) > MIN_SKEW_ANGLE:
+            return rotate_image(image, angle)
         
         return image
     
@@ -213,7 +191,8 @@ class OCRProcessor:
     def extract_text(
         self, 
         image: np.ndarray, 
-        return_boxes: bool = False
+        return_boxes: bool = False,
+        stats: Optional[Dict[str, Any]] = None
     ) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
         """
         Extrage textul din imagine folosind OCR.
@@ -221,21 +200,25 @@ class OCRProcessor:
         Args:
             image: Imaginea ca numpy array (BGR sau grayscale)
             return_boxes: Dacă True, returnează și bounding boxes
+            stats: Dicționar opțional care primește etapele de preprocesare rulate / sărite
         
         Returns:
             Tuple (text, boxes)
             - text: Textul extras
             - boxes: Lista de bounding boxes (doar dacă return_boxes=True)
         """
+        from .preprocess import rescale_boxes
+        
         # PaddleOCR necesită imagini color (RGB), nu grayscale
         # Aplicăm doar preprocesări care nu afectează numărul de canale
+        preprocess_stats = stats if stats is not None else {}
         if len(image.shape) == 3:
-            # Imagine color - aplicăm doar reducere zgomot și deskew
-            processed = self._preprocess_color_image(image)
+            # Imagine color - micșorare adaptivă, deskew și reducere zgomot (doar cele necesare)
+            processed = self._preprocess_color_image(image, preprocess_stats)
         else:
             # Imagine grayscale - convertim la RGB
             processed = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
-            processed = self._preprocess_color_image(processed)
+            processed = self._preprocess_color_image(processed, preprocess_stats)
         
         # Extrage textul cu PaddleOCR
         # Versiunea 3.x a PaddleOCR nu acceptă parametrul cls
@@ -301,14 +284,16 @@ class OCRProcessor:
         full_text = '\n'.join(text_lines)
         
         if return_boxes:
-            return full_text, boxes
+            # Coordonatele sunt raportate la imaginea originală, nu la cea micșorată
+            return full_text, rescale_boxes(boxes, preprocess_stats.get("scale", 1.0))
         else:
             return full_text, None
     
     def process_image_bytes(
         self, 
         image_bytes: bytes, 
-        return_boxes: bool = False
+        return_boxes: bool = False,
+        stats: Optional[Dict[str, Any]] = None
     ) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
         """
         Procesează un fișier imagine și extrage textul.
@@ -316,6 +301,7 @@ class OCRProcessor:
         Args:
             image_bytes: Conținutul fișierului imagine ca bytes
             return_boxes: Dacă True, returnează și bounding boxes
+            stats: Dicționar opțional care primește etapele de preprocesare rulate / sărite
         
         Returns:
             Tuple (text, boxes)
@@ -327,12 +313,13 @@ class OCRProcessor:
         if image is None:
             raise ValueError("Nu s-a putut decoda imaginea")
         
-        return self.extract_text(image, return_boxes)
+        return self.extract_text(image, return_boxes, stats)
     
     def process_pil_image(
         self, 
         pil_image: Image.Image, 
-        return_boxes: bool = False
+        return_boxes: bool = False,
+        stats: Optional[Dict[str, Any]] = None
     ) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
         """
         Procesează o imagine PIL și extrage textul.
@@ -340,6 +327,7 @@ class OCRProcessor:
         Args:
             pil_image: Imaginea PIL
             return_boxes: Dacă True, returnează și bounding boxes
+            stats: Dicționar opțional care primește etapele de preprocesare rulate / sărite
         
         Returns:
             Tuple (text, boxes)
@@ -352,13 +340,28 @@ class OCRProcessor:
         # PIL folosește RGB, OpenCV folosește BGR
         image_bgr = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
         
-        return self.extract_text(image_bgr, return_boxes)
+        return self.extract_text(image_bgr, return_boxes, stats)
+
+
+def _get_processor(lang: str) -> OCRProcessor:
+    """Obține procesorul din registrul de modele (o singură încărcare PaddleOCR per limbă)"""
+    from .singleton import get_ocr_processor
+    
+    processor = get_ocr_processor(lang)
+    if processor is None:
+        if not PADDLEOCR_AVAILABLE:
+            raise ImportError("PaddleOCR nu este instalat. Ruleaza: pip install paddleocr")
+        if not OPENCV_AVAILABLE:
+            raise ImportError("OpenCV nu este instalat. Ruleaza: pip install opencv-python")
+        raise RuntimeError(f"OCRProcessor nu a putut fi inițializat pentru limba '{lang}'")
+    return processor
 
 
 def process_image(
     image_bytes: bytes, 
     lang: str = 'ro', 
-    return_boxes: bool = False
+    return_boxes: bool = False,
+    stats: Optional[Dict[str, Any]] = None
 ) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
     """
     Funcție helper pentru procesarea rapidă a unei imagini.
@@ -367,19 +370,39 @@ def process_image(
         image_bytes: Conținutul fișierului imagine ca bytes
         lang: Limba pentru OCR (default: 'ro')
         return_boxes: Dacă True, returnează și bounding boxes
+        stats: Dicționar opțional care primește etapele de preprocesare ("stages", "skipped", ...);
+               la un rezultat din cache conține doar {"cached": True}
     
     Returns:
         Tuple (text, boxes)
     """
-    processor = OCRProcessor(lang=lang)
-    return processor.process_image_bytes(image_bytes, return_boxes)
+    from .result_cache import content_hash, get_ocr_cache, ocr_cache_key
+    
+    cache = get_ocr_cache()
+    key = ocr_cache_key(content_hash(image_bytes), "paddleocr", lang, return_boxes=return_boxes) if cache else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            print("♻️ Cache OCR: imagine din cache")
+            if stats is not None:
+                stats["cached"] = True
+            return cached["text"], cached["boxes"]
+    
+    processor = _get_processor(lang)
+    text, boxes = processor.process_image_bytes(image_bytes, return_boxes, stats)
+    if cache is not None:
+        cache.put(key, text, boxes)
+    return text, boxes
 
 
 def process_pdf(
     pdf_bytes: bytes,
     lang: str = 'ro',
     return_boxes: bool = False,
-    dpi: int = 300
+    dpi: int = 300,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+    stats: Optional[Dict[str, Any]] = None
 ) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
     """
     Funcție helper pentru procesarea rapidă a unui PDF.
@@ -389,34 +412,48 @@ def process_pdf(
         lang: Limba pentru OCR (default: 'ro')
         return_boxes: Dacă True, returnează și bounding boxes
         dpi: Rezoluția pentru conversia PDF la imagini (default: 300)
+        first_page: Prima pagină procesată (1-based, default: 1)
+        last_page: Ultima pagină procesată (inclusiv, default: ultima pagină)
+        stats: Dicționar opțional; primește "pages": preprocesarea fiecărei pagini
     
     Returns:
-        Tuple (text, boxes) - textul din toate paginile concatenat
+        Tuple (text, boxes) - textul din paginile procesate concatenat
     """
-    if not PDF2IMAGE_AVAILABLE:
-        raise ImportError("pdf2image nu este instalat. Ruleaza: pip install pdf2image")
-    
-    processor = OCRProcessor(lang=lang)
+    from .pdf_pages import RASTERIZE_AVAILABLE
+    from .result_cache import cached_pdf_pages
+    from .worker_pool import ocr_pages_sync
     
-    # Convertește PDF la imagini
-    images = convert_from_bytes(pdf_bytes, dpi=dpi)
+    if not RASTERIZE_AVAILABLE:
+        raise ImportError("pdf2image nu este instalat. Ruleaza: pip install pdf2image (sau pip install pymupdf)")
     
     all_text_lines = []
     all_boxes = []
+    errors = []
+    pages_processed = 0
     
-    # Procesează fiecare pagină
-    for page_num, pil_image in enumerate(images):
-        text, boxes = processor.process_pil_image(pil_image, return_boxes)
+    # Rasterizează doar paginile cerute, una câte una, și le procesează (în paralel pe pool-ul
+    # de procese OCR, dacă este configurat), în ordine; paginile din cache nu mai sunt rasterizate
+    pages, cached, page_key = cached_pdf_pages(pdf_bytes, lang, dpi, first_page, last_page, return_boxes)
+    for page_result in ocr_pages_sync(pages, lang, return_boxes, cached=cached, page_key=page_key):
+        pages_processed += 1
+        page_num = page_result["page"]
+        text, boxes = page_result["text"], page_result["boxes"]
+        if page_result["error"]:
+            errors.append(page_result["error"])
+        if stats is not None:
+            stats.setdefault("pages", []).append({"page": page_num, **(page_result["preprocess"] or {})})
         
         if text:
-            all_text_lines.append(f"--- Pagina {page_num + 1} ---")
+            all_text_lines.append(f"--- Pagina {page_num} ---")
             all_text_lines.append(text)
         
         if return_boxes and boxes:
-            # Adaugă informații despre pagină la fiecare box
-            for box in boxes:
-                box['page'] = page_num + 1
-            all_boxes.extend(boxes)
+            # Adaugă informații despre pagină la fiecare box (copii, ca intrările din cache să rămână neschimbate)
+            all_boxes.extend({**box, 'page': page_num} for box in boxes)
+    
+    # Dacă toate paginile au eșuat, raportează eroarea (nu un text gol)
+    if errors and not all_text_lines and len(errors) == pages_processed:
+        raise RuntimeError(f"OCR eșuat pentru toate paginile: {errors[0]}")
     
     full_text = '\n'.join(all_text_lines)
     
@@ -430,7 +467,8 @@ def process_document(
     file_bytes: bytes,
     file_type: str,
     lang: str = 'ro',
-    return_boxes: bool = False
+    return_boxes: bool = False,
+    stats: Optional[Dict[str, Any]] = None
 ) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
     """
     Funcție helper pentru procesarea unui document (imagine sau PDF).
@@ -440,12 +478,13 @@ def process_document(
         file_type: Tipul fișierului ('image' sau 'pdf')
         lang: Limba pentru OCR (default: 'ro')
         return_boxes: Dacă True, returnează și bounding boxes
+        stats: Dicționar opțional care primește etapele de preprocesare rulate
     
     Returns:
         Tuple (text, boxes)
     """
     if file_type.lower() == 'pdf':
-        return process_pdf(file_bytes, lang, return_boxes)
+        return process_pdf(file_bytes, lang, return_boxes, stats=stats)
     else:
-        return process_image(file_bytes, lang, return_boxes)
+        return process_image(file_bytes, lang, return_boxes, stats)
 
@@ -0,0 +1,275 @@
+"""
+Cache pentru rezultatele OCR, ca aceeași scanare (buletin, formular gol) reîncărcată de mai multe ori
+să nu treacă din nou prin PaddleOCR / Tesseract.
+
+Cheia: sha256(conținut) + motor + limbă + dpi + versiunea și configurația preprocesării (+ pagina,
+pentru PDF-uri).
+Stocare: LRU în memorie în fața unui fișier sqlite limitat ca dimensiune (cele mai vechi accesări
+sunt eliminate primele). Fișierul sqlite poate fi partajat de mai multe procese worker.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional
+
+OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no')
+OCR_CACHE_PATH = os.getenv('OCR_CACHE_PATH', os.path.join('ocr_cache', 'ocr_cache.sqlite3'))
+OCR_CACHE_MAX_MB = float(os.getenv('OCR_CACHE_MAX_MB', '256'))
+OCR_CACHE_MEMORY_ENTRIES = int(os.getenv('OCR_CACHE_MEMORY_ENTRIES', '512'))
+
+
+def content_hash(data: bytes) -> str:
+    """sha256 (hex) al conținutului fișierului"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def ocr_cache_key(data_hash: str, engine: str, lang: str, dpi: Optional[int] = None,
+                  return_boxes: bool = False, page: Optional[int] = None) -> str:
+    """
+    Construiește cheia de cache. Include versiunea preprocesării și amprenta configurației ei
+    (OCR_PREPROCESS_*, OCR_TARGET_TEXT_HEIGHT etc.), astfel încât modificările pipeline-ului sau
+    ale setărilor de preprocesare invalidează automat rezultatele vechi.
+    """
+    from .processor import PREPROCESS_VERSION
+    from .preprocess import preprocess_fingerprint
+    parts = [engine, lang, f"dpi={dpi or 0}", f"pp={PREPROCESS_VERSION}.{preprocess_fingerprint()}",
+             "boxes" if return_boxes else "text", data_hash]
+    if page is not None:
+        parts.append(f"p{page}")
+    return ":".join(parts)
+
+
+class OCRResultCache:
+    """LRU în memorie + sqlite pe disk, limitat la max_bytes"""
+
+    def __init__(self, path: str = OCR_CACHE_PATH, max_bytes: int = int(OCR_CACHE_MAX_MB * 1024 * 1024),
+                 memory_entries: int = OCR_CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_result (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_ocr_result_last_access ON ocr_result (last_access)")
+        # Dimensiunea totală, comună tuturor proceselor care folosesc fișierul: actualizată în aceeași
+        # tranzacție cu fiecare scriere / ștergere din ocr_result
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_cache_size (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                disk_bytes INTEGER NOT NULL
+            )
+        """)
+        self._db.execute(
+            "INSERT OR IGNORE INTO ocr_cache_size (id, disk_bytes) SELECT 1, COALESCE(SUM(size), 0) FROM ocr_result"
+        )
+        self._db.commit()
+
+    def _disk_bytes(self) -> int:
+        return self._db.execute("SELECT disk_bytes FROM ocr_cache_size WHERE id = 1").fetchone()[0]
+
+    def _add_disk_bytes(self, delta: int):
+        self._db.execute("UPDATE ocr_cache_size SET disk_bytes = disk_bytes + ? WHERE id = 1", (delta,))
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returnează {"text", "boxes"} sau None"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+            try:
+                row = self._db.execute("SELECT value FROM ocr_result WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self._db.execute("UPDATE ocr_result SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Eroare la citirea cache-ului OCR: {e}")
+                self.misses += 1
+                return None
+            value = json.loads(row[0])
+            self._remember(key, value)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys: Dict[int, str]) -> Dict[int, Dict[str, Any]]:
+        """Citește mai multe chei (ex: paginile unui PDF); returnează doar intrările găsite"""
+        found = {}
+        for page, key in keys.items():
+            value = self.get(key)
+            if value is not None:
+                found[page] = value
+        return found
+
+    def put(self, key: str, text: str, boxes: Optional[list] = None):
+        """Salvează un rezultat OCR și elimină cele mai vechi intrări dacă s-a depășit limita"""
+        value = {"text": text or "", "boxes": boxes}
+        try:
+            serialized = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Rezultat OCR neserializabil, nu este salvat în cache: {e}")
+            return
+        size = len(serialized.encode("utf-8"))
+        with self._lock:
+            self._remember(key, value)
+            try:
+                # BEGIN IMMEDIATE: celelalte procese așteaptă până la commit, totalul rămâne exact
+                self._db.execute("BEGIN IMMEDIATE")
+                old = self._db.execute("SELECT size FROM ocr_result WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO ocr_result (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, serialized, size, time.time())
+                )
+                self._add_disk_bytes(size - (old[0] if old else 0))
+                disk_bytes = self._disk_bytes()
+                if disk_bytes > self.max_bytes:
+                    self._evict(disk_bytes)
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Eroare la scrierea cache-ului OCR: {e}")
+                self._db.rollback()
+
+    def _evict(self, disk_bytes: int):
+        """Elimină cele mai vechi accesări până la 90% din limită. Apelat cu lock-ul ținut, în tranzacția scrierii."""
+        target = int(self.max_bytes * 0.9)
+        rows = self._db.execute("SELECT key, size FROM ocr_result ORDER BY last_access ASC").fetchall()
+        removed = []
+        for key, size in rows:
+            if disk_bytes <= target:
+                break
+            removed.append((key,))
+            disk_bytes -= size
+            self._memory.pop(key, None)
+        self._db.executemany("DELETE FROM ocr_result WHERE key = ?", removed)
+        self._db.execute("UPDATE ocr_cache_size SET disk_bytes = ? WHERE id = 1", (disk_bytes,))
+        print(f"🗑️ Cache OCR: {len(removed)} intrări eliminate ({disk_bytes // 1024} KB rămași)")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM ocr_result")
+            self._db.execute("UPDATE ocr_cache_size SET disk_bytes = 0 WHERE id = 1")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes(),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+_cache: Optional[OCRResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> Optional[OCRResultCache]:
+    """Returnează cache-ul OCR (singleton per proces) sau None dacă este dezactivat / indisponibil"""
+    global _cache
+    if not OCR_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = OCRResultCache()
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️ Cache-ul OCR nu poate fi deschis ({OCR_CACHE_PATH}): {e}")
+                return None
+        return _cache
+
+
+def cached_pdf_pages(pdf_bytes: bytes, lang: str, dpi: int, first_page: int = 1,
+                     last_page: Optional[int] = None, return_boxes: bool = False,
+                     engine: str = "paddleocr"):
+    """
+    Pregătește OCR-ul unui PDF cu cache per pagină.
+
+    Returns:
+        (pages, cached, page_key)
+        - pages: iterator de pagini pentru ocr_pages; paginile din cache nu sunt rasterizate
+          (apar ca (număr, None))
+        - cached: rezultatele din cache, per pagină
+        - page_key: funcție număr pagină -> cheie de cache (pentru salvarea rezultatelor noi)
+    """
+    from .pdf_pages import get_pdf_page_count, iter_pdf_pages
+
+    doc_hash = content_hash(pdf_bytes)
+
+    def page_key(page: int) -> str:
+        return ocr_cache_key(doc_hash, engine, lang, dpi, return_boxes, page)
+
+    cached: Dict[int, Dict[str, Any]] = {}
+    cache = get_ocr_cache()
+    if cache is not None:
+        total_pages = get_pdf_page_count(pdf_bytes)
+        last = min(last_page or total_pages, total_pages)
+        cached = cache.get_many({page: page_key(page) for page in range(max(first_page, 1), last + 1)})
+        if cached:
+            print(f"♻️ Cache OCR: {len(cached)} pagini din cache")
+
+    pages = iter_pdf_pages(pdf_bytes, dpi=dpi, first_page=first_page, last_page=last_page,
+                           skip_pages=set(cached))
+    return pages, cached, page_key
+
+
+def cached_pdf_page_stream(pdf_bytes: bytes, page_numbers: AsyncIterator[int], lang: str, dpi: int,
+                           return_boxes: bool = False, engine: str = "paddleocr"):
+    """
+    Ca cached_pdf_pages, dar pentru o listă de pagini cunoscută doar pe parcurs (ex: paginile
+    scanate găsite de clasificatorul hibrid): cache-ul este verificat pagină cu pagină, înainte
+    de rasterizare.
+
+    Returns:
+        (pages, cached, page_key) - ca la cached_pdf_pages, dar pages este un iterator asincron
+    """
+    from .pdf_pages import render_pdf_pages_async
+
+    doc_hash = content_hash(pdf_bytes)
+
+    def page_key(page: int) -> str:
+        return ocr_cache_key(doc_hash, engine, lang, dpi, return_boxes, page)
+
+    cached: Dict[int, Dict[str, Any]] = {}
+    cache = get_ocr_cache()
+
+    def from_cache(page: int) -> bool:
+        if cache is None:
+            return False
+        value = cache.get(page_key(page))
+        if value is None:
+            return False
+        cached[page] = value
+        return True
+
+    return render_pdf_pages_async(pdf_bytes, page_numbers, dpi, from_cache), cached, page_key
@@ -1,46 +1,131 @@
 """
-Singleton pentru OCRProcessor pentru a evita reinițializarea modelelor PaddleOCR.
+Registru de modele OCR (singleton per limbă) pentru a evita reinițializarea modelelor PaddleOCR.
+Suportă pre-încărcare la pornire (warm-up), instanțe per limbă și descărcarea explicită
+a modelelor nefolosite pentru a elibera memoria.
 """
 
-from typing import Optional
+import gc
+import os
+import threading
+import time
+from typing import Dict, List, Optional
 from .processor import OCRProcessor, PADDLEOCR_AVAILABLE, OPENCV_AVAILABLE
 
-# Cache pentru instanțe OCRProcessor (per limbă)
-_processor_cache: dict[str, OCRProcessor] = {}
+# Limbile pre-încărcate la pornirea serverului (ex: "ro" sau "ro,en"); gol = încărcare la prima cerere
+OCR_WARMUP_LANGS = [lang.strip() for lang in os.getenv('OCR_WARMUP_LANGS', '').split(',') if lang.strip()]
+# După câte secunde de nefolosire este descărcat un model (0 = niciodată)
+OCR_IDLE_UNLOAD_SECONDS = float(os.getenv('OCR_IDLE_UNLOAD_SECONDS', '0'))
+
+
+class OCRModelRegistry:
+    """
+    Registru thread-safe de instanțe OCRProcessor, câte una per limbă.
+    Încărcările concurente pentru aceeași limbă împart o singură inițializare a modelului.
+    """
+
+    def __init__(self):
+        self._processors: Dict[str, OCRProcessor] = {}
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, lang: str = 'ro') -> Optional[OCRProcessor]:
+        """Returnează procesorul pentru limbă, încărcându-l dacă este necesar"""
+        if not PADDLEOCR_AVAILABLE or not OPENCV_AVAILABLE:
+            return None
+
+        with self._lock:
+            processor = self._processors.get(lang)
+            if processor is not None:
+                self._last_used[lang] = time.monotonic()
+                return processor
+            load_lock = self._load_locks.setdefault(lang, threading.Lock())
+
+        with load_lock:
+            # Altă cerere poate să fi încărcat modelul cât timp am așteptat
+            with self._lock:
+                processor = self._processors.get(lang)
+                if processor is not None:
+                    self._last_used[lang] = time.monotonic()
+                    return processor
+            try:
+                started = time.monotonic()
+                processor = OCRProcessor(lang=lang)
+            except Exception as e:
+                print(f"⚠️ Eroare la inițializarea OCRProcessor pentru limba '{lang}': {e}")
+                return None
+            with self._lock:
+                self._processors[lang] = processor
+                self._last_used[lang] = time.monotonic()
+            print(f"✅ OCRProcessor inițializat pentru limba '{lang}' în {time.monotonic() - started:.1f}s (cache)")
+            return processor
+
+    def warm_up(self, langs: Optional[List[str]] = None) -> List[str]:
+        """Pre-încarcă modelele pentru limbile date; returnează limbile încărcate cu succes"""
+        loaded = []
+        for lang in langs if langs is not None else OCR_WARMUP_LANGS:
+            if self.get(lang) is not None:
+                loaded.append(lang)
+        return loaded
+
+    def unload(self, lang: str) -> bool:
+        """Descarcă explicit modelul pentru o limbă (cererile în curs își termină lucrul cu instanța lor)"""
+        with self._lock:
+            processor = self._processors.pop(lang, None)
+            self._last_used.pop(lang, None)
+        if processor is None:
+            return False
+        del processor
+        gc.collect()
+        print(f"🗑️ OCRProcessor descărcat pentru limba '{lang}'")
+        return True
+
+    def unload_idle(self, max_idle_seconds: float = OCR_IDLE_UNLOAD_SECONDS) -> List[str]:
+        """Descarcă modelele nefolosite de mai mult de max_idle_seconds secunde"""
+        if max_idle_seconds <= 0:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            idle = [lang for lang, last in self._last_used.items() if now - last > max_idle_seconds]
+        return [lang for lang in idle if self.unload(lang)]
+
+    def loaded_models(self) -> Dict[str, float]:
+        """Limbile încărcate și de câte secunde nu au mai fost folosite"""
+        now = time.monotonic()
+        with self._lock:
+            return {lang: round(now - last, 1) for lang, last in self._last_used.items()}
+
+    def clear(self):
+        """Descarcă toate modelele"""
+        with self._lock:
+            self._processors.clear()
+            self._last_used.clear()
+        gc.collect()
+
+
+_registry = OCRModelRegistry()
+
+
+def get_ocr_registry() -> OCRModelRegistry:
+    """Returnează registrul global de modele OCR"""
+    return _registry
 
 
 def get_ocr_processor(lang: str = 'ro') -> Optional[OCRProcessor]:
     """
     Obține o instanță OCRProcessor (singleton per limbă).
     Dacă nu există, o creează și o cache-uiește.
-    
+
     Args:
         lang: Limba pentru OCR (default: 'ro')
-    
+
     Returns:
         OCRProcessor instance sau None dacă nu este disponibil
     """
-    if not PADDLEOCR_AVAILABLE or not OPENCV_AVAILABLE:
-        return None
-    
-    # Verifică dacă există deja în cache
-    if lang in _processor_cache:
-        return _processor_cache[lang]
-    
-    # Creează o nouă instanță și o adaugă în cache
-    try:
-        processor = OCRProcessor(lang=lang)
-        _processor_cache[lang] = processor
-        print(f"✅ OCRProcessor inițializat pentru limba '{lang}' (cache)")
-        return processor
-    except Exception as e:
-        print(f"⚠️ Eroare la inițializarea OCRProcessor pentru limba '{lang}': {e}")
-        return None
+    return _registry.get(lang)
 
 
 def clear_cache():
     """Șterge cache-ul de procesori OCR."""
-    global _processor_cache
-    _processor_cache.clear()
+    _registry.clear()
     print("🗑️ Cache OCRProcessor șters")
-
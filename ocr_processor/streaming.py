@@ -0,0 +1,131 @@
+"""
+Rezultate OCR în flux (NDJSON): fiecare pagină este trimisă clientului imediat ce este gata.
+
+Evenimente (câte un obiect JSON pe linie):
+- {"type": "start", "total_pages", "pages_to_process", ...}
+- {"type": "page", "page", "text", "method", ["boxes"], ["error"], ["preprocess" | "cached"]}
+- {"type": "progress", "processed", "total"}
+- {"type": "summary", "pages", "pages_with_text", "text_length", "elapsed_seconds", ...}
+- {"type": "error", "error"} - eroare fatală; fluxul se încheie după ea
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .pdf_pages import get_pdf_page_count
+from .result_cache import cached_pdf_pages
+from .worker_pool import ocr_pages
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_line(event: Dict[str, Any]) -> str:
+    """Serializează un eveniment ca linie NDJSON"""
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+async def ndjson_stream(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Transformă un flux de evenimente în linii NDJSON; o excepție devine un eveniment de eroare"""
+    try:
+        async for event in events:
+            yield ndjson_line(event)
+    except Exception as e:
+        import traceback
+        print(f"❌ Eroare în fluxul OCR: {traceback.format_exc()}")
+        yield ndjson_line({"type": "error", "error": str(e)})
+
+
+class StreamSummary:
+    """Statistici acumulate pe parcursul fluxului, pentru evenimentul final"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.processed = 0
+        self.pages_with_text = 0
+        self.text_length = 0
+        self.started = time.monotonic()
+
+    def page(self, text: str) -> Dict[str, Any]:
+        """Înregistrează o pagină și returnează evenimentul de progres"""
+        self.processed += 1
+        if text and text.strip():
+            self.pages_with_text += 1
+            self.text_length += len(text)
+        return {"type": "progress", "processed": self.processed, "total": self.total}
+
+    def summary(self, **extra) -> Dict[str, Any]:
+        return {
+            "type": "summary",
+            "pages": self.processed,
+            "pages_with_text": self.pages_with_text,
+            "text_length": self.text_length,
+            "elapsed_seconds": round(time.monotonic() - self.started, 2),
+            **extra
+        }
+
+
+async def stream_pdf_ocr_events(
+    pdf_bytes: bytes,
+    lang: str = 'ro',
+    return_boxes: bool = False,
+    dpi: int = 300,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+    include_start: bool = True,
+    include_summary: bool = True
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    OCR în flux pentru un PDF: paginile sunt rasterizate una câte una, procesate (pe pool-ul OCR,
+    dacă este configurat) și emise în ordine, fiecare urmată de un eveniment de progres.
+    """
+    loop = asyncio.get_running_loop()
+    total_pages = await loop.run_in_executor(None, get_pdf_page_count, pdf_bytes)
+    first_page = max(first_page, 1)
+    last = min(last_page or total_pages, total_pages)
+    stats = StreamSummary(max(0, last - first_page + 1))
+
+    if include_start:
+        yield {"type": "start", "total_pages": total_pages, "pages_to_process": stats.total, "language": lang}
+
+    pages, cached, page_key = await loop.run_in_executor(
+        None, cached_pdf_pages, pdf_bytes, lang, dpi, first_page, last, return_boxes
+    )
+    async for result in ocr_pages(pages, lang, return_boxes, cached=cached, page_key=page_key):
+        event = {"type": "page", "page": result["page"], "text": result["text"], "method": "paddleocr"}
+        if result["page"] in cached:
+            event["cached"] = True
+        elif result["preprocess"]:
+            event["preprocess"] = result["preprocess"]
+        if return_boxes and result["boxes"]:
+            event["boxes"] = [{**box, "page": result["page"]} for box in result["boxes"]]
+        if result["error"]:
+            event["error"] = result["error"]
+        yield event
+        yield stats.page(result["text"])
+
+    if include_summary:
+        yield stats.summary(total_pages=total_pages, method="paddleocr")
+
+
+async def stream_image_ocr_events(
+    image_bytes: bytes,
+    lang: str = 'ro',
+    return_boxes: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """OCR în flux pentru o imagine (o singură pagină): start, pagină, progres, sumar"""
+    from .processor import process_image
+
+    loop = asyncio.get_running_loop()
+    stats = StreamSummary(1)
+    yield {"type": "start", "total_pages": 1, "pages_to_process": 1, "language": lang}
+
+    preprocess: Dict[str, Any] = {}
+    text, boxes = await loop.run_in_executor(None, process_image, image_bytes, lang, return_boxes, preprocess)
+    event = {"type": "page", "page": 1, "text": text or "", "method": "paddleocr", "preprocess": preprocess}
+    if return_boxes and boxes:
+        event["boxes"] = boxes
+    yield event
+    yield stats.page(text)
+    yield stats.summary(total_pages=1, method="paddleocr")
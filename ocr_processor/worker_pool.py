@@ -0,0 +1,199 @@
+"""
+Pool de procese pentru OCR (PaddleOCR este CPU-bound și nu scalează pe thread-uri din cauza GIL).
+Fiecare proces worker își ține propriul OCRProcessor încărcat (registrul de modele din acel proces).
+Paginile unui document sunt distribuite pe workeri și reasamblate în ordine, cu un număr maxim
+de pagini în lucru per cerere, ca un singur document mare să nu ocupe tot pool-ul.
+
+OCR_WORKERS=0 (implicit) păstrează OCR-ul în procesul serverului, pe thread pool-ul implicit, cu o
+singură pagină în lucru per cerere (instanța modelului din proces nu este folosită concurent de
+paginile aceleiași cereri). Paginile sunt procesate în paralel doar cu OCR_WORKERS>0.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Numărul de procese OCR (0 = OCR în procesul serverului)
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', '0'))
+# Numărul maxim de pagini ale unei cereri procesate simultan (doar cu OCR_WORKERS>0)
+OCR_MAX_PARALLEL_PAGES = max(1, int(os.getenv('OCR_MAX_PARALLEL_PAGES', '2')))
+
+# Pagină de procesat: (număr pagină 1-based, imagine PIL sau numpy BGR)
+Page = Tuple[int, Any]
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker(langs: List[str]):
+    """Inițializarea unui proces worker: încarcă modelele OCR o singură dată"""
+    from .singleton import get_ocr_registry
+    loaded = get_ocr_registry().warm_up(langs)
+    print(f"✅ Worker OCR {os.getpid()} pregătit (modele: {', '.join(loaded) or 'niciunul'})")
+
+
+def _ocr_page_job(image: Any, lang: str, return_boxes: bool) -> Tuple[str, Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+    """Rulează OCR pe o pagină, în procesul curent (worker sau server); returnează și etapele de preprocesare"""
+    from .processor import _get_processor
+    processor = _get_processor(lang)
+    stats: Dict[str, Any] = {}
+    if hasattr(image, 'mode'):
+        text, boxes = processor.process_pil_image(image, return_boxes, stats)
+    else:
+        text, boxes = processor.extract_text(image, return_boxes, stats)
+    return text, boxes, stats
+
+
+def get_ocr_executor() -> Optional[Executor]:
+    """
+    Returnează pool-ul de procese OCR (creat la prima utilizare) sau None dacă OCR_WORKERS=0,
+    caz în care OCR-ul rulează pe thread pool-ul implicit, cu modelul din procesul serverului.
+    """
+    global _executor
+    if OCR_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            from .singleton import OCR_WARMUP_LANGS
+            # spawn: procesele nu moștenesc starea (thread-uri, modele) procesului serverului
+            _executor = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(OCR_WARMUP_LANGS or ['ro'],)
+            )
+            print(f"✅ Pool OCR pornit cu {OCR_WORKERS} procese")
+        return _executor
+
+
+def shutdown_ocr_executor():
+    """Oprește pool-ul de procese OCR (la oprirea serverului)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+            print("🛑 Pool OCR oprit")
+
+
+def _page_result(page_num: int, future: Future,
+                 page_key: Optional[Callable[[int], str]] = None) -> Dict[str, Any]:
+    try:
+        text, boxes, preprocess = future.result()
+    except Exception as e:
+        print(f"⚠️ Eroare OCR la pagina {page_num}: {e}")
+        return {"page": page_num, "text": "", "boxes": None, "error": str(e), "preprocess": None}
+    if page_key is not None:
+        from .result_cache import get_ocr_cache
+        cache = get_ocr_cache()
+        if cache is not None:
+            cache.put(page_key(page_num), text, boxes)
+    return {"page": page_num, "text": text or "", "boxes": boxes, "error": None, "preprocess": preprocess}
+
+
+def _cached_future(value: Dict[str, Any]) -> Future:
+    """Future deja rezolvat cu un rezultat din cache (pagină nerasterizată)"""
+    future: Future = Future()
+    future.set_result((value.get("text", ""), value.get("boxes"), {"cached": True}))
+    return future
+
+
+async def ocr_pages(
+    pages: Union[Iterable[Page], AsyncIterable[Page]],
+    lang: str = 'ro',
+    return_boxes: bool = False,
+    max_parallel: Optional[int] = None,
+    cached: Optional[Dict[int, Dict[str, Any]]] = None,
+    page_key: Optional[Callable[[int], str]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Rulează OCR pe paginile unui document și le returnează în ordine, pe măsură ce sunt gata.
+    Cel mult max_parallel pagini sunt în lucru simultan (1 fără pool de procese, OCR_WORKERS=0);
+    iteratorul de pagini (ex: rasterizarea) este avansat pe thread pool, ca să nu blocheze event loop-ul;
+    un iterator asincron (ex: paginile găsite pe parcurs de extragerea hibridă) este așteptat direct.
+
+    Paginile fără imagine (None) sunt luate din `cached`; rezultatele noi sunt salvate
+    în cache-ul OCR sub cheia page_key(pagină), dacă este dată (vezi cached_pdf_pages).
+
+    Yields:
+        {"page", "text", "boxes", "error", "preprocess"} pentru fiecare pagină, în ordinea paginilor
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_ocr_executor()
+    if executor is None:
+        # Fără pool de procese: paginile ar rula concurent pe aceeași instanță a modelului
+        max_parallel = 1
+    else:
+        max_parallel = max(1, max_parallel or OCR_MAX_PARALLEL_PAGES)
+    async_pages = pages.__aiter__() if hasattr(pages, '__aiter__') else None
+    page_iter = iter(pages) if async_pages is None else None
+    in_flight: deque = deque()
+    exhausted = False
+
+    async def next_page() -> Optional[Page]:
+        if async_pages is None:
+            return await loop.run_in_executor(None, next, page_iter, None)
+        try:
+            return await async_pages.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    while True:
+        while not exhausted and len(in_flight) < max_parallel:
+            page = await next_page()
+            if page is None:
+                exhausted = True
+                break
+            page_num, image = page
+            if image is None and cached and page_num in cached:
+                in_flight.append((page_num, _cached_future(cached[page_num]), None))
+                continue
+            future = loop.run_in_executor(executor, _ocr_page_job, image, lang, return_boxes)
+            in_flight.append((page_num, future, page_key))
+        if not in_flight:
+            return
+        page_num, future, key = in_flight.popleft()
+        if not future.done():
+            await asyncio.wait([future])
+        yield _page_result(page_num, future, key)
+
+
+def ocr_pages_sync(
+    pages: Iterable[Page],
+    lang: str = 'ro',
+    return_boxes: bool = False,
+    max_parallel: Optional[int] = None,
+    cached: Optional[Dict[int, Dict[str, Any]]] = None,
+    page_key: Optional[Callable[[int], str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Varianta sincronă a ocr_pages (pentru funcțiile helper sincrone, ex: process_pdf)"""
+    executor = get_ocr_executor()
+    if executor is None:
+        # Fără pool de procese: o singură instanță de model, pagină cu pagină
+        for page_num, image in pages:
+            if image is None and cached and page_num in cached:
+                yield _page_result(page_num, _cached_future(cached[page_num]))
+                continue
+            future: Future = Future()
+            try:
+                future.set_result(_ocr_page_job(image, lang, return_boxes))
+            except Exception as e:
+                future.set_exception(e)
+            yield _page_result(page_num, future, page_key)
+        return
+
+    max_parallel = max(1, max_parallel or OCR_MAX_PARALLEL_PAGES)
+    in_flight: deque = deque()
+    for page_num, image in pages:
+        if image is None and cached and page_num in cached:
+            in_flight.append((page_num, _cached_future(cached[page_num]), None))
+        else:
+            in_flight.append((page_num, executor.submit(_ocr_page_job, image, lang, return_boxes), page_key))
+        if len(in_flight) >= max_parallel:
+            yield _page_result(*in_flight.popleft())
+    while in_flight:
+        yield _page_result(*in_flight.popleft())
@@ -5,10 +5,13 @@ Folosește Ollama embeddings pentru semantic search.
 import os
 import json
 import pickle
+import threading
+import time
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 from ollama import Client
 import hashlib
+from core.config import MODEL_KEEP_ALIVE
 
 # Conectare la Ollama pentru embeddings
 OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'localhost:11434')
@@ -16,30 +19,70 @@ ollama = Client(host=OLLAMA_HOST)
 
 # Model pentru embeddings (folosește același model ca pentru chat sau unul specializat)
 EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'nomic-embed-text')  # Model optimizat pentru embeddings
+# Modelul cu care au fost construite store-urile vechi, fără manifest (implicit EMBEDDING_MODEL).
+# Setează-l la modelul vechi dacă schimbi EMBEDDING_MODEL la primul start cu versionarea store-urilor.
+EMBEDDING_MODEL_LEGACY = os.getenv('EMBEDDING_MODEL_LEGACY') or EMBEDDING_MODEL
 
 # Director pentru stocarea vector stores per tenant
 VECTOR_STORE_DIR = "vector_stores"
+# Fracțiunea de chunk-uri șterse (tombstones) peste care listele store-ului sunt compactate
+RAG_COMPACT_RATIO = float(os.getenv('RAG_COMPACT_RATIO', '0.3'))
+# Reprezentarea vectorilor în memorie (implicită; per tenant în setările chatbot-ului): none = float32,
+# float16 / int8 (cu scală per vector) reduc memoria de 2x / 4x. Căutarea int8 este cam la fel de rapidă
+# ca float32, dar float16 este de ~5x mai lentă: numpy convertește float16 → float32 în software
+# (benchmark_rag_quantization.py); pentru memorie redusă fără cost de latență, int8 este varianta potrivită
+QUANTIZATION_MODES = ("none", "float16", "int8")
+RAG_QUANTIZATION = os.getenv('RAG_QUANTIZATION', 'none')
+if RAG_QUANTIZATION not in QUANTIZATION_MODES:
+    print(f"⚠️ RAG_QUANTIZATION={RAG_QUANTIZATION} necunoscut (variante: {', '.join(QUANTIZATION_MODES)}), folosim none")
+    RAG_QUANTIZATION = "none"
+# Primii N candidați sunt reordonați cu vectorii float32 exacți (de pe disk, cu cuantizare) și diversificați (MMR)
+RAG_RERANK_CANDIDATES = int(os.getenv('RAG_RERANK_CANDIDATES', '50'))
+_QUANTIZED_DTYPES = {"none": np.float32, "float16": np.float16, "int8": np.int8}
+# Diversificarea rezultatelor (implicit; per tenant în setările chatbot-ului): MMR cu lambda între relevanță
+# (1.0) și diversitate (0.0), maxim N chunk-uri din același fișier, chunk-uri vecine unite într-un singur rezultat
+RAG_MMR_LAMBDA = float(os.getenv('RAG_MMR_LAMBDA', '0.7'))
+RAG_MAX_CHUNKS_PER_FILE = int(os.getenv('RAG_MAX_CHUNKS_PER_FILE', '3'))
+RAG_MERGE_ADJACENT = os.getenv('RAG_MERGE_ADJACENT', 'true').lower() in ('1', 'true', 'yes')
+# Suprapunerea chunk-urilor de la ingestie (core/ingestion.py), verificată prima la unirea chunk-urilor vecine
+CHUNK_OVERLAP = int(os.getenv('INGEST_CHUNK_OVERLAP', '200'))
+# Vectori procesați odată la cuantizare / scanare; vectorii cuantizați sunt convertiți la float32
+# în blocuri mici, care încap în cache-ul procesorului
+_VECTOR_BLOCK_ROWS = 8192
+_QUANTIZED_SCAN_ROWS = 256
 
 def get_tenant_vector_store_path(tenant_id: str) -> str:
     """Returnează calea către vector store-ul unui tenant"""
     return os.path.join(VECTOR_STORE_DIR, tenant_id)
 
-def get_embedding(text: str) -> List[float]:
+class EmbeddingError(Exception):
+    """Ollama nu a returnat un embedding (server indisponibil, model lipsă, timeout)"""
+
+class EmbeddingMismatchError(ValueError):
+    """Vectorii dați au fost calculați cu alt model / altă dimensiune decât cei din store"""
+
+def get_embedding(text: str, strict: bool = False, model: Optional[str] = None) -> List[float]:
     """
-    Obține embedding-ul pentru un text folosind Ollama.
-    Dacă modelul de embeddings nu este disponibil, folosește un fallback.
+    Obține embedding-ul pentru un text folosind Ollama (model: implicit EMBEDDING_MODEL).
+    Dacă modelul de embeddings nu este disponibil, folosește un fallback
+    (strict=True: ridică EmbeddingError, ca apelantul să poată reîncerca).
     """
+    model = model or EMBEDDING_MODEL
     try:
-        # Încearcă să folosească modelul de embeddings
-        response = ollama.embeddings(model=EMBEDDING_MODEL, prompt=text)
+        # Încearcă să folosească modelul de embeddings (rămâne încărcat MODEL_KEEP_ALIVE, vezi core/model_warmup.py)
+        response = ollama.embeddings(model=model, prompt=text, keep_alive=MODEL_KEEP_ALIVE)
         if response and 'embedding' in response:
             embedding = response['embedding']
             # Verifică că embedding-ul este valid
             if embedding and len(embedding) > 0:
                 return embedding
     except Exception as e:
-        print(f"⚠️ Eroare la obținerea embedding-ului cu {EMBEDDING_MODEL}: {e}")
+        if strict:
+            raise EmbeddingError(f"{model}: {e}") from e
+        print(f"⚠️ Eroare la obținerea embedding-ului cu {model}: {e}")
         print("💡 Folosind fallback: hash-based similarity")
+    if strict:
+        raise EmbeddingError(f"{model}: răspuns fără embedding")
     
     # Fallback: folosește hash pentru simplitate (nu este semantic, dar funcționează)
     # În producție, ar trebui să folosești un model de embeddings real
@@ -62,6 +105,64 @@ def get_embedding(text: str) -> List[float]:
     
     return vector[:target_dim]
 
+def read_store_manifest(store_path: str) -> Optional[Dict]:
+    """Manifestul unui vector store ({"model", "dim"}), fără a încărca vectorii; None dacă lipsește"""
+    try:
+        with open(os.path.join(store_path, "manifest.json"), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        return manifest if manifest.get("model") else None
+    except (OSError, ValueError):
+        return None
+
+def quantize_vectors(vectors: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Cuantizează vectorii float32 (N x D) pentru modul dat: float16, sau int8 cu o scală per vector
+    (componenta maximă în valoare absolută devine ±127). Returnează (vectorii, scalele sau None).
+    """
+    if mode == "int8":
+        scales = (np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.zeros(0)).astype(np.float32)
+        safe_scales = np.where(scales > 0, scales, 1.0)
+        return np.round(vectors / safe_scales[:, None]).astype(np.int8), scales
+    return vectors.astype(_QUANTIZED_DTYPES[mode]), None
+
+def mmr_select(relevance: np.ndarray, vectors: np.ndarray, groups: List[str], top_k: int,
+               mmr_lambda: float = RAG_MMR_LAMBDA, max_per_group: int = RAG_MAX_CHUNKS_PER_FILE) -> List[int]:
+    """
+    Maximal marginal relevance: alege pe rând candidatul cu cel mai mare
+    mmr_lambda * relevanță - (1 - mmr_lambda) * similaritatea maximă cu cei deja aleși,
+    cu cel mult max_per_group candidați din același grup (fișier). Returnează indicii aleși, în ordine.
+    """
+    norms = np.linalg.norm(vectors, axis=1)
+    unit = vectors / np.where(norms > 0, norms, 1.0)[:, None]
+    similarity = unit @ unit.T
+    # Similaritatea maximă a fiecărui candidat cu cei aleși (0 cât timp nu este ales niciunul)
+    redundancy = np.zeros(len(relevance), dtype=np.float32)
+    available = np.ones(len(relevance), dtype=bool)
+    per_group: Dict[str, int] = {}
+    selected: List[int] = []
+    while len(selected) < top_k and available.any():
+        marginal = np.where(available, mmr_lambda * relevance - (1 - mmr_lambda) * redundancy, -np.inf)
+        best = int(np.argmax(marginal))
+        available[best] = False
+        if per_group.get(groups[best], 0) >= max_per_group:
+            continue
+        per_group[groups[best]] = per_group.get(groups[best], 0) + 1
+        selected.append(best)
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
+
+def merge_chunk_texts(first: str, second: str, overlap: int = CHUNK_OVERLAP, max_overlap: int = 1000) -> str:
+    """
+    Unește textele a două chunk-uri consecutive, fără porțiunea suprapusă: întâi suprapunerea
+    de la ingestie, apoi cea mai lungă potrivire (ex: chunk-uri din store-uri mai vechi).
+    """
+    if 0 < overlap <= min(len(first), len(second)) and first.endswith(second[:overlap]):
+        return first + second[overlap:]
+    for size in range(min(len(first), len(second), max_overlap), 0, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + "\n" + second
+
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """Calculează similaritatea cosinus între doi vectori"""
     vec1 = np.array(vec1)
@@ -76,47 +177,334 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
 class TenantRAGStore:
     """Stocare RAG izolată per tenant cu vector store"""
     
-    def __init__(self, tenant_id: str):
+    def __init__(self, tenant_id: str, store_path: Optional[str] = None):
         self.tenant_id = tenant_id
-        self.store_path = get_tenant_vector_store_path(tenant_id)
+        # store_path diferit de cel implicit: index shadow construit de reindexare (core/rag_reindex.py)
+        self.store_path = store_path or get_tenant_vector_store_path(tenant_id)
+        # Format vechi (listă pickle de vectori), convertit la fișierul de vectori la prima încărcare
         self.embeddings_file = os.path.join(self.store_path, "embeddings.pkl")
         self.metadata_file = os.path.join(self.store_path, "metadata.json")
+        self.manifest_file = os.path.join(self.store_path, "manifest.json")
+        
+        # Modelul de embeddings și dimensiunea vectorilor din store: toate embedding-urile (inclusiv cel
+        # al query-ului la căutare) sunt calculate cu self.model; un store nou folosește EMBEDDING_MODEL
+        self.model: str = EMBEDDING_MODEL
+        self.dim: Optional[int] = None
+        # Setările de căutare ale tenant-ului (configure(), core/tenant_settings.py)
+        self.quantization: str = RAG_QUANTIZATION
+        self.rerank_candidates: int = RAG_RERANK_CANDIDATES
+        self.mmr_lambda: float = RAG_MMR_LAMBDA
+        self.max_chunks_per_file: int = RAG_MAX_CHUNKS_PER_FILE
+        self.merge_adjacent: bool = RAG_MERGE_ADJACENT
         
         # Încarcă datele existente
-        self.embeddings: List[List[float]] = []
         self.metadata: List[Dict] = []  # [{filename, content, chunk_index}, ...]
+        # Vectorii chunk-urilor, pe aceleași poziții ca metadata: exacți (float32) în fișierul
+        # vectors.*.f32 de pe disk, iar în memorie în reprezentarea self.quantization, cu norma
+        # exactă (și scala, pentru int8) a fiecărui vector. Matricea are rezervă pentru adăugări
+        self._vectors_file: Optional[str] = None
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._scales: Optional[np.ndarray] = None
+        # Indexul fișier → intervalul [start, end) al chunk-urilor lui în metadata / vectori.
+        # Chunk-urile unui document sunt mereu consecutive; pozițiile neacoperite de niciun interval
+        # sunt chunk-uri șterse (tombstones), eliminate la compactare (RAG_COMPACT_RATIO)
+        self._ranges: Dict[str, Tuple[int, int]] = {}
+        self._dead = 0
+        # Între compactări metadata și vectorii sunt doar extinși, iar compactarea construiește liste /
+        # matrice noi: căutările în curs lucrează pe cele și pe intervalele de la începutul lor
+        self._lock = threading.RLock()
+        # mtime-ul fișierului de metadate la ultima încărcare / salvare: dacă alt proces
+        # (ex: scriptul reindex_rag.py) a rescris store-ul, este reîncărcat la următorul acces
+        self._disk_mtime: Optional[int] = None
         
         self._load_store()
     
+    def _metadata_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.metadata_file).st_mtime_ns
+        except OSError:
+            return None
+    
     def _load_store(self):
         """Încarcă vector store-ul din disk"""
         os.makedirs(self.store_path, exist_ok=True)
         
-        if os.path.exists(self.embeddings_file) and os.path.exists(self.metadata_file):
-            try:
+        if not os.path.exists(self.metadata_file):
+            return
+        try:
+            mtime = self._metadata_mtime()
+            with open(self.metadata_file, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            manifest = read_store_manifest(self.store_path)
+            ranges = self._valid_ranges(manifest, metadata)
+            legacy = not (manifest and "vectors_file" in manifest)
+            if legacy:
+                if not os.path.exists(self.embeddings_file):
+                    print(f"⚠️ Vector store {self.tenant_id}: metadate fără vectori, reîncărcare amânată")
+                    return
                 with open(self.embeddings_file, 'rb') as f:
-                    self.embeddings = pickle.load(f)
-                with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    self.metadata = json.load(f)
-                print(f"✅ Vector store încărcat pentru tenant {self.tenant_id}: {len(self.embeddings)} documente")
-            except Exception as e:
-                print(f"⚠️ Eroare la încărcarea vector store pentru {self.tenant_id}: {e}")
-                self.embeddings = []
-                self.metadata = []
+                    exact = pickle.load(f)
+            else:
+                exact = self._open_vectors(manifest["vectors_file"], manifest.get("dim"), len(metadata))
+            if exact is None or len(exact) != len(metadata) or (ranges is None and manifest and "ranges" in manifest):
+                # Citit în timpul unei salvări din alt proces: reîncearcă la următorul acces
+                print(f"⚠️ Vector store în curs de scriere pentru {self.tenant_id}, reîncărcare amânată")
+                return
+            if ranges is None:
+                # Store vechi, fără intervale: chunk-urile sunt grupate pe fișiere (ordinea primei apariții)
+                positions: Dict[str, List[int]] = {}
+                for i, meta in enumerate(metadata):
+                    positions.setdefault(meta.get("filename"), []).append(i)
+                order = [i for indices in positions.values() for i in indices]
+                exact, metadata = [exact[i] for i in order], [metadata[i] for i in order]
+                ranges, start = {}, 0
+                for filename, indices in positions.items():
+                    ranges[filename] = (start, start + len(indices))
+                    start += len(indices)
+            self.metadata, self._ranges = metadata, ranges
+            self._dead = len(metadata) - sum(end - start for start, end in ranges.values())
+            self._disk_mtime = mtime
+            if legacy:
+                self._convert_legacy(manifest, exact)
+            else:
+                self.model, self.dim = manifest["model"], manifest.get("dim")
+                self._vectors_file = manifest["vectors_file"]
+                if manifest.get("quantization") in QUANTIZATION_MODES:
+                    self.quantization = manifest["quantization"]
+                self._fill_vectors(exact)
+            print(f"✅ Vector store încărcat pentru tenant {self.tenant_id}: {len(self.metadata) - self._dead} documente "
+                  f"({self.model}, {self.quantization}, {self.memory_usage() // 1024} KB vectori)")
+        except Exception as e:
+            print(f"⚠️ Eroare la încărcarea vector store pentru {self.tenant_id}: {e}")
+            self.metadata = []
+            self._ranges, self._dead = {}, 0
+            self._reset_vectors()
+    
+    @staticmethod
+    def _valid_ranges(manifest: Optional[Dict], metadata: List[Dict]) -> Optional[Dict[str, Tuple[int, int]]]:
+        """Intervalele din manifest, dacă există și corespund metadatelor"""
+        if not manifest or "ranges" not in manifest:
+            return None
+        ranges = {filename: (int(r[0]), int(r[1])) for filename, r in manifest["ranges"].items()}
+        for filename, (start, end) in ranges.items():
+            if not (0 <= start < end <= len(metadata)) or metadata[start].get("filename") != filename \
+                    or metadata[end - 1].get("filename") != filename:
+                return None
+        return ranges
+    
+    def _convert_legacy(self, manifest: Optional[Dict], embeddings: List[List[float]]):
+        """Store în formatul vechi (embeddings.pkl): scrie fișierul de vectori și manifestul complet"""
+        if manifest:
+            self.model, self.dim = manifest["model"], manifest.get("dim")
+        else:
+            # Store-urile fără manifest au fost construite cu EMBEDDING_MODEL_LEGACY
+            self.model = EMBEDDING_MODEL_LEGACY if embeddings else EMBEDDING_MODEL
+            dims = [len(embedding) for embedding in embeddings]
+            # Dimensiunea majoritară (vectorii fallback hash pot avea altă dimensiune decât modelul)
+            self.dim = max(set(dims), key=dims.count) if dims else None
+        exact = np.zeros((len(embeddings), self.dim or 0), dtype=np.float32)
+        mismatched = 0
+        for i, embedding in enumerate(embeddings):
+            if len(embedding) == self.dim:
+                exact[i] = embedding
+            else:
+                # Vector nul: rămâne în store (chunk-ul documentului), dar este ignorat la căutare
+                mismatched += 1
+        if mismatched:
+            print(f"⚠️ Vector store {self.tenant_id}: {mismatched} vectori cu altă dimensiune decât {self.dim}, ignorați la căutare")
+        self._fill_vectors(exact)
+        try:
+            self._vectors_file = self._write_vectors_file([exact])
+            self._save_manifest()
+            os.remove(self.embeddings_file)
+            print(f"✅ Vector store {self.tenant_id} convertit la fișierul de vectori {self._vectors_file}")
+        except OSError as e:
+            self._vectors_file = None
+            print(f"⚠️ Vector store-ul {self.tenant_id} nu poate fi convertit: {e}")
+    
+    def _save_manifest(self):
+        manifest = {"model": self.model, "dim": self.dim, "ranges": self._ranges,
+                    "vectors_file": self._vectors_file, "quantization": self.quantization}
+        with open(self.manifest_file + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(self.manifest_file + ".tmp", self.manifest_file)
+    
+    def _sync_from_disk(self):
+        """Reîncarcă store-ul dacă fișierele au fost rescrise de alt proces (apelat sub lock)"""
+        mtime = self._metadata_mtime()
+        if mtime is not None and mtime != self._disk_mtime:
+            self._load_store()
     
     def _save_store(self):
-        """Salvează vector store-ul pe disk"""
+        """Salvează metadatele și manifestul store-ului (vectorii sunt scriși în fișierul lor la adăugare)"""
         os.makedirs(self.store_path, exist_ok=True)
         
         try:
-            with open(self.embeddings_file, 'wb') as f:
-                pickle.dump(self.embeddings, f)
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
+            # Scriere atomică: fișier temporar + os.replace (un proces care citește nu vede fișiere pe jumătate scrise)
+            with open(self.metadata_file + ".tmp", 'w', encoding='utf-8') as f:
                 json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+            # Manifestul înaintea metadatelor: alt proces reîncarcă store-ul când se schimbă metadata.json
+            self._save_manifest()
+            os.replace(self.metadata_file + ".tmp", self.metadata_file)
+            self._disk_mtime = self._metadata_mtime()
+            self._remove_stale_vectors_files()
             print(f"✅ Vector store salvat pentru tenant {self.tenant_id}")
         except Exception as e:
             print(f"❌ Eroare la salvarea vector store pentru {self.tenant_id}: {e}")
     
+    def _open_vectors(self, vectors_file: Optional[str], dim: Optional[int], count: int) -> Optional[np.ndarray]:
+        """Primii count vectori exacți din fișierul de vectori (memmap, citiți la cerere); None dacă fișierul lipsește / e incomplet"""
+        if not count:
+            return np.zeros((0, dim or 0), dtype=np.float32)
+        if not vectors_file or not dim:
+            return None
+        path = os.path.join(self.store_path, vectors_file)
+        try:
+            if os.path.getsize(path) < count * dim * 4:
+                return None
+            return np.memmap(path, dtype=np.float32, mode='r', shape=(count, dim))
+        except (OSError, ValueError):
+            return None
+    
+    def _write_vectors_file(self, blocks) -> str:
+        """
+        Scrie vectorii exacți (blocuri float32) într-un fișier nou și returnează numele lui. Fiecare rescriere
+        folosește alt nume: fișierul vechi poate fi citit încă de o căutare (sau de alt proces), iar pe
+        Windows un fișier deschis nu poate fi înlocuit; fișierele vechi sunt șterse după salvarea manifestului.
+        """
+        vectors_file = f"vectors.{time.time_ns()}.f32"
+        path = os.path.join(self.store_path, vectors_file)
+        with open(path + ".tmp", 'wb') as f:
+            for block in blocks:
+                f.write(np.ascontiguousarray(block, dtype=np.float32).tobytes())
+        os.replace(path + ".tmp", path)
+        return vectors_file
+    
+    def _append_vectors_file(self, start: int, exact: np.ndarray):
+        """Scrie vectorii exacți de la poziția start în fișierul de vectori (apelat sub lock)"""
+        if not self._vectors_file:
+            self._vectors_file = f"vectors.{time.time_ns()}.f32"
+        path = os.path.join(self.store_path, self._vectors_file)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            # Rândurile de după start (de la o salvare întreruptă) nu aparțin niciunui chunk
+            f.truncate(start * exact.shape[1] * 4)
+            f.seek(start * exact.shape[1] * 4)
+            f.write(np.ascontiguousarray(exact, dtype=np.float32).tobytes())
+    
+    def _remove_stale_vectors_files(self):
+        """Șterge fișierele de vectori înlocuite (cele încă deschise în alt proces rămân până la următoarea salvare)"""
+        for name in os.listdir(self.store_path):
+            if name.startswith("vectors.") and name != self._vectors_file:
+                try:
+                    os.remove(os.path.join(self.store_path, name))
+                except OSError:
+                    pass
+    
+    def _reset_vectors(self, capacity: int = 0):
+        """Matrice nouă, goală, pentru vectorii din memorie, în reprezentarea self.quantization (apelat sub lock)"""
+        self._vectors = np.zeros((capacity, self.dim or 0), dtype=_QUANTIZED_DTYPES[self.quantization])
+        self._norms = np.zeros(capacity, dtype=np.float32)
+        self._scales = np.zeros(capacity, dtype=np.float32) if self.quantization == "int8" else None
+    
+    def _append_rows(self, start: int, exact: np.ndarray):
+        """
+        Scrie vectorii exacți (cuantizați) în matricea din memorie, de la poziția start (apelat sub lock).
+        Dacă nu mai este loc, alocă o matrice de două ori mai mare; căutările în curs o păstrează pe cea veche.
+        """
+        rows = start + len(exact)
+        if rows > len(self._vectors):
+            vectors, norms, scales = self._vectors, self._norms, self._scales
+            self._reset_vectors(max(rows, 2 * len(vectors)))
+            self._vectors[:start] = vectors[:start]
+            self._norms[:start] = norms[:start]
+            if scales is not None:
+                self._scales[:start] = scales[:start]
+        quantized, scales = quantize_vectors(exact, self.quantization)
+        self._vectors[start:rows] = quantized
+        self._norms[start:rows] = np.linalg.norm(exact, axis=1)
+        if scales is not None:
+            self._scales[start:rows] = scales
+    
+    def _fill_vectors(self, exact):
+        """Reconstruiește matricea din memorie din vectorii exacți (pe blocuri, fără o copie float32 completă)"""
+        self._reset_vectors(len(exact))
+        for start in range(0, len(exact), _VECTOR_BLOCK_ROWS):
+            self._append_rows(start, np.asarray(exact[start:start + _VECTOR_BLOCK_ROWS], dtype=np.float32))
+    
+    def memory_usage(self) -> int:
+        """Memoria ocupată de vectorii store-ului (bytes), fără metadate"""
+        return self._vectors.nbytes + self._norms.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+    
+    def configure(self, quantization: Optional[str] = None, rerank_candidates: Optional[int] = None,
+                  mmr_lambda: Optional[float] = None, max_chunks_per_file: Optional[int] = None,
+                  merge_adjacent: Optional[bool] = None):
+        """
+        Aplică setările de căutare ale tenant-ului (core/tenant_settings.py). Schimbarea cuantizării
+        reconstruiește matricea din memorie din vectorii exacți de pe disk; restul setărilor sunt doar reținute.
+        """
+        if quantization is not None and quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Cuantizare necunoscută: {quantization} (variante: {', '.join(QUANTIZATION_MODES)})")
+        with self._lock:
+            if rerank_candidates is not None:
+                self.rerank_candidates = max(1, int(rerank_candidates))
+            if mmr_lambda is not None:
+                self.mmr_lambda = min(1.0, max(0.0, float(mmr_lambda)))
+            if max_chunks_per_file is not None:
+                self.max_chunks_per_file = max(1, int(max_chunks_per_file))
+            if merge_adjacent is not None:
+                self.merge_adjacent = bool(merge_adjacent)
+            if quantization is None or quantization == self.quantization:
+                return
+            self._sync_from_disk()
+            exact = self._open_vectors(self._vectors_file, self.dim, len(self.metadata))
+            if exact is None:
+                print(f"⚠️ Vector store {self.tenant_id}: vectorii exacți nu pot fi citiți, cuantizarea rămâne {self.quantization}")
+                return
+            previous_usage = self.memory_usage()
+            self.quantization = quantization
+            self._fill_vectors(exact)
+            try:
+                self._save_manifest()
+            except OSError as e:
+                print(f"⚠️ Manifestul vector store-ului {self.tenant_id} nu poate fi salvat: {e}")
+        print(f"🗜️ Vector store {self.tenant_id}: cuantizare {quantization} "
+              f"({previous_usage // 1024} KB → {self.memory_usage() // 1024} KB)")
+    
+    def _tombstone(self, filename: str) -> bool:
+        """Marchează chunk-urile documentului ca șterse (apelat sub lock); O(1), fără copierea listelor"""
+        chunk_range = self._ranges.pop(filename, None)
+        if chunk_range is None:
+            return False
+        self._dead += chunk_range[1] - chunk_range[0]
+        return True
+    
+    def _maybe_compact(self):
+        """Rescrie store-ul fără chunk-urile șterse, când acestea depășesc RAG_COMPACT_RATIO (apelat sub lock)"""
+        if not self._dead or self._dead < RAG_COMPACT_RATIO * len(self.metadata):
+            return
+        exact = self._open_vectors(self._vectors_file, self.dim, len(self.metadata))
+        if exact is None:
+            print(f"⚠️ Vector store {self.tenant_id}: fișierul de vectori nu poate fi citit, compactare amânată")
+            return
+        live = sorted(self._ranges.items(), key=lambda item: item[1][0])
+        try:
+            vectors_file = self._write_vectors_file(exact[start:end] for _, (start, end) in live)
+        except OSError as e:
+            print(f"⚠️ Vector store {self.tenant_id}: compactare amânată ({e})")
+            return
+        positions = np.concatenate([np.arange(start, end) for _, (start, end) in live]) if live else np.zeros(0, dtype=np.int64)
+        metadata, ranges = [], {}
+        for filename, (start, end) in live:
+            ranges[filename] = (len(metadata), len(metadata) + end - start)
+            metadata.extend(self.metadata[start:end])
+        print(f"🧹 Vector store {self.tenant_id} compactat: {self._dead} chunk-uri șterse eliminate")
+        # Vectorii din memorie sunt copiați (deja cuantizați) într-o matrice nouă
+        self._vectors, self._norms = self._vectors[positions], self._norms[positions]
+        if self._scales is not None:
+            self._scales = self._scales[positions]
+        self.metadata, self._ranges, self._dead, self._vectors_file = metadata, ranges, 0, vectors_file
+    
     def _chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """Împarte textul în chunk-uri pentru o indexare mai bună"""
         if len(text) <= chunk_size:
@@ -137,155 +525,306 @@ class TenantRAGStore:
         Adaugă un document în vector store.
         Dacă documentul există deja, îl înlocuiește.
         """
-        # Șterge documentul existent dacă există
-        self.remove_document(filename)
-        
-        # Împarte în chunk-uri
+        # Împarte în chunk-uri și generează embeddings pentru fiecare chunk
         chunks = self._chunk_text(content)
+        model = self.model
+        embeddings = [get_embedding(chunk, model=model) for chunk in chunks]
+        self.add_chunks(filename, chunks, embeddings, model=model)
+    
+    def add_chunks(self, filename: str, chunks: List[str], embeddings: List[List[float]], model: Optional[str] = None):
+        """
+        Înlocuiește documentul cu chunk-urile date, ale căror embeddings sunt deja calculate
+        (ex: de pipeline-ul de ingestie, core/ingestion.py) cu modelul dat (implicit EMBEDDING_MODEL).
+        Căutările văd fie versiunea veche a documentului, fie pe cea nouă completă, niciodată una parțială.
+        Ridică EmbeddingMismatchError dacă modelul sau dimensiunea nu corespund store-ului
+        (ex: store-ul a trecut la alt model între calculul embeddings-urilor și salvare).
+        """
+        if len(chunks) != len(embeddings):
+            raise ValueError(f"Număr diferit de chunk-uri ({len(chunks)}) și embeddings ({len(embeddings)}) pentru {filename}")
+        model = model or EMBEDDING_MODEL
+        dims = {len(embedding) for embedding in embeddings}
+        if len(dims) > 1:
+            raise EmbeddingMismatchError(f"Embeddings cu dimensiuni diferite ({sorted(dims)}) pentru {filename}")
         
-        # Generează embeddings pentru fiecare chunk
-        for chunk_idx, chunk in enumerate(chunks):
-            embedding = get_embedding(chunk)
-            self.embeddings.append(embedding)
-            self.metadata.append({
+        new_metadata = [
+            {
                 "filename": filename,
                 "content": chunk,
                 "chunk_index": chunk_idx,
                 "total_chunks": len(chunks)
-            })
+            }
+            for chunk_idx, chunk in enumerate(chunks)
+        ]
         
-        self._save_store()
+        with self._lock:
+            self._sync_from_disk()
+            has_chunks = len(self.metadata) > self._dead
+            if model != self.model and has_chunks:
+                raise EmbeddingMismatchError(f"Store-ul {self.tenant_id} folosește {self.model}, embeddings calculate cu {model}")
+            dim = dims.pop() if dims else self.dim
+            if self.dim is not None and has_chunks and dim != self.dim:
+                raise EmbeddingMismatchError(f"Store-ul {self.tenant_id} are vectori de {self.dim} dimensiuni, {filename} are {dim}")
+            if dim != self.dim:
+                # Un store gol trece la altă dimensiune: chunk-urile șterse rămase (alte dimensiuni) sunt eliminate
+                self.metadata, self._ranges, self._dead, self._vectors_file = [], {}, 0, None
+                self.dim = dim
+                self._reset_vectors()
+            # Un store gol adoptă modelul documentului adăugat
+            self.model = model
+            # Versiunea nouă este adăugată la final (întâi pe disk) și devine vizibilă (intervalul ei)
+            # abia după ce toate chunk-urile sunt în store; versiunea veche devine tombstone
+            start = len(self.metadata)
+            if new_metadata:
+                exact = np.asarray(embeddings, dtype=np.float32)
+                self._append_vectors_file(start, exact)
+                self._append_rows(start, exact)
+                self.metadata.extend(new_metadata)
+            self._tombstone(filename)
+            if new_metadata:
+                self._ranges[filename] = (start, start + len(new_metadata))
+            self._maybe_compact()
+            self._save_store()
         print(f"✅ Document {filename} adăugat în vector store pentru tenant {self.tenant_id} ({len(chunks)} chunk-uri)")
     
     def remove_document(self, filename: str):
-        """Șterge un document din vector store"""
-        initial_count = len(self.embeddings)
-        
-        # Găsește toate chunk-urile pentru acest document
-        indices_to_remove = [
-            i for i, meta in enumerate(self.metadata)
-            if meta.get("filename") == filename
-        ]
-        
-        # Șterge în ordine inversă pentru a nu afecta indicii
-        for idx in reversed(indices_to_remove):
-            self.embeddings.pop(idx)
-            self.metadata.pop(idx)
-        
-        if len(self.embeddings) < initial_count:
+        """Șterge un document din vector store (tombstone; chunk-urile sunt eliminate la compactare)"""
+        with self._lock:
+            self._sync_from_disk()
+            if not self._tombstone(filename):
+                return
+            self._maybe_compact()
             self._save_store()
-            print(f"✅ Document {filename} șters din vector store pentru tenant {self.tenant_id}")
+        print(f"✅ Document {filename} șters din vector store pentru tenant {self.tenant_id}")
     
     def search(self, query: str, top_k: int = 5) -> List[Dict]:
         """
-        Caută în vector store și returnează top_k rezultate relevante.
-        Returnează: [{filename, content, score}, ...]
+        Caută în vector store și returnează top_k rezultate relevante și diferite între ele (MMR,
+        maxim max_chunks_per_file chunk-uri per fișier; chunk-urile vecine alese sunt unite).
+        Returnează: [{filename, content, score, chunk_index, chunk_count, total_chunks}, ...]
         """
-        if not self.embeddings:
-            return []
+        with self._lock:
+            self._sync_from_disk()
+            if not self._ranges:
+                return []
+            model, dim = self.model, self.dim
         
-        # Generează embedding pentru query
-        query_embedding = get_embedding(query)
-        query_dim = len(query_embedding)
+        # Query-ul este calculat cu modelul store-ului: în timpul unei migrări (EMBEDDING_MODEL schimbat),
+        # indexul vechi este servit cu modelul vechi până când reindexarea îl înlocuiește
+        query_embedding = get_embedding(query, model=model)
+        if dim is not None and len(query_embedding) != dim:
+            # Ex: modelul nu răspunde și query-ul a primit vectorul fallback hash - fără potriviri false
+            print(f"⚠️ Query cu {len(query_embedding)} dimensiuni pentru store-ul {self.tenant_id} ({model}, {dim} dimensiuni), căutare anulată")
+            return []
+        return self.search_vector(query_embedding, top_k)
+    
+    def search_vector(self, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
+        """
+        Ca search(), pentru un query deja transformat în vector (cu modelul store-ului, self.model).
+        Primii rerank_candidates candidați (după scorurile din matricea din memorie, aproximative dacă
+        vectorii sunt cuantizați) sunt reordonați cu vectorii float32 exacți, apoi diversificați cu MMR.
+        Cu float16, scanarea este dominată de conversia la float32 (~5x mai lentă decât none / int8).
+        """
+        with self._lock:
+            self._sync_from_disk()
+            vectors, norms, scales = self._vectors, self._norms, self._scales
+            metadata, dim, quantization = self.metadata, self.dim, self.quantization
+            vectors_file, rerank_candidates = self._vectors_file, self.rerank_candidates
+            mmr_lambda, max_per_file, merge_adjacent = self.mmr_lambda, self.max_chunks_per_file, self.merge_adjacent
+            ranges = list(self._ranges.values())
+        if not ranges:
+            return []
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query_vector))
+        if len(query_vector) != dim or query_norm == 0:
+            return []
         
-        # Verifică și aliniază dimensiunile embedding-urilor existente
-        valid_embeddings = []
-        valid_indices = []
+        # Doar chunk-urile documentelor existente (fără tombstones); vectorii nuli (store-uri vechi
+        # cu vectori de altă dimensiune) sunt ignorați
+        count = len(metadata)
+        live = np.zeros(count, dtype=bool)
+        for start, end in ranges:
+            live[start:end] = True
+        live &= norms[:count] > 0
+        live_count = int(live.sum())
+        if not live_count:
+            print(f"⚠️ Nu există embedding-uri valide pentru search în {self.tenant_id}")
+            return []
         
-        for i, doc_embedding in enumerate(self.embeddings):
-            doc_dim = len(doc_embedding) if isinstance(doc_embedding, (list, np.ndarray)) else 0
-            
-            # Dacă dimensiunile nu se potrivesc, încearcă să le alinieze
-            if doc_dim != query_dim:
-                # Dacă embedding-ul documentului este mai mare, trunchiază
-                if doc_dim > query_dim:
-                    if isinstance(doc_embedding, np.ndarray):
-                        doc_embedding = doc_embedding[:query_dim].tolist()
-                    else:
-                        doc_embedding = doc_embedding[:query_dim]
-                # Dacă embedding-ul documentului este mai mic, pad cu zerouri
-                elif doc_dim < query_dim:
-                    if isinstance(doc_embedding, np.ndarray):
-                        padding = np.zeros(query_dim - doc_dim)
-                        doc_embedding = np.concatenate([doc_embedding, padding]).tolist()
-                    else:
-                        doc_embedding = list(doc_embedding) + [0.0] * (query_dim - doc_dim)
-            
-            # Verifică că dimensiunile se potrivesc acum
-            if len(doc_embedding) == query_dim:
-                valid_embeddings.append(doc_embedding)
-                valid_indices.append(i)
-            else:
-                print(f"⚠️ Skip embedding {i}: dimensiuni nealiniate (doc: {len(doc_embedding)}, query: {query_dim})")
+        # Similaritatea cosinus pentru toți vectorii, pe blocuri
+        dots = np.empty(count, dtype=np.float32)
+        if quantization == "none":
+            for start in range(0, count, _VECTOR_BLOCK_ROWS):
+                end = min(start + _VECTOR_BLOCK_ROWS, count)
+                np.matmul(vectors[start:end], query_vector, out=dots[start:end])
+        else:
+            # Același buffer float32 pentru fiecare bloc convertit. Pentru float16 conversia domină timpul
+            # (fără suport hardware în numpy); blocuri mai mari sau astype() pe toată matricea nu sunt mai rapide
+            buffer = np.empty((_QUANTIZED_SCAN_ROWS, dim), dtype=np.float32)
+            for start in range(0, count, _QUANTIZED_SCAN_ROWS):
+                end = min(start + _QUANTIZED_SCAN_ROWS, count)
+                buffer[:end - start] = vectors[start:end]
+                np.matmul(buffer[:end - start], query_vector, out=dots[start:end])
+        if scales is not None:
+            dots *= scales[:count]
+        scores = np.full(count, -np.inf, dtype=np.float32)
+        np.divide(dots, norms[:count] * query_norm, out=scores, where=live)
         
-        if not valid_embeddings:
-            print(f"⚠️ Nu există embedding-uri valide pentru search (query dim: {query_dim})")
-            return []
+        # Candidații: cu vectorii lor float32 exacți (din memorie sau, dacă sunt cuantizați, de pe disk)
+        candidates = min(live_count, max(top_k * 3, rerank_candidates))
+        indices = np.argpartition(-scores, candidates - 1)[:candidates]
+        indices = indices[np.argsort(-scores[indices], kind="stable")]
+        if quantization == "none":
+            exact = np.array(vectors[indices])
+        else:
+            exact = self._read_exact_vectors(vectors_file, dim, indices)
+            if exact is None:
+                exact = vectors[indices].astype(np.float32) * (scales[indices, None] if scales is not None else 1.0)
+        relevance = (exact @ query_vector) / (np.linalg.norm(exact, axis=1) * query_norm)
         
-        # Calculează similarități doar pentru embedding-urile valide
-        similarities = []
-        for idx, doc_embedding in zip(valid_indices, valid_embeddings):
-            try:
-                similarity = cosine_similarity(query_embedding, doc_embedding)
-                similarities.append((idx, similarity))
-            except Exception as e:
-                print(f"⚠️ Eroare la calcularea similarității pentru embedding {idx}: {e}")
-                continue
+        # MMR: chunk-uri relevante, dar diferite între ele (ferestrele suprapuse ale aceluiași pasaj sunt
+        # aproape identice), cu cel mult max_per_file chunk-uri din același fișier
+        filenames = [metadata[idx].get("filename", "unknown") for idx in indices]
+        selected = mmr_select(relevance, exact, filenames, top_k, mmr_lambda, max_per_file)
         
-        # Sortează după similaritate
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        # Chunk-urile alese consecutive din același document devin un singur rezultat (fără textul suprapus)
+        groups: List[List[int]] = []
+        for i in sorted(selected, key=lambda i: indices[i]) if merge_adjacent else selected:
+            previous = groups[-1][-1] if groups else None
+            if merge_adjacent and previous is not None and indices[i] == indices[previous] + 1 \
+                    and filenames[i] == filenames[previous]:
+                groups[-1].append(i)
+            else:
+                groups.append([i])
+        # Ordinea MMR (primul ales = cel mai relevant); un grup unit ia locul primului lui chunk ales
+        rank = {i: position for position, i in enumerate(selected)}
+        groups.sort(key=lambda group: min(rank[i] for i in group))
         
-        # Returnează top_k rezultate
         results = []
-        seen_files = set()  # Pentru a evita duplicatele
-        
-        for idx, score in similarities[:top_k * 3]:  # Luăm mai multe pentru a filtra duplicatele
-            meta = self.metadata[idx]
-            filename = meta.get("filename", "unknown")
-            
-            # Adaugă doar dacă nu am văzut deja acest fișier sau dacă avem puține rezultate
-            if filename not in seen_files or len(results) < top_k:
-                results.append({
-                    "filename": filename,
-                    "content": meta.get("content", ""),
-                    "score": score,
-                    "chunk_index": meta.get("chunk_index", 0),
-                    "total_chunks": meta.get("total_chunks", 1)
-                })
-                seen_files.add(filename)
-            
-            if len(results) >= top_k:
-                break
+        for group in groups:
+            meta = metadata[indices[group[0]]]
+            content = meta.get("content", "")
+            for i in group[1:]:
+                content = merge_chunk_texts(content, metadata[indices[i]].get("content", ""))
+            results.append({
+                "filename": filenames[group[0]],
+                "content": content,
+                "score": float(max(relevance[i] for i in group)),
+                "chunk_index": meta.get("chunk_index", 0),
+                "chunk_count": len(group),
+                "total_chunks": meta.get("total_chunks", 1)
+            })
         
         return results
     
+    def _read_exact_vectors(self, vectors_file: Optional[str], dim: int, positions: np.ndarray) -> Optional[np.ndarray]:
+        """Vectorii float32 exacți de pe pozițiile date; None (scorurile aproximative rămân) dacă fișierul nu poate fi citit"""
+        if not vectors_file or not len(positions):
+            return None
+        try:
+            exact = np.memmap(os.path.join(self.store_path, vectors_file), dtype=np.float32, mode='r',
+                              shape=(int(positions.max()) + 1, dim))
+            return np.array(exact[positions])
+        except (OSError, ValueError) as e:
+            # Ex: fișier înlocuit de o compactare între timp
+            print(f"⚠️ Vector store {self.tenant_id}: reordonare float32 sărită ({e})")
+            return None
+    
+    def get_document_chunks(self, filename: str) -> List[Dict]:
+        """Chunk-urile unui document, în ordine (O(chunk-urile documentului))"""
+        with self._lock:
+            self._sync_from_disk()
+            chunk_range = self._ranges.get(filename)
+            if chunk_range is None:
+                return []
+            return self.metadata[chunk_range[0]:chunk_range[1]]
+    
     def get_all_documents(self) -> List[Dict]:
         """Returnează toate documentele (fără duplicate)"""
-        seen = set()
-        documents = []
+        with self._lock:
+            self._sync_from_disk()
+            metadata = self.metadata
+            ranges = sorted(self._ranges.items(), key=lambda item: item[1][0])
+        
+        # Reconstituie fiecare document din intervalul lui de chunk-uri
+        return [
+            {
+                "filename": filename,
+                "content": "\n\n".join(meta.get("content", "") for meta in metadata[start:end])
+            }
+            for filename, (start, end) in ranges
+        ]
+    
+    def get_filenames(self) -> Set[str]:
+        """Numele documentelor din store"""
+        with self._lock:
+            self._sync_from_disk()
+            return set(self._ranges)
+
+    def content_version(self) -> str:
+        """
+        Versiunea conținutului indexat: se schimbă la orice adăugare, ștergere (tombstone), compactare,
+        reindexare sau schimbare a modelului de embeddings (ex: cheia cache-ului de răspunsuri)
+        """
+        with self._lock:
+            self._sync_from_disk()
+            return f"{self.model}:{self._vectors_file}:{len(self.metadata)}:{len(self._ranges)}"
+
+    def swap_in(self, shadow: "TenantRAGStore", from_shadow: Set[str], keep_live: Set[str]) -> Set[str]:
+        """
+        Înlocuiește atomic conținutul store-ului cu documentele from_shadow din indexul shadow,
+        plus documentele keep_live din versiunea curentă (ex: încărcate în timpul reindexării).
+        Restul documentelor (șterse între timp) dispar. Căutările văd fie indexul vechi, fie pe cel nou.
+        Store-ul preia modelul de embeddings al shadow-ului; dacă acesta diferă, documentele keep_live
+        sunt scoase (nu pot fi amestecate vectori de la modele diferite). Returnează documentele păstrate.
+        """
+        metadata: List[Dict] = []
+        ranges: Dict[str, Tuple[int, int]] = {}
+        blocks = []
         
-        for meta in self.metadata:
-            filename = meta.get("filename", "unknown")
-            if filename not in seen:
-                # Colectează toate chunk-urile pentru acest document
-                chunks = [
-                    m.get("content", "")
-                    for m in self.metadata
-                    if m.get("filename") == filename
-                ]
-                documents.append({
-                    "filename": filename,
-                    "content": "\n\n".join(chunks)  # Reconstituie documentul complet
-                })
-                seen.add(filename)
+        def copy_documents(store: "TenantRAGStore", filenames: Set[str]):
+            exact = store._open_vectors(store._vectors_file, store.dim, len(store.metadata))
+            if exact is None:
+                raise OSError(f"fișierul de vectori al store-ului {store.store_path} nu poate fi citit")
+            for filename, (start, end) in sorted(store._ranges.items(), key=lambda item: item[1][0]):
+                if filename in filenames and filename not in ranges:
+                    ranges[filename] = (len(metadata), len(metadata) + end - start)
+                    metadata.extend(store.metadata[start:end])
+                    blocks.append(exact[start:end])
         
-        return documents
+        with shadow._lock:
+            shadow._sync_from_disk()
+            copy_documents(shadow, from_shadow)
+            shadow_model, shadow_dim = shadow.model, shadow.dim
+        with self._lock:
+            self._sync_from_disk()
+            if (self.model, self.dim) != (shadow_model, shadow_dim):
+                # Migrare la alt model: vectorii vechi nu pot fi amestecați cu cei noi
+                dropped = sorted((keep_live - from_shadow) & set(self._ranges))
+                if dropped:
+                    print(f"⚠️ {self.tenant_id}: documente fără versiune {shadow_model}, scoase din index: {dropped}")
+                kept = set()
+            else:
+                kept = (keep_live - from_shadow) & set(self._ranges)
+                copy_documents(self, kept)
+            # Vectorii exacți ajung într-un fișier nou al store-ului, iar matricea din memorie este
+            # reconstruită din el în reprezentarea (cuantizarea) acestui store
+            vectors_file = self._write_vectors_file(blocks)
+            self.metadata, self._ranges, self._dead = metadata, ranges, 0
+            self.model, self.dim, self._vectors_file = shadow_model, shadow_dim, vectors_file
+            self._fill_vectors(self._open_vectors(vectors_file, shadow_dim, len(metadata)))
+            self._save_store()
+        print(f"✅ Index nou activat pentru tenant {self.tenant_id} ({shadow_model}): "
+              f"{len(from_shadow)} documente reindexate, {len(kept)} păstrate")
+        return kept
     
     def clear(self):
         """Șterge tot vector store-ul"""
-        self.embeddings = []
-        self.metadata = []
-        self._save_store()
+        with self._lock:
+            self.metadata = []
+            self._ranges, self._dead = {}, 0
+            self.model, self.dim, self._vectors_file = EMBEDDING_MODEL, None, None
+            self._reset_vectors()
+            self._save_store()
         print(f"✅ Vector store șters pentru tenant {self.tenant_id}")
 
 # Cache pentru store-uri per tenant
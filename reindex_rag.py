@@ -0,0 +1,97 @@
+"""
+Reindexare RAG în masă, din linia de comandă (ex: după schimbarea EMBEDDING_MODEL în .env).
+
+Pune în coadă câte un job "reindex" per tenant (core/rag_reindex.py) și, implicit, le rulează în
+acest proces, afișând progresul. Un tenant întrerupt (Ctrl+C, crash) este reluat de la ultimul
+fișier terminat la următoarea rulare - sau de worker-ele serverului, dacă acesta rulează.
+
+Rulează:
+    python reindex_rag.py                       # toți tenanții, embeddings noi din textul salvat
+    python reindex_rag.py 12 15 --reextract     # doar chat-urile 12 și 15, cu extragere / OCR din nou
+    python reindex_rag.py --enqueue-only        # doar pune job-urile în coadă (le procesează serverul)
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Adaugă directorul curent la path
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Încarcă .env înaintea modulelor care citesc variabilele de mediu (EMBEDDING_MODEL, RAG_*)
+import core.config  # noqa: F401
+from core.rag_jobs import RAG_JOB_WORKERS, get_rag_job_queue, start_rag_job_workers, stop_rag_job_workers
+from core.rag_reindex import enqueue_all_reindex, enqueue_tenant_reindex
+
+
+async def wait_for_jobs(job_ids, workers: int) -> int:
+    """Rulează worker-ele până când toate job-urile date sunt terminate; returnează numărul celor eșuate"""
+    queue = get_rag_job_queue()
+    start_rag_job_workers(workers)
+    last_line = {}
+    try:
+        while True:
+            jobs = [queue.get(job_id) for job_id in job_ids]
+            for job in jobs:
+                line = (f"  {job['chat_id']}: {job['status']} ({job['stage'] or '-'}) "
+                        f"{job['pages_done']}/{job['pages_total'] or '?'} fișiere, {job['chunks_done']} chunk-uri")
+                if last_line.get(job["id"]) != line:
+                    last_line[job["id"]] = line
+                    print(line)
+            if all(job["status"] in ("done", "failed") for job in jobs):
+                break
+            await asyncio.sleep(2)
+    finally:
+        await stop_rag_job_workers()
+
+    failed = 0
+    for job in jobs:
+        if job["status"] == "failed":
+            failed += 1
+            print(f"❌ {job['chat_id']}: {job['error']}")
+        else:
+            result = job["result"] or {}
+            print(f"✅ {job['chat_id']}: {result.get('files_reindexed', 0)}/{result.get('files_total', 0)} fișiere, "
+                  f"{result.get('chunks', 0)} chunk-uri ({result.get('model')})"
+                  + (f", {len(result['failed_files'])} sărite" if result.get('failed_files') else ""))
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reindexare RAG pentru unul sau mai mulți tenanți")
+    parser.add_argument("chat_ids", nargs="*", help="ID-urile chat-urilor (implicit: toate)")
+    parser.add_argument("--reextract", action="store_true",
+                        help="Extrage din nou textul din fișierele originale (altfel: doar embeddings noi din textul salvat)")
+    parser.add_argument("--layout", action="store_true", help="Păstrează așezarea textului din PDF-uri")
+    parser.add_argument("--workers", type=int, default=RAG_JOB_WORKERS, help="Tenanți procesați în paralel")
+    parser.add_argument("--enqueue-only", action="store_true", help="Doar pune job-urile în coadă")
+    args = parser.parse_args()
+
+    if args.chat_ids:
+        jobs = []
+        for chat_id in args.chat_ids:
+            job_id, created = enqueue_tenant_reindex(chat_id, int(chat_id) if chat_id.isdigit() else None,
+                                                     args.layout, args.reextract)
+            jobs.append({"chat_id": chat_id, "job_id": job_id, "created": created})
+    else:
+        jobs = enqueue_all_reindex(args.layout, args.reextract)
+
+    if not jobs:
+        print("❌ Niciun tenant de reindexat")
+        return
+    for job in jobs:
+        print(f"📋 {job['chat_id']}: job {job['job_id']}" + ("" if job["created"] else " (deja în coadă)"))
+    if args.enqueue_only:
+        return
+
+    started = time.perf_counter()
+    failed = asyncio.run(wait_for_jobs([job["job_id"] for job in jobs], max(1, args.workers)))
+    print(f"\nReindexare terminată în {time.perf_counter() - started:.1f}s: "
+          f"{len(jobs) - failed} reușite, {failed} eșuate")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,22 @@
-from fastapi import APIRouter, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, HTTPException, status, UploadFile, File, Query
 from fastapi.responses import JSONResponse
-import os
+import asyncio
+from typing import Optional
 from urllib.parse import unquote
 from database import (
     get_client_chat, create_client_chat, update_client_chat, list_all_client_chats,
     create_or_update_client_type,
-    add_rag_file, delete_rag_file
+    delete_rag_file, rag_blob_lock, release_rag_blob
 )
 from rag_manager import get_tenant_rag_store
 from core.cache import get_cached_config, invalidate_config_cache
 from core.conversation import get_tenant_id_from_chat_id
-from core.config import PDF_AVAILABLE, OCR_AVAILABLE
-import PyPDF2
+from core.blob_store import compute_sha256, get_blob_store
+from core.rag_jobs import get_rag_job_queue, job_response
+from core.rag_reindex import enqueue_all_reindex, enqueue_embedding_migration, enqueue_tenant_reindex, embedding_status
+from core.tenant_settings import apply_rag_settings, get_tenant_settings, merge_tenant_settings
+from core.answer_cache import get_answer_cache
+from core.coalescing import coalescing_stats
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -76,6 +81,15 @@ async def update_tenant_config(chat_id: str, config_updates: dict):
             )
         client_chat_id = db_config.get("id")
     
+    # Setările per tenant: modificări parțiale peste cele salvate (core/tenant_settings.py)
+    settings = None
+    if config_updates.get("settings") is not None:
+        current = get_client_chat(str(client_chat_id)) or {}
+        try:
+            settings = merge_tenant_settings(current.get("settings") or {}, config_updates["settings"])
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+    
     # Actualizează în baza de date
     success = update_client_chat(
         chat_id=client_chat_id,
@@ -85,7 +99,8 @@ async def update_tenant_config(chat_id: str, config_updates: dict):
         chat_title=config_updates.get("chat_title"),
         chat_subtitle=config_updates.get("chat_subtitle"),
         chat_color=config_updates.get("chat_color"),
-        is_active=config_updates.get("is_active")
+        is_active=config_updates.get("is_active"),
+        settings=settings
     )
     
     if not success:
@@ -100,6 +115,11 @@ async def update_tenant_config(chat_id: str, config_updates: dict):
     # Reîncarcă config-ul
     config = get_cached_config(chat_id)
     
+    if settings is not None and config:
+        # Noua cuantizare se aplică imediat (reconstruirea vectorilor din memorie, în afara event loop-ului)
+        rag_store = get_tenant_rag_store(get_tenant_id_from_chat_id(chat_id))
+        await asyncio.get_event_loop().run_in_executor(None, apply_rag_settings, rag_store, get_tenant_settings(config)["rag"])
+    
     return JSONResponse(content={
         "success": True,
         "message": "Configurația a fost actualizată",
@@ -107,8 +127,15 @@ async def update_tenant_config(chat_id: str, config_updates: dict):
     })
 
 @router.post("/tenant/{chat_id}/rag/upload")
-async def upload_rag_file(chat_id: str, file: UploadFile = File(...)):
-    """Încarcă un fișier RAG pentru un tenant"""
+async def upload_rag_file(
+    chat_id: str,
+    file: UploadFile = File(...),
+    layout: bool = Query(False, description="Păstrează așezarea textului din PDF (util pentru formulare)")
+):
+    """
+    Încarcă un fișier RAG pentru un tenant. Răspunde imediat (202) cu ID-ul job-ului de ingestie;
+    progresul se urmărește la GET /admin/rag/jobs/{job_id}.
+    """
     print(f"📤 Upload RAG pentru tenant {chat_id}, fișier: {file.filename if file.filename else 'N/A'}")
     
     config = get_cached_config(chat_id)
@@ -139,59 +166,6 @@ async def upload_rag_file(chat_id: str, file: UploadFile = File(...)):
             content={"error": f"Eroare la citirea fișierului: {str(e)}"}
         )
     
-    # Extrage text din fișierul din memorie
-    text_content = ""
-    try:
-        print(f"📄 Încep extragerea textului din {file.filename}...")
-        if file.filename.endswith('.pdf') and PDF_AVAILABLE:
-            print(f"📄 Procesare PDF: {file.filename}")
-            import io
-            pdf_file = io.BytesIO(file_data)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            print(f"📄 PDF are {len(pdf_reader.pages)} pagini")
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    if page_text.strip():
-                        text_content += f"\n--- Pagina {page_num + 1} ---\n{page_text}\n"
-                except Exception as e:
-                    print(f"⚠️ Eroare la extragerea paginii {page_num + 1} din {file.filename}: {e}")
-            if not text_content.strip():
-                print(f"⚠️ PDF {file.filename} nu conține text extractibil (poate fi scanat)")
-        elif file.filename.endswith(('.txt', '.md')):
-            print(f"📄 Procesare text: {file.filename}")
-            try:
-                text_content = file_data.decode('utf-8')
-            except UnicodeDecodeError:
-                print(f"⚠️ Eroare encoding UTF-8, încerc latin-1...")
-                text_content = file_data.decode('latin-1')
-        elif file.filename.endswith(('.doc', '.docx')):
-            print(f"📄 Procesare DOC/DOCX: {file.filename}")
-            try:
-                from docx import Document
-                import io
-                doc = Document(io.BytesIO(file_data))
-                for para in doc.paragraphs:
-                    if para.text.strip():
-                        text_content += para.text + "\n"
-                # Extrage și din tabele
-                for table in doc.tables:
-                    for row in table.rows:
-                        row_text = " | ".join([cell.text.strip() for cell in row.cells])
-                        if row_text.strip():
-                            text_content += row_text + "\n"
-            except ImportError:
-                print(f"⚠️ python-docx nu este instalat. Pentru DOC/DOCX, rulează: pip install python-docx")
-                text_content = f"[Fișier DOC/DOCX - instalează python-docx pentru extragere]"
-        else:
-            print(f"⚠️ Tip de fișier necunoscut: {file.filename}")
-        
-        print(f"✅ Text extras: {len(text_content)} caractere")
-    except Exception as e:
-        print(f"❌ Eroare la extragerea textului din {file.filename}: {e}")
-        import traceback
-        traceback.print_exc()
-    
     # Convertește chat_id la int pentru DB
     try:
         client_chat_id = int(chat_id)
@@ -204,40 +178,72 @@ async def upload_rag_file(chat_id: str, file: UploadFile = File(...)):
             )
         client_chat_id = db_config.get("id")
     
-    # Adaugă fișierul în baza de date cu conținutul text și fișierul binar
-    if text_content and text_content.strip():
-        # Salvează sau actualizează fișierul în DB cu conținutul text și fișierul binar
-        add_rag_file(client_chat_id, file.filename, text_content.strip(), file_data)
-        print(f"✅ Fișier RAG salvat în DB cu conținut și date: {file.filename} ({len(text_content)} caractere, {len(file_data)} bytes)")
-    else:
-        # Dacă nu s-a putut extrage text, salvează doar fișierul binar
-        add_rag_file(client_chat_id, file.filename, None, file_data)
-        print(f"⚠️ Nu s-a putut extrage text din {file.filename} (poate fi gol, scanat sau protejat) - salvat doar fișierul binar ({len(file_data)} bytes)")
+    # Extragerea, OCR-ul, embeddings-urile și salvarea în DB rulează într-un job în fundal
+    # (core/rag_jobs.py); fișierul este păstrat în blob store până îl preia un worker
+    def store_and_enqueue() -> str:
+        # Sub lock-ul blob-ului: ștergerea unui fișier cu același conținut nu poate elimina blob-ul
+        # între salvare și apariția job-ului în coadă (job-ul neterminat este o referință)
+        blob_sha256 = compute_sha256(file_data)
+        with rag_blob_lock(blob_sha256):
+            get_blob_store().put(file_data)
+            return get_rag_job_queue().enqueue(
+                "upload", chat_id, tenant_id, file.filename, client_chat_id, blob_sha256, {"layout": layout}
+            )
     
-    # Actualizează vector store
     try:
-        rag_store = get_tenant_rag_store(tenant_id)
-        if text_content and text_content.strip():
-            rag_store.add_document(file.filename, text_content.strip())
-            print(f"✅ Fișier RAG adăugat în vector store pentru tenant {tenant_id}")
-        else:
-            print(f"⚠️ Nu s-a adăugat în vector store (fără conținut text)")
+        loop = asyncio.get_event_loop()
+        job_id = await loop.run_in_executor(None, store_and_enqueue)
     except Exception as e:
-        print(f"⚠️ Eroare la actualizarea vector store pentru tenant {tenant_id}: {e}")
-        import traceback
-        traceback.print_exc()
-    
-    # Invalidează cache-ul
-    invalidate_config_cache(chat_id)
+        print(f"❌ Eroare la crearea job-ului de ingestie pentru {file.filename}: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Eroare la salvarea fișierului pentru procesare: {str(e)}"}
+        )
+    print(f"✅ Job de ingestie {job_id} creat pentru {file.filename}")
     
-    return JSONResponse(content={
+    return JSONResponse(status_code=202, content={
         "success": True,
-        "message": f"Fișier {file.filename} încărcat cu succes" + ("" if text_content and text_content.strip() else " (fără conținut text extractibil)"),
+        "message": f"Fișier {file.filename} primit, indexarea rulează în fundal",
         "filename": file.filename,
-        "has_content": bool(text_content and text_content.strip()),
-        "content_length": len(text_content) if text_content else 0
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/admin/rag/jobs/{job_id}"
     })
 
+@router.get("/rag/jobs/{job_id}")
+async def get_rag_job(job_id: str):
+    """Statusul și progresul unui job de ingestie RAG (pagini extrase, chunk-uri cu embeddings)"""
+    job = get_rag_job_queue().get(job_id)
+    if not job:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Job inexistent: {job_id}"}
+        )
+    return JSONResponse(content=job_response(job))
+
+@router.get("/tenant/{chat_id}/rag/jobs")
+async def list_rag_jobs(chat_id: str, status: Optional[str] = Query(None), limit: int = Query(50, ge=1, le=500)):
+    """Job-urile de ingestie RAG recente ale unui tenant"""
+    jobs = get_rag_job_queue().list_jobs(chat_id=chat_id, status=status, limit=limit)
+    return JSONResponse(content={"jobs": [job_response(job) for job in jobs]})
+
+@router.post("/rag/jobs/{job_id}/retry")
+async def retry_rag_job(job_id: str):
+    """Repune în coadă un job de ingestie eșuat"""
+    job = get_rag_job_queue().get(job_id)
+    # Blob-ul unui upload eșuat definitiv este eliberat (database.release_rag_blob)
+    if job and job["status"] == "failed" and job["blob_sha256"] and not get_blob_store().exists(job["blob_sha256"]):
+        return JSONResponse(
+            status_code=409,
+            content={"error": "Fișierul job-ului nu mai este disponibil, încarcă-l din nou"}
+        )
+    if not get_rag_job_queue().retry(job_id):
+        return JSONResponse(
+            status_code=409,
+            content={"error": "Doar job-urile eșuate pot fi reîncercate"}
+        )
+    return JSONResponse(content=job_response(get_rag_job_queue().get(job_id)))
+
 @router.delete("/tenant/{chat_id}/rag/{filename}")
 async def delete_rag_file_endpoint(chat_id: str, filename: str):
     """Șterge un fișier RAG pentru un tenant"""
@@ -271,6 +277,11 @@ async def delete_rag_file_endpoint(chat_id: str, filename: str):
             )
         client_chat_id = db_config.get("id")
     
+    # Job-urile de upload încă neterminate ale fișierului nu îl mai adaugă înapoi
+    cancelled_blobs = get_rag_job_queue().cancel_uploads(client_chat_id, filename)
+    if cancelled_blobs:
+        print(f"🚫 {len(cancelled_blobs)} job-uri de upload anulate pentru {filename}")
+    
     # Șterge din baza de date
     deleted = delete_rag_file(client_chat_id, filename)
     if deleted:
@@ -278,6 +289,10 @@ async def delete_rag_file_endpoint(chat_id: str, filename: str):
     else:
         print(f"⚠️ Fișier nu era în DB: {filename}")
     
+    # Blob-urile job-urilor anulate înainte de a crea rândul rag_file nu mai sunt referite
+    for blob_sha256 in set(cancelled_blobs):
+        release_rag_blob(blob_sha256)
+    
     # Actualizează vector store
     try:
         rag_store = get_tenant_rag_store(tenant_id)
@@ -375,8 +390,15 @@ async def create_tenant(request: dict):
         )
 
 @router.post("/tenant/{chat_id}/reprocess-rag")
-async def reprocess_rag(chat_id: str):
-    """Re-procesează fișierele RAG pentru un chat existent"""
+async def reprocess_rag(
+    chat_id: str,
+    layout: bool = Query(False, description="Păstrează așezarea textului din PDF (util pentru formulare)"),
+    reextract: bool = Query(True, description="Extrage din nou textul din fișierele originale (False = doar embeddings noi din textul salvat)")
+):
+    """
+    Re-procesează fișierele RAG pentru un chat existent, în fundal (job "reindex", core/rag_reindex.py).
+    Indexul curent rămâne activ până când cel nou este complet; progresul: GET /admin/rag/jobs/{job_id}.
+    """
     config = get_cached_config(chat_id)
     if not config:
         return JSONResponse(
@@ -384,114 +406,119 @@ async def reprocess_rag(chat_id: str):
             content={"error": f"Chat configuration not found: {chat_id}"}
         )
     
-    rag_dir = f"rag/{chat_id}"
+    # Tenanții vechi, fără rând client_chat, sunt reindexați din directorul rag/{chat_id}
+    try:
+        client_chat_id = int(chat_id)
+    except ValueError:
+        db_config = get_client_chat(chat_id)
+        client_chat_id = db_config.get("id") if db_config else None
     
-    if not os.path.exists(rag_dir):
+    try:
+        loop = asyncio.get_event_loop()
+        job_id, created = await loop.run_in_executor(
+            None, enqueue_tenant_reindex, chat_id, client_chat_id, layout, reextract
+        )
+    except Exception as e:
+        print(f"❌ Eroare la crearea job-ului de reindexare pentru {chat_id}: {e}")
         return JSONResponse(
-            status_code=404,
-            content={"error": f"Directorul RAG nu există: {rag_dir}"}
+            status_code=500,
+            content={"error": f"Eroare la pornirea reindexării: {str(e)}"}
         )
+    print(f"✅ Job de reindexare {job_id} {'creat' if created else 'deja în curs'} pentru {chat_id}")
     
-    # Dacă rag_files este gol, detectează automat fișierele din director
-    rag_files = config.get("rag_files", [])
-    if not rag_files:
-        # Detectează automat toate fișierele din director
-        if os.path.exists(rag_dir):
-            rag_files = [f for f in os.listdir(rag_dir) if os.path.isfile(os.path.join(rag_dir, f))]
-            print(f"✅ Detectate automat {len(rag_files)} fișiere RAG în {rag_dir}")
-    
-    if not rag_files:
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "message": "Reindexarea rulează în fundal" if created else "O reindexare este deja în curs pentru acest chat",
+        "job_id": job_id,
+        "created": created,
+        "status_url": f"/admin/rag/jobs/{job_id}"
+    })
+
+@router.post("/rag/reindex-all")
+async def reindex_all_rag(
+    layout: bool = Query(False, description="Păstrează așezarea textului din PDF (util pentru formulare)"),
+    reextract: bool = Query(False, description="Extrage din nou textul din fișierele originale (False = doar embeddings noi din textul salvat)")
+):
+    """
+    Reindexează toți tenanții (ex: după schimbarea EMBEDDING_MODEL): un job "reindex" per tenant,
+    procesate în paralel de worker-ele de job-uri. Tenanții cu o reindexare în curs nu sunt dublați.
+    """
+    try:
+        loop = asyncio.get_event_loop()
+        jobs = await loop.run_in_executor(None, enqueue_all_reindex, layout, reextract)
+    except Exception as e:
+        print(f"❌ Eroare la pornirea reindexării globale: {e}")
         return JSONResponse(
-            status_code=400,
-            content={"error": "Nu există fișiere RAG pentru acest chat"}
+            status_code=500,
+            content={"error": f"Eroare la pornirea reindexării: {str(e)}"}
         )
+    created = sum(1 for job in jobs if job["created"])
+    print(f"✅ Reindexare globală: {created} job-uri noi, {len(jobs) - created} deja în curs")
     
-    rag_content = []
-    
-    for filename in rag_files:
-        file_path = os.path.join(rag_dir, filename)
-        if not os.path.exists(file_path):
-            print(f"⚠️ Fișier RAG nu există: {file_path}")
-            continue
-        
-        text_content = ""
-        try:
-            if filename.endswith('.pdf') and PDF_AVAILABLE:
-                with open(file_path, "rb") as pdf_file:
-                    pdf_reader = PyPDF2.PdfReader(pdf_file)
-                    for page_num, page in enumerate(pdf_reader.pages):
-                        try:
-                            page_text = page.extract_text()
-                            if page_text.strip():
-                                text_content += f"\n--- Pagina {page_num + 1} ---\n{page_text}\n"
-                        except Exception as e:
-                            print(f"Eroare la extragerea paginii {page_num + 1} din {filename}: {e}")
-                            continue
-                
-                # Dacă nu s-a extras text (PDF scanat), logăm
-                if not text_content.strip() and OCR_AVAILABLE:
-                    print(f"⚠️ PDF {filename} pare scanat sau nu conține text extractibil.")
-            elif filename.endswith(('.txt', '.md')):
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        text_content = f.read()
-                except UnicodeDecodeError:
-                    try:
-                        with open(file_path, "r", encoding="latin-1") as f:
-                            text_content = f.read()
-                    except Exception as e:
-                        print(f"Eroare la citirea fișierului {filename}: {e}")
-                except Exception as e:
-                    print(f"Eroare la citirea fișierului {filename}: {e}")
-            elif filename.endswith(('.doc', '.docx')):
-                try:
-                    try:
-                        from docx import Document
-                        doc = Document(file_path)
-                        for para in doc.paragraphs:
-                            if para.text.strip():
-                                text_content += para.text + "\n"
-                        # Extrage și din tabele
-                        for table in doc.tables:
-                            for row in table.rows:
-                                row_text = " | ".join([cell.text.strip() for cell in row.cells])
-                                if row_text.strip():
-                                    text_content += row_text + "\n"
-                    except ImportError:
-                        print(f"⚠️ python-docx nu este instalat. Pentru DOC/DOCX, rulează: pip install python-docx")
-                        text_content = f"[Fișier DOC/DOCX - instalează python-docx pentru extragere: pip install python-docx]"
-                except Exception as e:
-                    print(f"Eroare la extragerea textului din DOC/DOCX {filename}: {e}")
-        except Exception as e:
-            print(f"Eroare la procesarea {filename}: {e}")
-        
-        if text_content and text_content.strip():
-            rag_content.append({
-                "filename": filename,
-                "content": text_content.strip()
-            })
-            print(f"✅ Text re-extras din {filename}: {len(text_content)} caractere")
-    
-    # Actualizează vector store-ul pentru tenant
-    tenant_id = get_tenant_id_from_chat_id(chat_id)
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "message": f"Reindexare pornită pentru {len(jobs)} tenanți",
+        "jobs": jobs
+    })
+
+@router.get("/rag/embeddings")
+async def get_embedding_status():
+    """Modelul de embeddings al indexului fiecărui tenant, față de EMBEDDING_MODEL, și migrările în curs"""
+    loop = asyncio.get_event_loop()
+    return JSONResponse(content=await loop.run_in_executor(None, embedding_status))
+
+@router.post("/rag/migrate-embeddings")
+async def migrate_embeddings():
+    """
+    Migrează la EMBEDDING_MODEL indexurile construite cu alt model. Fiecare tenant rămâne pe indexul
+    vechi până când cel nou este complet (EMBEDDING_AUTO_MIGRATE face același lucru la startup).
+    """
     try:
-        rag_store = get_tenant_rag_store(tenant_id)
-        # Șterge toate documentele vechi
-        rag_store.clear()
-        # Adaugă documentele noi
-        for item in rag_content:
-            rag_store.add_document(item["filename"], item["content"])
-        print(f"✅ Vector store actualizat pentru tenant {tenant_id}")
+        loop = asyncio.get_event_loop()
+        jobs = await loop.run_in_executor(None, enqueue_embedding_migration)
     except Exception as e:
-        print(f"⚠️ Eroare la actualizarea vector store pentru tenant {tenant_id}: {e}")
+        print(f"❌ Eroare la pornirea migrării embeddings: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Eroare la pornirea migrării: {str(e)}"}
+        )
     
-    # Invalidează cache-ul
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "message": f"Migrare pornită pentru {len(jobs)} tenanți" if jobs else "Toate indexurile folosesc deja modelul curent",
+        "jobs": jobs
+    })
+
+@router.get("/tenant/{chat_id}/answer-cache")
+async def get_answer_cache_stats(chat_id: str):
+    """Setările și metricile cache-ului de răspunsuri al unui tenant (în procesul worker curent): hit rate, intrări, întrebări frecvente"""
+    config = get_cached_config(chat_id)
+    if not config:
+        return JSONResponse(status_code=404, content={"error": f"Chat configuration not found: {chat_id}"})
+    return JSONResponse(content={
+        "settings": get_tenant_settings(config)["answer_cache"],
+        "stats": get_answer_cache(get_tenant_id_from_chat_id(chat_id)).stats()
+    })
+
+@router.delete("/tenant/{chat_id}/answer-cache")
+async def purge_answer_cache(chat_id: str):
+    """
+    Golește cache-ul de răspunsuri al unui tenant. Ceilalți workeri își golesc cache-ul la următoarea
+    întrebare, după ce observă noul client_chat.config_version (fără migrarea 003: după TTL).
+    """
+    config = get_cached_config(chat_id)
+    if not config:
+        return JSONResponse(status_code=404, content={"error": f"Chat configuration not found: {chat_id}"})
+    removed = get_answer_cache(get_tenant_id_from_chat_id(chat_id)).purge()
     invalidate_config_cache(chat_id)
-    
+    print(f"🧹 Cache răspunsuri golit pentru {chat_id}: {removed} intrări")
     return JSONResponse(content={
         "success": True,
-        "processed_files": len(rag_content),
-        "total_files": len(rag_files),
-        "message": f"Re-procesat {len(rag_content)} din {len(rag_files)} fișiere și actualizat vector store"
+        "message": f"{removed} răspunsuri eliminate din cache",
+        "removed": removed
     })
 
+@router.get("/chat/coalescing")
+async def get_coalescing_stats():
+    """Generări Ollama pornite și cereri identice servite dintr-o generare în curs (în procesul worker curent)"""
+    return JSONResponse(content=coalescing_stats())
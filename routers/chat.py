@@ -1,23 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Request
 from fastapi.responses import StreamingResponse, JSONResponse, HTMLResponse, FileResponse
 from typing import Optional
 import asyncio
 import os
 import json
+from datetime import datetime, timezone
 from models.schemas import ChatRequest
 from database import (
     get_client_chat, create_client_chat,
     get_chat_session, create_chat_session, list_user_chat_sessions,
     update_chat_session as db_update_chat_session, delete_chat_session as db_delete_chat_session,
     get_conversation_history as db_get_conversation_history,
+    get_conversation_page as db_get_conversation_page,
+    get_recent_conversation_history as db_get_recent_conversation_history,
     add_message_to_conversation as db_add_message_to_conversation
 )
 from core.auth import get_current_user
-from core.cache import get_cached_config, invalidate_config_cache
+from core.cache import get_cached_config, invalidate_config_cache, get_rag_content
 from core.conversation import get_tenant_id_from_chat_id, create_default_config
 from core.prompt import enhance_prompt_for_autofill
-from core.config import ollama
+from core.answer_cache import answer_cache_key, get_answer_cache
+from core.tenant_settings import get_tenant_settings
+from core.config import ollama, MAX_CONTEXT_CHARS, CONTEXT_RESERVE, REQUEST_COALESCING, MODEL_KEEP_ALIVE
+from core.coalescing import coalesced_stream, prompt_key
 from core.title_generator import generate_chat_title
+from core.blob_store import get_blob_store, iter_file_range
+from core.file_response import stream_file_response, make_etag
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -54,6 +62,18 @@ async def stream_response(messages, model, page_context=None, pdf_text=None, rag
             "num_predict": 2000,
         })
     
+    # Cererile identice în curs (același prompt asamblat) împart o singură generare (core/coalescing.py)
+    if REQUEST_COALESCING:
+        key = prompt_key(model, messages, options)
+        async for chunk in coalesced_stream(key, lambda: ollama_stream(messages, model, options)):
+            yield chunk
+    else:
+        async for chunk in ollama_stream(messages, model, options):
+            yield chunk
+
+# === Generarea propriu-zisă: stream-ul de la Ollama ===
+async def ollama_stream(messages, model, options):
+    """Bucățile de text generate de Ollama; erorile sunt trimise ca text ("Eroare: ...")"""
     print(f"🤖 Apel Ollama: model={model}, {len(messages)} mesaje, options={options}")
     
     try:
@@ -61,7 +81,8 @@ async def stream_response(messages, model, page_context=None, pdf_text=None, rag
             model=model, 
             messages=messages, 
             stream=True,
-            options=options
+            options=options,
+            keep_alive=MODEL_KEEP_ALIVE
         )
         print(f"✅ Stream Ollama creat cu succes")
     except Exception as e:
@@ -175,6 +196,13 @@ async def stream_response(messages, model, page_context=None, pdf_text=None, rag
         print(f"⚠️ S-au primit {chunk_count} chunk-uri dar fără conținut")
         yield f"Eroare: Ollama a răspuns dar fără conținut. Verifică log-urile pentru detalii."
 
+# === Răspuns din cache-ul semantic, prin aceeași interfață de streaming ===
+async def stream_cached_answer(answer: str, chunk_chars: int = 64):
+    """Trimite un răspuns din cache (core/answer_cache.py) în bucăți, ca un stream de la Ollama"""
+    for start in range(0, len(answer), chunk_chars):
+        yield answer[start:start + chunk_chars]
+        await asyncio.sleep(0)
+
 @router.post("/{chat_id}/ask")
 async def ask_dynamic(chat_id: str, request: ChatRequest, current_user: dict = Depends(get_current_user)):
     print("\n" + "=" * 80)
@@ -260,15 +288,15 @@ async def ask_dynamic(chat_id: str, request: ChatRequest, current_user: dict = D
             )
         print(f"✅ Sesiune nouă creată: {session_id} pentru user {user_id}, chat {chat_id}")
     
-    # Extrage conținutul RAG din config dacă există
-    rag_content = config.get("rag_content", [])
+    # Conținutul RAG este un view leneș (citit din DB doar dacă promptul are nevoie de el)
+    rag_content = get_rag_content(config)
+    rag_content_info = config.get("rag_content_info", [])
     rag_files = config.get("rag_files", [])
     
-    # Log pentru debugging
-    if rag_content:
-        valid_rag = [r for r in rag_content if r.get("content", "").strip() and r.get("content", "") != "\n"]
-        print(f"📚 RAG pentru {chat_id}: {len(valid_rag)} fișiere valide din {len(rag_content)} totale")
-        if len(valid_rag) == 0:
+    # Log pentru debugging (doar din metadate)
+    if rag_content_info:
+        print(f"📚 RAG pentru {chat_id}: {len(rag_content)} fișiere valide din {len(rag_content_info)} totale")
+        if len(rag_content) == 0:
             if rag_files:
                 print(f"⚠️ ATENȚIE: Există {len(rag_files)} fișiere RAG pentru {chat_id}, dar toate sunt goale (probabil PDF-uri scanate). Re-procesează cu OCR sau convertează manual la text.")
             else:
@@ -280,18 +308,6 @@ async def ask_dynamic(chat_id: str, request: ChatRequest, current_user: dict = D
             print(f"ℹ️ Nu există RAG content pentru {chat_id}")
     
     # === GESTIONARE ISTORIC CONVERSAȚIE ===
-    # Obține istoricul existent folosind session_id sau chat_id (compatibilitate)
-    conversation_history = db_get_conversation_history(chat_id=chat_id if not session_id else None, session_id=session_id, user_id=user_id)
-    
-    # Colectează textele din fișierele din istoric (din file_info)
-    files_text_from_history = []
-    for msg in conversation_history:
-        if msg.get('file_info') and msg['file_info'].get('text'):
-            files_text_from_history.append({
-                'filename': msg['file_info'].get('filename', 'necunoscut'),
-                'text': msg['file_info'].get('text', '')
-            })
-    
     # Adaugă mesajul nou al utilizatorului în istoric
     user_message = request.message
     
@@ -395,8 +411,23 @@ async def ask_dynamic(chat_id: str, request: ChatRequest, current_user: dict = D
     print(f"✅ Rezultat salvare: {result}")
     print("=" * 80)
     
-    # Obține istoricul actualizat
-    updated_history = db_get_conversation_history(chat_id=chat_id if not session_id else None, session_id=session_id, user_id=user_id)
+    # Obține doar coada istoricului care încape în fereastra de context (citire inversă, oprire timpurie)
+    updated_history = db_get_recent_conversation_history(
+        chat_id=chat_id if not session_id else None,
+        session_id=session_id,
+        user_id=user_id,
+        max_chars=MAX_CONTEXT_CHARS - CONTEXT_RESERVE
+    )
+    
+    # Colectează textele din fișierele din istoric (din file_info), fără mesajul curent
+    # (textul fișierelor noi vine deja în request.pdf_text)
+    files_text_from_history = []
+    for msg in updated_history[:-1]:
+        if msg.get('file_info') and msg['file_info'].get('text'):
+            files_text_from_history.append({
+                'filename': msg['file_info'].get('filename', 'necunoscut'),
+                'text': msg['file_info'].get('text', '')
+            })
     
     # Extrage datele instituției și tenant_id
     tenant_id = get_tenant_id_from_chat_id(chat_id)
@@ -444,7 +475,28 @@ async def ask_dynamic(chat_id: str, request: ChatRequest, current_user: dict = D
             combined_pdf_text = history_files_text
     
     # Log pentru debugging
-    print(f"💬 Conversație pentru {chat_id} (session: {session_id}, tenant: {tenant_id}): {len(conversation_history)} mesaje istorice + 1 mesaj nou = {len(updated_history)} mesaje totale în context")
+    print(f"💬 Conversație pentru {chat_id} (session: {session_id}, tenant: {tenant_id}): {len(updated_history) - 1} mesaje istorice + 1 mesaj nou = {len(updated_history)} mesaje totale în context")
+    
+    # === CACHE SEMANTIC DE RĂSPUNSURI (opțional per tenant) ===
+    # Doar pentru prima întrebare a unei conversații, fără fișiere atașate / din istoric și fără formular:
+    # altfel răspunsul depinde de mai mult decât întrebarea și conținutul tenant-ului
+    answer_cache_settings = get_tenant_settings(config)["answer_cache"]
+    cache_key = None
+    cached_answer = None
+    if answer_cache_settings["enabled"] and user_message and user_message.strip():
+        has_form = bool(request.page_context and request.page_context.get("has_form"))
+        if file_info_to_save or combined_pdf_text or has_form or len(updated_history) > 1:
+            get_answer_cache(tenant_id).record_skip()
+        else:
+            loop = asyncio.get_event_loop()
+            cache_key = await loop.run_in_executor(None, answer_cache_key, chat_id, config, user_message)
+            if cache_key:
+                cached = get_answer_cache(tenant_id).lookup(
+                    *cache_key, answer_cache_settings["threshold"], answer_cache_settings["ttl_seconds"]
+                )
+                if cached:
+                    cached_answer = cached["answer"]
+                    print(f"⚡ Răspuns din cache pentru {chat_id} (similaritate {cached['score']:.3f} cu \"{cached['question'][:60]}\")")
     
     # === STREAM RĂSPUNS CU COLECTARE ===
     # Folosim un wrapper care colectează răspunsul complet
@@ -456,16 +508,20 @@ async def ask_dynamic(chat_id: str, request: ChatRequest, current_user: dict = D
     
     async def stream_with_collection():
         nonlocal full_response
-        async for chunk in stream_response(
-            messages, 
-            config["model"], 
-            request.page_context, 
-            combined_pdf_text,  # Folosește combined_pdf_text care include și fișierele din istoric
-            rag_content,
-            institution_data,
-            rag_search_query,
-            tenant_id
-        ):
+        if cached_answer is not None:
+            source = stream_cached_answer(cached_answer)
+        else:
+            source = stream_response(
+                messages, 
+                config["model"], 
+                request.page_context, 
+                combined_pdf_text,  # Folosește combined_pdf_text care include și fișierele din istoric
+                rag_content,
+                institution_data,
+                rag_search_query,
+                tenant_id
+            )
+        async for chunk in source:
             full_response += chunk
             yield chunk
         
@@ -490,6 +546,10 @@ async def ask_dynamic(chat_id: str, request: ChatRequest, current_user: dict = D
                 }
                 print(f"📎 Răspuns conține PDF generat: {filename}")
             
+            # Răspunsul generat intră în cache (nu și erorile de la Ollama sau răspunsurile cu PDF-uri generate)
+            if cache_key and cached_answer is None and not pdf_matches and not full_response.startswith("Eroare:"):
+                get_answer_cache(tenant_id).store(*cache_key, user_message, full_response, answer_cache_settings["max_entries"])
+            
             db_add_message_to_conversation(
                 session_id=session_id, 
                 chat_id=chat_id if not session_id else None, 
@@ -505,7 +565,7 @@ async def ask_dynamic(chat_id: str, request: ChatRequest, current_user: dict = D
                 session = get_chat_session(session_id)
                 if session and session.get('title') == 'Chat nou':
                     # Verifică dacă sunt doar 2 mesaje (primul user + primul assistant)
-                    history_after = db_get_conversation_history(chat_id=None, session_id=session_id, user_id=user_id)
+                    history_after = db_get_recent_conversation_history(session_id=session_id, max_messages=3)
                     if len(history_after) == 2:  # Doar primul mesaj user și primul răspuns assistant
                         try:
                             # Generează titlu automat
@@ -534,21 +594,8 @@ async def get_chat_config(chat_id: str, current_user: dict = Depends(get_current
             detail=f"Chat {chat_id} nu există"
         )
     
-    # Nu returnăm conținutul RAG complet (prea mare), doar metadata
+    # Config-ul conține doar metadatele RAG (rag_content_info), nu și textul fișierelor
     response_config = {**config}
-    if "rag_content" in response_config:
-        # Returnăm doar informații despre fișiere, nu conținutul complet
-        rag_info = []
-        for item in response_config["rag_content"]:
-            content = item.get("content", "")
-            rag_info.append({
-                "filename": item.get("filename", ""),
-                "content_length": len(content),
-                "has_content": bool(content and content.strip() and content != "\n")
-            })
-        response_config["rag_content_info"] = rag_info
-        # Nu trimitem conținutul complet în response (prea mare pentru frontend)
-        del response_config["rag_content"]
     
     return JSONResponse(content=response_config)
 
@@ -881,8 +928,18 @@ async def save_message(
         )
 
 @router.get("/{chat_id}/history")
-async def get_chat_history(chat_id: str, session_id: Optional[int] = None, current_user: dict = Depends(get_current_user)):
-    """Obține istoricul conversației pentru frontend"""
+async def get_chat_history(
+    chat_id: str,
+    session_id: Optional[int] = None,
+    before_id: Optional[int] = Query(None, description="ID-ul celui mai vechi mesaj deja încărcat (paginare keyset)"),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Numărul maxim de mesaje (activează paginarea)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Obține istoricul conversației pentru frontend.
+    Cu `limit` și/sau `before_id` returnează doar ultimele mesaje (paginare keyset de la coadă);
+    fără acești parametri returnează istoricul complet (compatibilitate).
+    """
     # Extrage user_id
     user_id = None
     if current_user:
@@ -908,6 +965,24 @@ async def get_chat_history(chat_id: str, session_id: Optional[int] = None, curre
         # Folosește user_id din sesiune
         user_id = session.get('user_id', user_id)
     
+    # Paginare keyset: doar ultimele `limit` mesaje înainte de `before_id`
+    if limit is not None or before_id is not None:
+        page = db_get_conversation_page(
+            chat_id=chat_id if not session_id else None,
+            session_id=session_id,
+            user_id=user_id,
+            before_id=before_id,
+            limit=limit or 50
+        )
+        return JSONResponse(content={
+            "chat_id": chat_id,
+            "session_id": session_id,
+            "message_count": len(page["messages"]),
+            "messages": page["messages"],
+            "has_more": page["has_more"],
+            "next_before_id": page["next_before_id"]
+        })
+    
     # Obține istoricul
     history = db_get_conversation_history(chat_id=chat_id if not session_id else None, session_id=session_id, user_id=user_id)
     
@@ -983,15 +1058,88 @@ async def list_rag_files(chat_id: str, current_user: dict = Depends(get_current_
     
     return JSONResponse(content={"files": files})
 
+def _rag_file_response(client_chat: dict, filename: str, request_headers=None, chat_id: Optional[str] = None):
+    """
+    Returnează un fișier RAG citit în flux, căutat direct după (chatbot, nume fișier):
+    din blob store (fișiere noi) sau din coloana file_data, pe bucăți (fișiere vechi).
+    Dacă chat_id este dat, caută și pe disk (fișiere foarte vechi) și le salvează pentru viitor.
+    Returnează None dacă fișierul există în RAG dar nu are date binare.
+    """
+    from database import get_rag_file, iter_rag_file_data
+    
+    rag_file = get_rag_file(client_chat['id'], filename)
+    if not rag_file:
+        raise HTTPException(status_code=404, detail=f"File '{filename}' not found in RAG")
+    
+    last_modified = rag_file.get('uploaded_at') if isinstance(rag_file.get('uploaded_at'), datetime) else None
+    
+    # Fișierele noi sunt în blob store - ETag = hash-ul conținutului
+    sha256 = rag_file.get('file_sha256')
+    if sha256:
+        store = get_blob_store()
+        size = rag_file.get('file_size')
+        if size is None:
+            size = store.size(sha256)
+        if size is not None and store.exists(sha256):
+            return stream_file_response(
+                lambda start, end: store.iter_range(sha256, start, end),
+                int(size), filename, request_headers,
+                etag=make_etag(sha256), last_modified=last_modified
+            )
+        print(f"⚠️ Blob {sha256} lipsește din blob store pentru {filename}")
+    
+    # Fișiere vechi: BLOB în coloana file_data, citit pe bucăți cu SUBSTRING
+    legacy_size = rag_file.get('file_data_size')
+    if legacy_size:
+        rag_file_id = rag_file['id']
+        return stream_file_response(
+            lambda start, end: iter_rag_file_data(rag_file_id, start, end),
+            int(legacy_size), filename, request_headers,
+            etag=make_etag(None, rag_file_id, legacy_size, rag_file.get('uploaded_at')),
+            last_modified=last_modified
+        )
+    
+    if not chat_id:
+        return None
+    
+    # Fișiere foarte vechi: doar pe disk
+    possible_paths = [
+        os.path.join("rag", str(client_chat['id']), filename),
+        os.path.join("rag", chat_id, filename),
+        os.path.join("rag", str(client_chat['id']), filename.replace(' ', '_')),
+        os.path.join("rag", chat_id, filename.replace(' ', '_')),
+    ]
+    file_path = next((path for path in possible_paths if os.path.exists(path)), None)
+    if not file_path:
+        return None
+    print(f"✅ Fișier găsit pe disk la: {file_path}")
+    
+    # Opțional: salvează în baza de date / blob store pentru viitor
+    try:
+        from database import add_rag_file
+        with open(file_path, "rb") as f:
+            add_rag_file(client_chat['id'], filename, None, f.read())
+        print(f"✅ Fișier salvat pentru viitor")
+    except Exception as e:
+        print(f"⚠️ Nu s-a putut salva în DB: {e}")
+    
+    stat = os.stat(file_path)
+    return stream_file_response(
+        lambda start, end: iter_file_range(file_path, start, end),
+        stat.st_size, filename, request_headers,
+        etag=make_etag(None, file_path, stat.st_size, stat.st_mtime),
+        last_modified=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+    )
+
 @router.get("/{chat_id}/rag-files/download")
 async def download_rag_file(
     chat_id: str,
+    request: Request,
     filename: str = Query(..., description="Numele fișierului de descărcat"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Descarcă un fișier RAG"""
-    from database import get_client_chat, get_rag_files
-    from core.conversation import get_tenant_id_from_chat_id
+    """Descarcă un fișier RAG (în flux, cu ETag/Last-Modified, GET condiționat și Range)"""
+    from database import get_client_chat
     
     # Obține client_chat_id
     client_chat = get_client_chat(chat_id)
@@ -999,77 +1147,22 @@ async def download_rag_file(
     if not client_chat:
         raise HTTPException(status_code=404, detail="Chat not found")
     
-    # Obține fișierul din baza de date
-    rag_files = get_rag_files(client_chat['id'], include_content=False, include_file_data=True)
-    rag_file = next((rf for rf in rag_files if rf.get('file') == filename), None)
+    response = _rag_file_response(client_chat, filename, request.headers, chat_id=chat_id)
+    if response is not None:
+        return response
     
-    if not rag_file:
-        raise HTTPException(status_code=404, detail=f"File '{filename}' not found in RAG")
+    # Listă fișierele disponibile pentru debugging
+    rag_dir = os.path.join("rag", str(client_chat['id']))
+    available_files = []
+    if os.path.exists(rag_dir):
+        available_files = [f for f in os.listdir(rag_dir) if os.path.isfile(os.path.join(rag_dir, f))]
     
-    # Verifică dacă fișierul are date binare în baza de date
-    file_data = rag_file.get('file_data')
-    
-    # Dacă nu are file_data în DB, încercă să îl citească de pe disk (pentru fișiere vechi)
-    if not file_data:
-        import os
-        # Încearcă mai multe locații posibile
-        possible_paths = [
-            os.path.join("rag", str(client_chat['id']), filename),
-            os.path.join("rag", chat_id, filename),
-            os.path.join("rag", str(client_chat['id']), filename.replace(' ', '_')),
-            os.path.join("rag", chat_id, filename.replace(' ', '_')),
-        ]
-        
-        file_path = None
-        for path in possible_paths:
-            if os.path.exists(path):
-                file_path = path
-                print(f"✅ Fișier găsit pe disk la: {path}")
-                break
-        
-        if file_path:
-            # Citește de pe disk
-            try:
-                with open(file_path, "rb") as f:
-                    file_data = f.read()
-                print(f"✅ Fișier citit de pe disk: {len(file_data)} bytes")
-                
-                # Opțional: salvează în baza de date pentru viitor
-                try:
-                    from database import add_rag_file
-                    add_rag_file(client_chat['id'], filename, None, file_data)
-                    print(f"✅ Fișier salvat în baza de date pentru viitor")
-                except Exception as e:
-                    print(f"⚠️ Nu s-a putut salva în DB (poate câmpul file_data nu există): {e}")
-            except Exception as e:
-                print(f"❌ Eroare la citirea fișierului de pe disk: {e}")
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Error reading file from disk: {str(e)}"
-                )
-        else:
-            # Listă fișierele disponibile pentru debugging
-            rag_dir = os.path.join("rag", str(client_chat['id']))
-            available_files = []
-            if os.path.exists(rag_dir):
-                available_files = [f for f in os.listdir(rag_dir) if os.path.isfile(os.path.join(rag_dir, f))]
-            
-            error_msg = f"File '{filename}' has no binary data in database and not found on disk."
-            if available_files:
-                error_msg += f" Available files: {', '.join(available_files[:5])}"
-            error_msg += " Please re-upload the file."
-            
-            raise HTTPException(status_code=404, detail=error_msg)
+    error_msg = f"File '{filename}' has no binary data in database and not found on disk."
+    if available_files:
+        error_msg += f" Available files: {', '.join(available_files[:5])}"
+    error_msg += " Please re-upload the file."
     
-    # Returnează fișierul pentru descărcare
-    import io
-    return StreamingResponse(
-        io.BytesIO(file_data),
-        media_type='application/pdf',
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        }
-    )
+    raise HTTPException(status_code=404, detail=error_msg)
 
 @router.post("/{chat_id}/generate-pdf")
 async def generate_pdf(
@@ -1078,8 +1171,7 @@ async def generate_pdf(
     current_user: dict = Depends(get_current_user)
 ):
     """Generează un PDF din conversația chat-ului sau un document RAG"""
-    from database import get_client_chat, get_conversation_history, get_rag_files
-    from core.conversation import get_tenant_id_from_chat_id
+    from database import get_client_chat, get_conversation_history
     import io
     import json
     
@@ -1104,29 +1196,13 @@ async def generate_pdf(
     if not client_chat:
         raise HTTPException(status_code=404, detail="Chat not found")
     
-    # Dacă este cerut un document RAG, returnează-l direct din baza de date
+    # Dacă este cerut un document RAG, returnează-l direct din blob store / baza de date
     if rag_filename:
-        # Obține fișierul din baza de date
-        rag_files = get_rag_files(client_chat['id'], include_content=False, include_file_data=True)
-        rag_file = next((rf for rf in rag_files if rf.get('file') == rag_filename), None)
-        
-        if not rag_file:
-            raise HTTPException(status_code=404, detail=f"File '{rag_filename}' not found in RAG")
-        
-        # Verifică dacă fișierul are date binare în baza de date
-        file_data = rag_file.get('file_data')
-        if not file_data:
+        # Căutare directă după (chatbot, nume fișier), citit în flux (fără BLOB-urile celorlalte fișiere)
+        response = _rag_file_response(client_chat, rag_filename)
+        if response is None:
             raise HTTPException(status_code=404, detail=f"File '{rag_filename}' has no binary data in database")
-        
-        # Returnează fișierul din baza de date
-        import io
-        return StreamingResponse(
-            io.BytesIO(file_data),
-            media_type='application/pdf',
-            headers={
-                "Content-Disposition": f'attachment; filename="{rag_filename}"'
-            }
-        )
+        return response
     
     # Altfel, generează PDF din conversație
     # Obține istoricul conversației
@@ -1,9 +1,8 @@
 from fastapi import APIRouter, UploadFile, File, Form, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional
 import io
 from core.config import PDF_AVAILABLE, OCR_AVAILABLE
-import PyPDF2
 from PIL import Image
 import pytesseract
 
@@ -24,33 +23,142 @@ except ImportError:
 
 router = APIRouter(tags=["files"])
 
-# Importă PDF2IMAGE_AVAILABLE din config (verificat la start)
-from core.config import PDF2IMAGE_AVAILABLE
+def _tesseract_image_to_string(img) -> Optional[str]:
+    """
+    Rulează Tesseract pe o imagine, încercând mai multe configurații de limbi
+    (ron+eng, eng, ron, implicit); prima configurație care produce text câștigă.
+    Erorile de instalare Tesseract sunt propagate, celelalte trec la următoarea configurație.
+    """
+    page_ocr_text = None
+    for lang_config in ['ron+eng', 'eng', 'ron', None]:
+        try:
+            if lang_config:
+                page_ocr_text = pytesseract.image_to_string(img, lang=lang_config)
+            else:
+                page_ocr_text = pytesseract.image_to_string(img)
+            
+            if page_ocr_text and page_ocr_text.strip():
+                break
+        except Exception as e:
+            if "tesseract" in str(e).lower() or "not found" in str(e).lower():
+                raise e
+            continue
+    return page_ocr_text
 
-# Importă convert_from_bytes dacă este disponibil
-if PDF2IMAGE_AVAILABLE:
-    try:
-        from pdf2image import convert_from_bytes
-    except ImportError:
-        PDF2IMAGE_AVAILABLE = False
+def _tesseract_cache_key(data: bytes) -> Optional[str]:
+    """Cheia din cache-ul OCR pentru rezultatul Tesseract al unei imagini (None dacă cache-ul este dezactivat)"""
+    from ocr_processor.result_cache import content_hash, get_ocr_cache, ocr_cache_key
+    if get_ocr_cache() is None:
+        return None
+    return ocr_cache_key(content_hash(data), "tesseract", "ron+eng")
+
+def _tesseract_page_text(page_num: int, img, cached: dict, page_key) -> Optional[str]:
+    """Textul Tesseract al unei pagini: din cache dacă pagina nu a fost rasterizată, altfel OCR + salvare în cache"""
+    from ocr_processor.result_cache import get_ocr_cache
+    if img is None:
+        return cached.get(page_num, {}).get("text", "")
+    page_text = _tesseract_image_to_string(img)
+    cache = get_ocr_cache()
+    if cache is not None:
+        cache.put(page_key(page_num), page_text or "")
+    return page_text
+
+def _tesseract_ocr_runner(pdf_content: bytes):
+    """
+    OCR Tesseract pentru paginile scanate găsite de extragerea hibridă (DPI 150, cache per pagină).
+    Fiecare pagină este rasterizată și procesată în thread pool pentru a nu bloca event loop-ul.
+    """
+    async def run(page_numbers):
+        import asyncio
+        from ocr_processor.result_cache import cached_pdf_page_stream
+        
+        loop = asyncio.get_event_loop()
+        # Verifică dacă Tesseract funcționează (eroarea ajunge în rezultatul fiecărei pagini)
+        await loop.run_in_executor(None, pytesseract.get_tesseract_version)
+        pages, cached, page_key = cached_pdf_page_stream(pdf_content, page_numbers, "ron+eng", 150, engine="tesseract")
+        async for page_num, img in pages:
+            try:
+                page_text = await loop.run_in_executor(None, _tesseract_page_text, page_num, img, cached, page_key) or ""
+                yield {"page": page_num, "text": page_text.strip(), "error": None}
+            except Exception as e:
+                print(f"⚠️ Eroare la OCR pentru pagina {page_num}: {e}")
+                yield {"page": page_num, "text": "", "error": str(e)}
+    return run
+
+def _pdf_ocr_runners(pdf_content: bytes):
+    """
+    Motoarele OCR disponibile pentru paginile scanate, în ordinea preferinței:
+    PaddleOCR (pool-ul OCR), apoi Tesseract ca fallback.
+    """
+    from ocr_processor.pdf_pages import RASTERIZE_AVAILABLE
+    from ocr_processor.pdf_hybrid import paddle_ocr_runner
+    
+    runners = []
+    if not RASTERIZE_AVAILABLE:
+        return runners
+    if PADDLEOCR_AVAILABLE_IMPORT:
+        runners.append(("paddleocr", paddle_ocr_runner(pdf_content, lang='ro', dpi=150)))
+    if OCR_AVAILABLE:
+        runners.append(("tesseract", _tesseract_ocr_runner(pdf_content)))
+    return runners
+
+def _extract_pdf_hybrid(pdf_content: bytes, max_pages: int, layout: bool = False):
+    """
+    Extrage textul din primele max_pages pagini: paginile cu strat de text direct, paginile scanate
+    prin OCR (PaddleOCR; paginile la care eșuează sunt reîncercate cu Tesseract).
+    layout=True păstrează așezarea textului din pagină (formulare).
+    Yields: rezultatele per pagină, în ordine (etapa de extragere din core.ingestion).
+    """
+    from core.ingestion import extract_pages
+    return extract_pages(pdf_content, "pdf", max_pages, layout, ocr_runners=_pdf_ocr_runners(pdf_content))
+
+def _ocr_error_response(errors: list) -> Optional[JSONResponse]:
+    """Răspunsul de eroare pentru un PDF scanat din care OCR-ul nu a extras nimic"""
+    error_str = " ".join(errors).lower()
+    if "poppler" in error_str or "pdftoppm" in error_str or "pdfinfo" in error_str:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "error": "Poppler nu este instalat sau nu este în PATH. Pentru a procesa PDF-uri scanate, instalează poppler:\n"
+                "Windows: https://github.com/oschwartz10612/poppler-windows/releases\n"
+                "Linux: sudo apt-get install poppler-utils\n"
+                "macOS: brew install poppler"
+            }
+        )
+    if "tesseract" in error_str:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "error": f"Tesseract OCR nu este disponibil. Eroare: {errors[0]}. Instalează Tesseract OCR de la: https://github.com/UB-Mannheim/tesseract/wiki"
+            }
+        )
+    if errors:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Eroare la procesarea PDF cu OCR: {errors[0]}"}
+        )
+    return None
 
 @router.post("/extract-pdf")
 async def extract_pdf(
     pdf: UploadFile = File(...), 
-    max_pages: int = Query(5, ge=1, le=10, description="Numărul maxim de pagini de procesat (1-10, default: 5)")
+    max_pages: int = Query(5, ge=1, le=10, description="Numărul maxim de pagini de procesat (1-10, default: 5)"),
+    layout: bool = Query(False, description="Păstrează așezarea textului din pagină (util pentru formulare)")
 ):
     """
     Extrage textul dintr-un fișier PDF.
-    Dacă PDF-ul este scanat (fără text extractibil), folosește OCR ca fallback.
+    Fiecare pagină este clasificată (strat de text / imagine scanată): paginile cu text sunt extrase
+    direct, doar paginile scanate trec prin OCR, iar rezultatele sunt combinate în ordinea paginilor.
     
     Args:
         pdf: Fișierul PDF
         max_pages: Numărul maxim de pagini de procesat (default: 10, pentru a evita timeout-uri)
+        layout: Păstrează așezarea textului (coloane, câmpuri de formular aliniate)
     """
     if not PDF_AVAILABLE:
         return JSONResponse(
             status_code=500,
-            content={"error": "PyPDF2 nu este instalat. Rulează: pip install PyPDF2"}
+            content={"error": "Niciun backend PDF instalat. Rulează: pip install pymupdf (sau PyPDF2)"}
         )
     
     if pdf.content_type != "application/pdf":
@@ -60,6 +168,10 @@ async def extract_pdf(
         )
     
     try:
+        import asyncio
+        from ocr_processor.pdf_pages import get_pdf_page_count
+        from ocr_processor.pdf_hybrid import summarize_pages
+        
         # Citește conținutul PDF
         pdf_content = await pdf.read()
         
@@ -69,242 +181,58 @@ async def extract_pdf(
                 content={"error": "Fișierul PDF este gol sau nu a putut fi citit."}
             )
         
-        # Încearcă mai întâi extragerea textului direct cu PyPDF2
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-        text = ""
-        extracted_pages = 0
+        # Numărul de pagini (PyMuPDF: fără parse complet al documentului)
+        try:
+            total_pages = await asyncio.get_event_loop().run_in_executor(None, get_pdf_page_count, pdf_content)
+        except Exception as e:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"PDF corupt sau invalid: {str(e)}"}
+            )
         
         # Limitează numărul de pagini pentru a evita timeout-uri
-        total_pages = len(pdf_reader.pages)
-        pages_to_process = min(total_pages, max_pages)
+        pages = [page async for page in _extract_pdf_hybrid(pdf_content, max_pages, layout)]
+        kinds = summarize_pages(pages)
         
-        for page_num, page in enumerate(pdf_reader.pages[:pages_to_process]):
-            try:
-                page_text = page.extract_text()
-                if page_text and page_text.strip():
-                    text += f"\n--- Pagina {page_num + 1} ---\n"
-                    text += page_text
-                    extracted_pages += 1
-            except Exception as e:
-                print(f"⚠️ Eroare la extragerea paginii {page_num + 1}: {e}")
+        text = ""
+        ocr_methods = set()
+        for page in pages:
+            page_text = page["text"].strip() if page["text"] else ""
+            if not page_text:
                 continue
+            if page["method"] == "direct":
+                text += f"\n--- Pagina {page['page']} ---\n"
+            else:
+                text += f"\n--- Pagina {page['page']} (OCR) ---\n"
+                ocr_methods.add(page["method"])
+            text += page_text
         
-        # Adaugă notă dacă au fost omise pagini
-        if total_pages > max_pages and extracted_pages > 0:
-            text += f"\n\n[Notă: Doar primele {max_pages} pagini au fost procesate din {total_pages} totale]"
-        
-        # Dacă nu s-a extras text sau s-a extras foarte puțin, încercă OCR (dacă este disponibil)
-        if not text.strip() or (extracted_pages == 0 and len(pdf_reader.pages) > 0):
-            print(f"📄 PDF pare să fie scanat (fără text extractibil). Încerc OCR...")
-            
-            if not PDF2IMAGE_AVAILABLE:
-                return JSONResponse(
-                    status_code=400,
-                    content={
-                        "error": "Nu s-a putut extrage text din PDF. PDF-ul pare să fie scanat. Pentru a procesa PDF-uri scanate, instalează: pip install pdf2image și poppler (Windows: https://github.com/oschwartz10612/poppler-windows/releases, Linux: sudo apt-get install poppler-utils, macOS: brew install poppler)"
-                    }
-                )
-            
-            # Preferă PaddleOCR dacă este disponibil, altfel folosește Tesseract
-            if PADDLEOCR_AVAILABLE_IMPORT and process_pdf:
-                print(f"📄 Folosesc PaddleOCR pentru extragere text din PDF scanat (max {max_pages} pagini)...")
-                try:
-                    # Rulează conversia PDF->imagini în thread pool pentru a nu bloca event loop-ul
-                    import asyncio
-                    loop = asyncio.get_event_loop()
-                    # Convertește doar primele max_pages pagini pentru viteză maximă
-                    # Folosim DPI mai mic (150) pentru viteză mai mare
-                    images = await loop.run_in_executor(
-                        None,
-                        lambda: convert_from_bytes(pdf_content, dpi=150)
-                    )
-                    
-                    if not images:
-                        print(f"⚠️ Nu s-au putut converti paginile PDF, încerc cu Tesseract...")
-                    else:
-                        # Limitează la primele max_pages pagini
-                        total_pages = len(images)
-                        images_to_process = images[:max_pages]
-                        
-                        ocr_text = ""
-                        processor = None
-                        
-                        # Folosește singleton pentru a evita reinițializarea modelelor
-                        try:
-                            from ocr_processor.singleton import get_ocr_processor
-                            processor = get_ocr_processor(lang='ro')
-                            if not processor:
-                                raise Exception("OCRProcessor nu este disponibil")
-                        except Exception as e:
-                            print(f"⚠️ Eroare la obținerea OCRProcessor: {e}")
-                            raise
-                        
-                        # Procesează fiecare pagină asincron (limitează la max_pages pentru viteză)
-                        pages_processed = 0
-                        for page_num, pil_image in enumerate(images_to_process):
-                            if pages_processed >= max_pages:
-                                break
-                            
-                            # Rulează procesarea în thread pool pentru a nu bloca
-                            try:
-                                page_text, _ = await loop.run_in_executor(
-                                    None,
-                                    lambda img=pil_image: processor.process_pil_image(img, return_boxes=False)
-                                )
-                                
-                                if page_text and page_text.strip():
-                                    ocr_text += f"\n--- Pagina {page_num + 1} ---\n"
-                                    ocr_text += page_text
-                                    pages_processed += 1
-                                    print(f"✅ Text extras din pagina {page_num + 1} cu PaddleOCR: {len(page_text)} caractere")
-                            except Exception as page_error:
-                                import traceback
-                                print(f"⚠️ Eroare la extragerea paginii {page_num + 1} cu PaddleOCR: {traceback.format_exc()}")
-                                continue
-                        
-                        # Adaugă notă dacă au fost omise pagini
-                        if total_pages > max_pages:
-                            ocr_text += f"\n\n[Notă: Doar primele {pages_processed} pagini au fost procesate din {total_pages} totale]"
-                        
-                        if ocr_text.strip():
-                            # Limitează textul la 50000 caractere pentru a evita timeout-uri
-                            final_text = ocr_text.strip()
-                            if len(final_text) > 50000:
-                                final_text = final_text[:50000] + "\n\n[... text trunchiat pentru a evita timeout-uri ...]"
-                            
-                            return JSONResponse(content={
-                                "text": final_text,
-                                "filename": pdf.filename,
-                                "type": "pdf",
-                                "method": "paddleocr",
-                                "pages": pages_processed,
-                                "total_pages": total_pages,
-                                "truncated": len(ocr_text.strip()) > 50000
-                            })
-                        else:
-                            print(f"⚠️ PaddleOCR nu a extras text, încerc cu Tesseract...")
-                except Exception as paddle_error:
-                    import traceback
-                    print(f"⚠️ Eroare la PaddleOCR pentru PDF: {traceback.format_exc()}")
-                    print(f"⚠️ Încerc cu Tesseract ca fallback...")
-            
-            # Fallback la Tesseract dacă PaddleOCR nu este disponibil sau a eșuat
-            if not OCR_AVAILABLE:
+        if not text.strip():
+            if kinds["image"] and not _pdf_ocr_runners(pdf_content):
                 return JSONResponse(
                     status_code=400,
                     content={
-                        "error": "Nu s-a putut extrage text din PDF. PDF-ul pare să fie scanat. Pentru a procesa PDF-uri scanate, instalează OCR: pip install pytesseract pillow pdf2image și Tesseract OCR."
-                    }
-                )
-            
-            # Verifică dacă Tesseract funcționează
-            try:
-                pytesseract.get_tesseract_version()
-            except Exception as tess_error:
-                return JSONResponse(
-                    status_code=500,
-                    content={
-                        "error": f"Tesseract OCR nu este disponibil. Eroare: {str(tess_error)}. Instalează Tesseract OCR de la: https://github.com/UB-Mannheim/tesseract/wiki"
+                        "error": "Nu s-a putut extrage text din PDF. PDF-ul pare să fie scanat. Pentru a procesa PDF-uri scanate, instalează OCR: pip install paddleocr opencv-python pymupdf (sau pytesseract pillow pdf2image și Tesseract OCR)."
                     }
                 )
-            
-            # Convertește PDF-ul în imagini și extrage text cu OCR
-            try:
-                # Rulează conversia PDF->imagini în thread pool pentru a nu bloca event loop-ul
-                import asyncio
-                loop = asyncio.get_event_loop()
-                # Reduce DPI-ul la 150 pentru viteză mai mare
-                images = await loop.run_in_executor(
-                    None,
-                    lambda: convert_from_bytes(pdf_content, dpi=150)
-                )
-                
-                # Limitează la primele max_pages pagini
-                total_pages = len(images)
-                images_to_process = images[:max_pages]
-                
-                ocr_text = ""
-                
-                for page_num, img in enumerate(images_to_process):
-                    try:
-                        # Încearcă cu diferite configurații de limbi
-                        page_ocr_text = None
-                        lang_configs = ['ron+eng', 'eng', 'ron', None]
-                        
-                        # Rulează OCR-ul în thread pool pentru a nu bloca event loop-ul
-                        loop = asyncio.get_event_loop()
-                        for lang_config in lang_configs:
-                            try:
-                                if lang_config:
-                                    page_ocr_text = await loop.run_in_executor(
-                                        None,
-                                        lambda img=img, lang=lang_config: pytesseract.image_to_string(img, lang=lang)
-                                    )
-                                else:
-                                    page_ocr_text = await loop.run_in_executor(
-                                        None,
-                                        lambda img=img: pytesseract.image_to_string(img)
-                                    )
-                                
-                                if page_ocr_text and page_ocr_text.strip():
-                                    break
-                            except Exception as e:
-                                if "tesseract" in str(e).lower() or "not found" in str(e).lower():
-                                    raise e
-                                continue
-                        
-                        if page_ocr_text and page_ocr_text.strip():
-                            ocr_text += f"\n--- Pagina {page_num + 1} (OCR) ---\n"
-                            ocr_text += page_ocr_text.strip()
-                    except Exception as e:
-                        print(f"⚠️ Eroare la OCR pentru pagina {page_num + 1}: {e}")
-                        continue
-                
-                # Adaugă notă dacă au fost omise pagini
-                if total_pages > max_pages:
-                    ocr_text += f"\n\n[Notă: Doar primele {max_pages} pagini au fost procesate din {total_pages} totale]"
-                
-                if ocr_text.strip():
-                    # Limitează textul la 50000 caractere pentru a evita timeout-uri
-                    final_ocr_text = ocr_text.strip()
-                    if len(final_ocr_text) > 50000:
-                        final_ocr_text = final_ocr_text[:50000] + "\n\n[... text trunchiat pentru a evita timeout-uri ...]"
-                    text = final_ocr_text
-                    print(f"✅ Text extras cu OCR din {len(images_to_process)} pagini (din {total_pages} totale): {len(text)} caractere")
-                else:
-                    return JSONResponse(
-                        status_code=400,
-                        content={"error": "Nu s-a putut extrage text din PDF nici cu OCR. PDF-ul poate fi protejat sau de calitate prea slabă."}
-                    )
-            except Exception as ocr_error:
-                import traceback
-                error_details = traceback.format_exc()
-                error_str = str(ocr_error).lower()
-                print(f"❌ Eroare la OCR pentru PDF: {error_details}")
-                
-                # Verifică dacă eroarea este legată de poppler
-                if "poppler" in error_str or "pdftoppm" in error_str or "pdfinfo" in error_str:
-                    return JSONResponse(
-                        status_code=500,
-                        content={
-                            "error": "Poppler nu este instalat sau nu este în PATH. Pentru a procesa PDF-uri scanate, instalează poppler:\n"
-                            "Windows: https://github.com/oschwartz10612/poppler-windows/releases\n"
-                            "Linux: sudo apt-get install poppler-utils\n"
-                            "macOS: brew install poppler"
-                        }
-                    )
-                
-                return JSONResponse(
-                    status_code=500,
-                    content={"error": f"Eroare la procesarea PDF cu OCR: {str(ocr_error)}"}
-                )
-        
-        if not text.strip():
+            error_response = _ocr_error_response([page["error"] for page in pages if page.get("error")])
+            if error_response is not None:
+                return error_response
             return JSONResponse(
                 status_code=400,
                 content={"error": "Nu s-a putut extrage text din PDF. PDF-ul poate fi protejat sau de calitate prea slabă."}
             )
         
+        # Adaugă notă dacă au fost omise pagini
+        if total_pages > max_pages:
+            text += f"\n\n[Notă: Doar primele {max_pages} pagini au fost procesate din {total_pages} totale]"
+        
+        if ocr_methods:
+            method = (ocr_methods.pop() if len(ocr_methods) == 1 else "ocr") if not kinds["text"] else "hybrid"
+            print(f"✅ Text extras din {kinds['text']} pagini cu text și {kinds['image']} pagini scanate (OCR): {len(text)} caractere")
+        else:
+            method = "direct"
+        
         # Limitează textul final la 50000 caractere pentru a evita timeout-uri
         final_text = text.strip()
         is_truncated = False
@@ -314,18 +242,16 @@ async def extract_pdf(
         
         return JSONResponse(content={
             "text": final_text,
-            "pages": len(pdf_reader.pages),
+            "pages": total_pages,
             "filename": pdf.filename,
-            "method": "ocr" if not extracted_pages else "direct",
+            "method": method,
             "truncated": is_truncated,
-            "original_length": len(text.strip())
+            "original_length": len(text.strip()),
+            "page_kinds": kinds,
+            "ocr_pages": [page["page"] for page in pages if page["kind"] == "image"],
+            "preprocess": [{"page": page["page"], **page["preprocess"]} for page in pages if page.get("preprocess")]
         })
         
-    except PyPDF2.errors.PdfReadError as e:
-        return JSONResponse(
-            status_code=400,
-            content={"error": f"PDF corupt sau invalid: {str(e)}"}
-        )
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -335,6 +261,70 @@ async def extract_pdf(
             content={"error": f"Eroare la procesarea PDF: {str(e)}. Verifică consola serverului pentru detalii."}
         )
 
+async def _extract_pdf_events(pdf_content: bytes, max_pages: int, layout: bool = False):
+    """
+    Evenimentele pentru /extract-pdf/stream: aceeași extragere hibridă ca /extract-pdf (text direct
+    pentru paginile cu strat de text, OCR doar pentru cele scanate), dar fiecare pagină este emisă
+    imediat ce este gata, în ordine.
+    """
+    import asyncio
+    from ocr_processor.streaming import StreamSummary
+    from ocr_processor.pdf_pages import get_pdf_page_count
+    
+    loop = asyncio.get_event_loop()
+    total_pages = await loop.run_in_executor(None, get_pdf_page_count, pdf_content)
+    pages_to_process = min(total_pages, max_pages)
+    yield {"type": "start", "total_pages": total_pages, "pages_to_process": pages_to_process}
+    
+    stats = StreamSummary(pages_to_process)
+    kinds = {"text": 0, "image": 0, "empty": 0}
+    async for page in _extract_pdf_hybrid(pdf_content, max_pages, layout):
+        kinds[page["kind"]] += 1
+        event = {"type": "page", "page": page["page"], "text": page["text"].strip(), "method": page["method"], "kind": page["kind"]}
+        for key in ("error", "preprocess", "cached"):
+            if page.get(key):
+                event[key] = page[key]
+        yield event
+        yield stats.page(page["text"])
+    
+    if stats.pages_with_text == 0 and kinds["image"] and not _pdf_ocr_runners(pdf_content):
+        yield {"type": "error", "error": "Nu s-a putut extrage text din PDF. PDF-ul pare să fie scanat și OCR nu este disponibil."}
+        return
+    yield stats.summary(total_pages=total_pages, page_kinds=kinds, method="hybrid" if kinds["text"] and kinds["image"] else ("direct" if kinds["text"] else "ocr"))
+
+@router.post("/extract-pdf/stream")
+async def extract_pdf_stream(
+    pdf: UploadFile = File(...),
+    max_pages: int = Query(5, ge=1, le=10, description="Numărul maxim de pagini de procesat (1-10, default: 5)"),
+    layout: bool = Query(False, description="Păstrează așezarea textului din pagină (util pentru formulare)")
+):
+    """
+    Varianta în flux a /extract-pdf: returnează NDJSON, cu un eveniment per pagină imediat ce
+    textul ei este disponibil (direct sau prin OCR), evenimente de progres și un sumar final.
+    """
+    from ocr_processor.streaming import NDJSON_MEDIA_TYPE, ndjson_stream
+    
+    if not PDF_AVAILABLE:
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Niciun backend PDF instalat. Rulează: pip install pymupdf (sau PyPDF2)"}
+        )
+    
+    if pdf.content_type != "application/pdf":
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Fișierul trebuie să fie PDF"}
+        )
+    
+    pdf_content = await pdf.read()
+    if not pdf_content:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Fișierul PDF este gol sau nu a putut fi citit."}
+        )
+    
+    return StreamingResponse(ndjson_stream(_extract_pdf_events(pdf_content, max_pages, layout)), media_type=NDJSON_MEDIA_TYPE)
+
 @router.post("/extract-image")
 async def extract_image(
     image: UploadFile = File(...),
@@ -365,8 +355,9 @@ async def extract_image(
             
             print(f"📸 Procesare imagine cu PaddleOCR: {image.filename}, {len(image_content)} bytes")
             
-            # Procesează cu PaddleOCR
-            text, _ = process_image(image_content, lang='ro', return_boxes=False)
+            # Procesează cu PaddleOCR (etapele de preprocesare rulate sunt raportate în răspuns)
+            preprocess = {}
+            text, _ = process_image(image_content, lang='ro', return_boxes=False, stats=preprocess)
             
             if not text or not text.strip():
                 print(f"⚠️ PaddleOCR nu a extras text, încerc cu Tesseract...")
@@ -388,7 +379,8 @@ async def extract_image(
                     "text": extracted_text,
                     "filename": image.filename,
                     "type": "image",
-                    "method": "paddleocr"
+                    "method": "paddleocr",
+                    "preprocess": preprocess
                 }
                 
                 if correct_text and correct_ocr_text:
@@ -537,11 +529,16 @@ async def extract_image(
                     content={"error": f"Tesseract OCR nu este instalat sau nu este în PATH. Eroare: {error_msg}. Instalează Tesseract OCR de la: https://github.com/UB-Mannheim/tesseract/wiki"}
                 )
         
+        # Aceeași imagine procesată anterior: textul vine din cache-ul OCR
+        from ocr_processor.result_cache import get_ocr_cache
+        cache_key = _tesseract_cache_key(image_content)
+        cached_ocr = get_ocr_cache().get(cache_key) if cache_key else None
+        
         # Încearcă cu diferite configurații de limbi
-        lang_configs = ['ron+eng', 'eng', 'ron', None]  # None = default
+        lang_configs = [] if cached_ocr else ['ron+eng', 'eng', 'ron', None]  # None = default
         
-        print(f"🔤 Încearcă extragere text cu OCR...")
-        text = None
+        print(f"🔤 Încearcă extragere text cu OCR..." if not cached_ocr else "♻️ Cache OCR: imagine din cache")
+        text = cached_ocr["text"] if cached_ocr else None
         error_msg = None
         
         for lang_config in lang_configs:
@@ -604,6 +601,9 @@ async def extract_image(
                     content={"error": "Nu s-a putut extrage text din imagine. Imaginea poate să nu conțină text sau calitatea este prea slabă. Încearcă cu o imagine de calitate mai bună."}
                 )
         
+        if cache_key and not cached_ocr:
+            get_ocr_cache().put(cache_key, text)
+        
         extracted_text = text.strip()
         
         # Post-procesare: corectare text și identificare date lipsă
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from core.model_warmup import get_model_warmup
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+@router.get("/live")
+async def liveness():
+    """Procesul rulează (fără verificarea dependențelor)"""
+    return JSONResponse(content={"status": "ok"})
+
+@router.get("/ready")
+async def readiness():
+    """
+    Gata de trafic doar când modelele Ollama (chatbot-uri active + EMBEDDING_MODEL) sunt încărcate
+    (core/model_warmup.py); altfel 503, cu starea fiecărui model
+    """
+    report = get_model_warmup().readiness()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if report["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=report
+    )
@@ -3,7 +3,7 @@ Router pentru procesarea OCR a documentelor.
 """
 
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional
 import os
 
@@ -16,6 +16,15 @@ from ocr_processor.processor import (
     OPENCV_AVAILABLE,
     PDF2IMAGE_AVAILABLE
 )
+from ocr_processor.singleton import get_ocr_registry
+from ocr_processor.pdf_pages import RASTERIZE_AVAILABLE
+from ocr_processor.result_cache import get_ocr_cache
+from ocr_processor.streaming import (
+    NDJSON_MEDIA_TYPE,
+    ndjson_stream,
+    stream_pdf_ocr_events,
+    stream_image_ocr_events
+)
 
 router = APIRouter(prefix="/ocr", tags=["ocr"])
 
@@ -67,15 +76,18 @@ async def extract_text(
             any(filename.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'])
         )
         
+        # Etapele de preprocesare rulate / sărite (pentru reglarea pipeline-ului)
+        preprocess = {}
+        
         if is_pdf:
-            if not PDF2IMAGE_AVAILABLE:
+            if not RASTERIZE_AVAILABLE:
                 raise HTTPException(
                     status_code=500,
                     detail="pdf2image nu este instalat. Ruleaza: pip install pdf2image"
                 )
-            text, boxes = process_pdf(file_content, lang=lang, return_boxes=return_boxes)
+            text, boxes = process_pdf(file_content, lang=lang, return_boxes=return_boxes, stats=preprocess)
         elif is_image:
-            text, boxes = process_image(file_content, lang=lang, return_boxes=return_boxes)
+            text, boxes = process_image(file_content, lang=lang, return_boxes=return_boxes, stats=preprocess)
         else:
             raise HTTPException(
                 status_code=400,
@@ -87,7 +99,8 @@ async def extract_text(
             "text": text,
             "filename": filename,
             "file_type": "pdf" if is_pdf else "image",
-            "language": lang
+            "language": lang,
+            "preprocess": preprocess
         }
         
         if return_boxes and boxes:
@@ -108,15 +121,104 @@ async def extract_text(
         )
 
 
+@router.post("/extract/stream")
+async def extract_text_stream(
+    file: UploadFile = File(...),
+    return_boxes: bool = Form(False),
+    lang: str = Form("ro")
+):
+    """
+    Varianta în flux a /ocr/extract: returnează NDJSON, cu un eveniment per pagină
+    imediat ce OCR-ul o termină, evenimente de progres și un sumar final.
+    
+    Args:
+        file: Fișierul de procesat (imagine sau PDF)
+        return_boxes: Dacă True, include bounding boxes în evenimentele de pagină
+        lang: Limba pentru OCR (default: 'ro')
+    """
+    if not PADDLEOCR_AVAILABLE or not OPENCV_AVAILABLE:
+        raise HTTPException(
+            status_code=500,
+            detail="PaddleOCR și OpenCV sunt necesare. Ruleaza: pip install paddleocr opencv-python"
+        )
+    
+    file_content = await file.read()
+    content_type = file.content_type or ""
+    filename = file.filename or ""
+    
+    is_pdf = content_type == "application/pdf" or filename.lower().endswith('.pdf')
+    is_image = (
+        content_type.startswith("image/") or
+        any(filename.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'])
+    )
+    
+    if is_pdf:
+        if not RASTERIZE_AVAILABLE:
+            raise HTTPException(
+                status_code=500,
+                detail="pdf2image nu este instalat. Ruleaza: pip install pdf2image"
+            )
+        events = stream_pdf_ocr_events(file_content, lang=lang, return_boxes=return_boxes)
+    elif is_image:
+        events = stream_image_ocr_events(file_content, lang=lang, return_boxes=return_boxes)
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Tip de fișier neacceptat. Foloseste PDF sau imagini (JPG, PNG, etc.)"
+        )
+    
+    return StreamingResponse(ndjson_stream(events), media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.get("/status")
 async def get_ocr_status():
     """
     Returnează statusul componentelor OCR.
     """
+    cache = get_ocr_cache()
     return JSONResponse(content={
         "paddleocr_available": PADDLEOCR_AVAILABLE,
         "opencv_available": OPENCV_AVAILABLE,
         "pdf2image_available": PDF2IMAGE_AVAILABLE,
-        "ready": PADDLEOCR_AVAILABLE and OPENCV_AVAILABLE
+        "ready": PADDLEOCR_AVAILABLE and OPENCV_AVAILABLE,
+        "loaded_models": get_ocr_registry().loaded_models(),
+        "result_cache": cache.stats() if cache is not None else None
     })
 
+
+@router.post("/models/{lang}/load")
+async def load_ocr_model(lang: str):
+    """
+    Pre-încarcă (warm-up) modelul OCR pentru o limbă.
+    """
+    import asyncio
+    loop = asyncio.get_event_loop()
+    processor = await loop.run_in_executor(None, get_ocr_registry().get, lang)
+    if processor is None:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Modelul OCR pentru limba '{lang}' nu a putut fi încărcat"
+        )
+    return JSONResponse(content={"success": True, "loaded_models": get_ocr_registry().loaded_models()})
+
+
+@router.delete("/models/{lang}")
+async def unload_ocr_model(lang: str):
+    """
+    Descarcă explicit modelul OCR pentru o limbă (eliberează memoria).
+    """
+    if not get_ocr_registry().unload(lang):
+        raise HTTPException(status_code=404, detail=f"Modelul OCR pentru limba '{lang}' nu este încărcat")
+    return JSONResponse(content={"success": True, "loaded_models": get_ocr_registry().loaded_models()})
+
+
+@router.delete("/cache")
+async def clear_ocr_result_cache():
+    """
+    Golește cache-ul rezultatelor OCR (ex: după actualizarea modelelor OCR).
+    """
+    cache = get_ocr_cache()
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Cache-ul OCR este dezactivat")
+    cache.clear()
+    return JSONResponse(content={"success": True, "result_cache": cache.stats()})
@@ -7,12 +7,11 @@ import uuid
 from models.schemas import ChatRequest
 from database import create_client_chat, get_client_chat
 from rag_manager import get_tenant_rag_store
-from core.cache import get_cached_config
+from core.cache import get_cached_config, get_rag_content
 from core.conversation import get_tenant_id_from_chat_id
-from core.config import PDF_AVAILABLE, OCR_AVAILABLE
 from routers.chat import stream_response
 from fastapi.responses import StreamingResponse
-import PyPDF2
+from core.ingestion import ingest_document
 
 router = APIRouter(tags=["static"])
 
@@ -87,7 +86,8 @@ async def create_chat(
     chat_title: Optional[str] = Form(None),
     chat_subtitle: Optional[str] = Form(None),
     chat_color: Optional[str] = Form("#3b82f6"),
-    rag_files: Optional[list[UploadFile]] = File(None)
+    rag_files: Optional[list[UploadFile]] = File(None),
+    layout: bool = Form(False)
 ):
     # Generează ID unic
     chat_id = name.lower().replace(" ", "-") + "-" + str(uuid.uuid4())[:8]
@@ -105,73 +105,18 @@ async def create_chat(
                     content = await file.read()
                     f.write(content)
                 
-                # Extrage text din fișier
-                text_content = ""
-                if file.filename.endswith('.pdf') and PDF_AVAILABLE:
-                    try:
-                        with open(file_path, "rb") as pdf_file:
-                            pdf_reader = PyPDF2.PdfReader(pdf_file)
-                            for page_num, page in enumerate(pdf_reader.pages):
-                                try:
-                                    page_text = page.extract_text()
-                                    if page_text.strip():
-                                        text_content += f"\n--- Pagina {page_num + 1} ---\n{page_text}\n"
-                                except Exception as e:
-                                    print(f"Eroare la extragerea paginii {page_num + 1} din {file.filename}: {e}")
-                                    continue
-                        
-                        # Dacă nu s-a extras text (PDF scanat), încearcă OCR
-                        if not text_content.strip() and OCR_AVAILABLE:
-                            try:
-                                print(f"PDF {file.filename} pare scanat, încerc OCR...")
-                                # Pentru PDF-uri scanate, ar trebui să convertim paginile în imagini
-                                # Pentru moment, doar logăm
-                                print(f"⚠️ PDF {file.filename} nu conține text extractibil. Poate fi scanat.")
-                            except Exception as e:
-                                print(f"Eroare OCR pentru {file.filename}: {e}")
-                    except Exception as e:
-                        print(f"Eroare la extragerea textului din PDF {file.filename}: {e}")
-                elif file.filename.endswith(('.txt', '.md')):
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            text_content = f.read()
-                    except UnicodeDecodeError:
-                        # Încearcă cu encoding diferit
-                        try:
-                            with open(file_path, "r", encoding="latin-1") as f:
-                                text_content = f.read()
-                        except Exception as e:
-                            print(f"Eroare la citirea fișierului {file.filename}: {e}")
-                    except Exception as e:
-                        print(f"Eroare la citirea fișierului {file.filename}: {e}")
-                elif file.filename.endswith(('.doc', '.docx')):
-                    # Pentru DOC/DOCX, ar trebui python-docx
-                    try:
-                        try:
-                            from docx import Document
-                            doc = Document(file_path)
-                            for para in doc.paragraphs:
-                                if para.text.strip():
-                                    text_content += para.text + "\n"
-                            # Extrage și din tabele
-                            for table in doc.tables:
-                                for row in table.rows:
-                                    row_text = " | ".join([cell.text.strip() for cell in row.cells])
-                                    if row_text.strip():
-                                        text_content += row_text + "\n"
-                        except ImportError:
-                            print(f"⚠️ python-docx nu este instalat. Pentru DOC/DOCX, rulează: pip install python-docx")
-                            text_content = f"[Fișier DOC/DOCX - instalează python-docx pentru extragere: pip install python-docx]"
-                    except Exception as e:
-                        print(f"Eroare la extragerea textului din DOC/DOCX {file.filename}: {e}")
+                # Extrage text (cu OCR pentru paginile scanate) și calculează embeddings;
+                # store-ul se creează după ce chatbot-ul are un ID în baza de date
+                try:
+                    ingested = await ingest_document(file.filename, content, layout=layout)
+                except Exception as e:
+                    print(f"Eroare la extragerea textului din {file.filename}: {e}")
+                    continue
                 
-                if text_content and text_content.strip():
+                if ingested["text"]:
                     # Nu limităm aici - limităm doar în prompt pentru a păstra tot conținutul în config
-                    rag_content.append({
-                        "filename": file.filename,
-                        "content": text_content.strip()  # Păstrăm tot conținutul în config
-                    })
-                    print(f"✅ Text extras din {file.filename}: {len(text_content)} caractere")
+                    rag_content.append(ingested)
+                    print(f"✅ Text extras din {file.filename}: {len(ingested['text'])} caractere")
                 else:
                     print(f"⚠️ Nu s-a putut extrage text din {file.filename} (poate fi gol, scanat sau protejat)")
     
@@ -205,9 +150,9 @@ async def create_chat(
         for item in rag_content:
             # Salvează în DB cu conținutul
             from database import add_rag_file
-            add_rag_file(client_chat_id, item["filename"], item["content"])
-            # Adaugă în vector store
-            rag_store.add_document(item["filename"], item["content"])
+            add_rag_file(client_chat_id, item["filename"], item["text"])
+            # Adaugă în vector store (embeddings calculate la ingestie)
+            rag_store.add_chunks(item["filename"], item["chunks"], item["embeddings"])
         
         print(f"✅ Vector store creat pentru tenant {tenant_id}")
     except Exception as e:
@@ -248,8 +193,8 @@ async def ask_default(request: ChatRequest):
         {"role": "user", "content": request.message}
     ]
 
-    # Extrage conținutul RAG din config dacă există
-    rag_content = config.get("rag_content", []) if config else []
+    # Conținutul RAG (view leneș, citit din DB doar dacă este folosit în prompt)
+    rag_content = get_rag_content(config)
     institution_data = config.get("institution") if config else None
     tenant_id = config.get("tenant_id") if config else None
 
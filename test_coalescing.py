@@ -0,0 +1,145 @@
+"""
+Script de test pentru coalescing-ul generărilor identice în curs (core/coalescing.py).
+Generarea este simulată (fără Ollama).
+Rulează: python test_coalescing.py
+"""
+import asyncio
+import os
+import sys
+
+# Adaugă directorul rădăcină la path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.coalescing import coalesced_stream, coalescing_stats, prompt_key
+
+
+def _fake_generation(chunks, calls: list, delay: float = 0.01):
+    """generate() pentru coalesced_stream: emite bucățile cu o mică pauză, numără pornirile"""
+    async def generate():
+        calls.append(1)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+    return generate
+
+
+async def _collect(key: str, generate) -> str:
+    return "".join([chunk async for chunk in coalesced_stream(key, generate)])
+
+
+def test_prompt_key():
+    """Același prompt asamblat = aceeași cheie; orice diferență (model, mesaje, opțiuni) = altă cheie"""
+    print("\n1. Cheia prompt-ului...")
+    messages = [{"role": "system", "content": "Ești asistentul primăriei."}, {"role": "user", "content": "Program?"}]
+    key = prompt_key("llama3", messages, {"temperature": 0.2})
+    assert key == prompt_key("llama3", [dict(message) for message in messages], {"temperature": 0.2})
+    assert key != prompt_key("llama3", messages, {"temperature": 0.3})
+    assert key != prompt_key("mistral", messages, {"temperature": 0.2})
+    assert key != prompt_key("llama3", messages[:1] + [{"role": "user", "content": "Taxe?"}], {"temperature": 0.2})
+    print("✅ prompt_key OK")
+
+
+def test_identical_requests_share_generation():
+    """Cererile identice simultane primesc același răspuns dintr-o singură generare"""
+    print("\n2. Cereri identice simultane...")
+
+    async def run():
+        before = coalescing_stats()
+        calls = []
+        generate = _fake_generation(["Programul ", "este ", "8-16."], calls)
+        key = prompt_key("test", [{"role": "user", "content": "program"}], {})
+        first = asyncio.ensure_future(_collect(key, generate))
+        await asyncio.sleep(0.015)  # a doua cerere sosește după ce prima bucată a fost emisă (replay)
+        second = asyncio.ensure_future(_collect(key, generate))
+        answers = await asyncio.gather(first, second)
+        after = coalescing_stats()
+        return answers, calls, before, after
+
+    answers, calls, before, after = asyncio.run(run())
+    assert answers == ["Programul este 8-16.", "Programul este 8-16."], answers
+    assert len(calls) == 1, f"{len(calls)} generări pornite"
+    assert after["generations"] - before["generations"] == 1
+    assert after["coalesced"] - before["coalesced"] == 1
+    assert after["inflight"] == 0
+    print("✅ O singură generare pentru cererile identice")
+
+
+def test_finished_generation_is_not_reused():
+    """După terminarea generării, o cerere identică pornește o generare nouă"""
+    print("\n3. Cerere identică după terminarea generării...")
+
+    async def run():
+        calls = []
+        generate = _fake_generation(["a", "b"], calls, delay=0)
+        key = prompt_key("test", [{"role": "user", "content": "secvențial"}], {})
+        answers = [await _collect(key, generate), await _collect(key, generate)]
+        return answers, calls
+
+    answers, calls = asyncio.run(run())
+    assert answers == ["ab", "ab"]
+    assert len(calls) == 2
+    print("✅ Generare nouă după final")
+
+
+def test_generation_cancelled_without_subscribers():
+    """Dacă toți clienții se deconectează, generarea partajată este oprită"""
+    print("\n4. Deconectarea tuturor clienților...")
+
+    async def run():
+        produced = []
+
+        async def generate():
+            for index in range(100):
+                await asyncio.sleep(0.01)
+                produced.append(index)
+                yield str(index)
+
+        key = prompt_key("test", [{"role": "user", "content": "deconectare"}], {})
+        stream = coalesced_stream(key, generate)
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.05)
+        return produced, coalescing_stats()
+
+    produced, stats = asyncio.run(run())
+    assert len(produced) < 10, f"generarea a continuat ({len(produced)} bucăți)"
+    assert stats["inflight"] == 0
+    print("✅ Generarea oprită după deconectare")
+
+
+def test_generation_error_reaches_all_subscribers():
+    """O eroare a generării înainte de primul chunk ajunge, ca mesaj, la toți abonații"""
+    print("\n5. Eroare în generarea partajată...")
+
+    async def run():
+        async def generate():
+            await asyncio.sleep(0.01)
+            raise ConnectionError("Ollama indisponibil")
+            yield ""
+
+        key = prompt_key("test", [{"role": "user", "content": "eroare"}], {})
+        return await asyncio.gather(_collect(key, generate), _collect(key, generate))
+
+    answers = asyncio.run(run())
+    assert answers[0] == answers[1] and answers[0].startswith("Eroare:"), answers
+    print("✅ Eroarea ajunge la toți abonații")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST COALESCING GENERĂRI")
+    print("=" * 60)
+
+    failed = 0
+    for test in (test_prompt_key, test_identical_requests_share_generation, test_finished_generation_is_not_reused,
+                 test_generation_cancelled_without_subscribers, test_generation_error_reaches_all_subscribers):
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} eșuat: {e}")
+
+    print("\n" + "=" * 60)
+    print("✅ Toate testele au trecut!" if not failed else f"❌ {failed} teste eșuate")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,102 @@
+"""
+Script de test pentru împachetarea contextului RAG pe un buget de tokens (core/context_packer.py).
+Rulează: python test_context_packer.py
+"""
+import os
+import sys
+
+# Adaugă directorul rădăcină la path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.context_packer import merge_adjacent_hits, pack_rag_context, score_fallback_content
+
+
+def _hit(filename: str, content: str, score: float, chunk_index: int = 0, chunk_count: int = 1) -> dict:
+    return {"filename": filename, "content": content, "score": score,
+            "chunk_index": chunk_index, "chunk_count": chunk_count}
+
+
+def test_min_score_and_order():
+    """Rezultatele sub prag nu intră în prompt; restul apar în ordinea scorului"""
+    print("\n1. Prag de scor și ordine...")
+    hits = [_hit("a.txt", "Text despre taxe.", 0.4), _hit("b.txt", "Text despre impozite.", 0.9),
+            _hit("c.txt", "Text irelevant.", 0.1), _hit("d.txt", "   ", 0.95)]
+    report = pack_rag_context(hits, budget_tokens=1000, min_score=0.3)
+    assert [section["filename"] for section in report["sections"]] == ["b.txt", "a.txt"]
+    assert report["dropped_low_score"] == 1
+    assert report["dropped_budget"] == 0
+    assert report["text"].index("b.txt") < report["text"].index("a.txt")
+    print("✅ Prag și ordine OK")
+
+
+def test_budget_truncation():
+    """Bugetul nu este depășit: rezultatul care nu încape este trunchiat sau sărit"""
+    print("\n2. Buget de tokens...")
+    paragraph = "Aceasta este o propoziție de test despre regulament. " * 8
+    long_text = "\n\n".join([paragraph] * 10)
+    hits = [_hit("lung.txt", long_text, 0.9), _hit("scurt.txt", "Program: 8-16.", 0.5)]
+    budget = 400
+    report = pack_rag_context(hits, budget_tokens=budget)
+    assert report["tokens"] <= budget, report["tokens"]
+    assert report["tokens"] == sum(section["tokens"] for section in report["sections"])
+    first = report["sections"][0]
+    assert first["filename"] == "lung.txt" and first["truncated"]
+    assert "[...]" in report["text"]
+
+    # Sub _MIN_PARTIAL_TOKENS rămași, rezultatul prea lung este sărit, nu trunchiat
+    report = pack_rag_context([_hit("scurt.txt", "Program: 8-16.", 0.95), _hit("lung.txt", long_text, 0.9)],
+                              budget_tokens=60)
+    assert [section["filename"] for section in report["sections"]] == ["scurt.txt"]
+    assert report["dropped_budget"] == 1
+    print("✅ Buget OK")
+
+
+def test_merge_adjacent_hits():
+    """Chunk-urile consecutive din același fișier devin un singur rezultat, fără textul suprapus"""
+    print("\n3. Unirea rezultatelor vecine...")
+    hits = [_hit("a.txt", "primul paragraf comun", 0.7, chunk_index=0),
+            _hit("a.txt", "comun al doilea", 0.8, chunk_index=1),
+            _hit("a.txt", "departe", 0.6, chunk_index=5),
+            _hit("b.txt", "alt fișier", 0.5, chunk_index=1)]
+    merged = merge_adjacent_hits(hits)
+    assert len(merged) == 3
+    first = next(hit for hit in merged if hit["filename"] == "a.txt" and hit["chunk_index"] == 0)
+    assert first["chunk_count"] == 2
+    assert first["score"] == 0.8
+    assert first["content"].count("comun") == 1
+    print("✅ merge_adjacent_hits OK")
+
+
+def test_fallback_scoring():
+    """Fără vector store: fișierele care conțin cuvintele întrebării sunt puse primele"""
+    print("\n4. Scor lexical pentru conținutul fallback...")
+    items = [{"filename": "orar.txt", "content": "Programul de lucru este 8-16."},
+             {"filename": "taxe.txt", "content": "Impozitele locale se plătesc până la 31 martie."},
+             {"filename": "gol.txt", "content": ""}]
+    scored = score_fallback_content(items, "Până când se plătește impozitul?")
+    assert [item["filename"] for item in scored] == ["orar.txt", "taxe.txt"]
+    best = max(scored, key=lambda item: item["score"])
+    assert best["filename"] == "taxe.txt"
+    # Fără query, ordinea încărcării se păstrează
+    unordered = score_fallback_content(items, None)
+    assert unordered[0]["score"] > unordered[1]["score"]
+    print("✅ score_fallback_content OK")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST ÎMPACHETARE CONTEXT RAG")
+    print("=" * 60)
+
+    failed = 0
+    for test in (test_min_score_and_order, test_budget_truncation, test_merge_adjacent_hits, test_fallback_scoring):
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} eșuat: {e}")
+
+    print("\n" + "=" * 60)
+    print("✅ Toate testele au trecut!" if not failed else f"❌ {failed} teste eșuate")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
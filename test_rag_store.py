@@ -0,0 +1,139 @@
+"""
+Script de test pentru vector store-ul RAG per tenant (rag_manager.TenantRAGStore):
+ștergere → compactare → reîncărcare de pe disk → căutare, cuantizare, swap_in și unirea chunk-urilor.
+Embeddings-urile sunt generate local (fără Ollama).
+Rulează: python test_rag_store.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+# Adaugă directorul rădăcină la path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from rag_manager import TenantRAGStore, merge_chunk_texts
+
+DIM = 16
+_rng = np.random.default_rng(42)
+
+
+def _document(name: str, chunks: int):
+    """Chunk-uri și vectori aleatori (normalizați) pentru un document de test"""
+    texts = [f"{name} chunk {index}" for index in range(chunks)]
+    vectors = _rng.normal(size=(chunks, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return texts, vectors
+
+
+def _new_store(tenant_id: str = "test") -> TenantRAGStore:
+    return TenantRAGStore(tenant_id, store_path=tempfile.mkdtemp(prefix="rag_store_test_"))
+
+
+def test_remove_compact_reload_search():
+    """Ștergerea unui document mare declanșează compactarea; store-ul reîncărcat găsește aceleași chunk-uri"""
+    print("\n1. Ștergere → compactare → reîncărcare → căutare...")
+    store = _new_store()
+    documents = {name: _document(name, chunks) for name, chunks in (("a.txt", 4), ("b.txt", 2), ("c.txt", 3))}
+    for name, (texts, vectors) in documents.items():
+        store.add_chunks(name, texts, vectors.tolist(), model="test-model")
+    assert len(store.metadata) == 9
+
+    # 4 din 9 chunk-uri șterse depășesc RAG_COMPACT_RATIO (implicit 0.3): store-ul este rescris
+    store.remove_document("a.txt")
+    assert store._dead == 0, "compactarea nu a rulat"
+    assert len(store.metadata) == 5
+    assert store.get_filenames() == {"b.txt", "c.txt"}
+
+    # Un store nou pe același director citește versiunea compactată
+    reloaded = TenantRAGStore("test", store_path=store.store_path)
+    assert reloaded.model == "test-model" and reloaded.dim == DIM
+    assert [meta["content"] for meta in reloaded.get_document_chunks("c.txt")] == documents["c.txt"][0]
+    results = reloaded.search_vector(documents["c.txt"][1][1].tolist(), top_k=3)
+    assert results and results[0]["filename"] == "c.txt"
+    assert abs(results[0]["score"] - 1.0) < 1e-5
+    assert all(result["filename"] != "a.txt" for result in results)
+
+    # Modificarea făcută de alt proces / instanță este preluată la următorul acces (_sync_from_disk)
+    time.sleep(0.05)
+    store.remove_document("b.txt")
+    results = reloaded.search_vector(documents["b.txt"][1][0].tolist(), top_k=5)
+    assert all(result["filename"] == "c.txt" for result in results)
+    assert reloaded.get_filenames() == {"c.txt"}
+    print("✅ Compactare și reîncărcare OK")
+
+
+def test_quantized_search():
+    """Cu vectori cuantizați, reordonarea cu vectorii exacți păstrează rezultatul corect"""
+    print("\n2. Căutare cu vectori cuantizați...")
+    store = _new_store()
+    documents = {name: _document(name, 5) for name in ("a.txt", "b.txt", "c.txt")}
+    for name, (texts, vectors) in documents.items():
+        store.add_chunks(name, texts, vectors.tolist(), model="test-model")
+    query = documents["b.txt"][1][2]
+    for quantization in ("float16", "int8", "none"):
+        store.configure(quantization=quantization)
+        results = store.search_vector(query.tolist(), top_k=3)
+        assert results[0]["filename"] == "b.txt", quantization
+        assert abs(results[0]["score"] - 1.0) < 1e-5, quantization
+    print("✅ Cuantizare float16 / int8 OK")
+
+
+def test_swap_in():
+    """swap_in: documentele din shadow + cele păstrate din store; restul dispar"""
+    print("\n3. Activarea unui index shadow (swap_in)...")
+    store = _new_store()
+    shadow = _new_store()
+    old_a = _document("a.txt", 2)
+    new_a = _document("a.txt", 3)
+    b = _document("b.txt", 2)
+    c = _document("c.txt", 2)
+    store.add_chunks("a.txt", old_a[0], old_a[1].tolist(), model="test-model")
+    store.add_chunks("b.txt", b[0], b[1].tolist(), model="test-model")
+    store.add_chunks("c.txt", c[0], c[1].tolist(), model="test-model")
+    shadow.add_chunks("a.txt", new_a[0], new_a[1].tolist(), model="test-model")
+
+    kept = store.swap_in(shadow, from_shadow={"a.txt"}, keep_live={"b.txt"})
+    assert kept == {"b.txt"}
+    assert store.get_filenames() == {"a.txt", "b.txt"}
+    assert len(store.get_document_chunks("a.txt")) == 3
+    results = store.search_vector(new_a[1][0].tolist(), top_k=1)
+    assert results[0]["filename"] == "a.txt" and abs(results[0]["score"] - 1.0) < 1e-5
+
+    # Shadow cu alt model: documentele păstrate nu pot fi amestecate, rămâne doar shadow-ul
+    other = _new_store()
+    other.add_chunks("d.txt", new_a[0], new_a[1].tolist(), model="alt-model")
+    assert store.swap_in(other, from_shadow={"d.txt"}, keep_live={"b.txt"}) == set()
+    assert store.get_filenames() == {"d.txt"} and store.model == "alt-model"
+    print("✅ swap_in OK")
+
+
+def test_merge_chunk_texts():
+    """Unirea a două chunk-uri consecutive fără textul suprapus"""
+    print("\n4. Unirea chunk-urilor consecutive...")
+    assert merge_chunk_texts("abcdefgh", "fghijk", overlap=3) == "abcdefghijk"
+    # Suprapunere diferită de cea de la ingestie: cea mai lungă potrivire
+    assert merge_chunk_texts("abcdefgh", "efghij", overlap=3) == "abcdefghij"
+    # Fără suprapunere: textele sunt separate de un rând nou
+    assert merge_chunk_texts("abc", "xyz", overlap=3) == "abc\nxyz"
+    print("✅ merge_chunk_texts OK")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST VECTOR STORE RAG")
+    print("=" * 60)
+
+    failed = 0
+    for test in (test_remove_compact_reload_search, test_quantized_search, test_swap_in, test_merge_chunk_texts):
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} eșuat: {e}")
+
+    print("\n" + "=" * 60)
+    print("✅ Toate testele au trecut!" if not failed else f"❌ {failed} teste eșuate")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
@@ -33,7 +33,7 @@ export interface ChatConfig {
   chat_title?: string;
   chat_subtitle?: string;
   chat_color?: string;
-  rag_content?: Array<{ filename: string; content: string }>;
+  rag_content_info?: Array<{ filename: string; content_length: number; has_content: boolean }>;
   rag_files?: string[];
   // Date specifice instituției
   institution?: InstitutionData;